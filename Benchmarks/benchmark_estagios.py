@@ -0,0 +1,158 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# Permite importar o back-end a partir da raiz do projeto
+RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ_PROJETO, 'Source'))
+
+from Back import pixerizador, estimador_area
+
+TIPOS_IMAGEM = ("cinza", "bgr", "16bits")
+TAMANHOS_PADRAO_MP = [1, 4, 16]
+TOLERANCIA_PADRAO = 0.10  # Aumento relativo de tempo aceito antes de acusar regressão.
+
+def gerar_imagem_sintetica(tipo, megapixels, semente=0):
+    """
+    Gera uma imagem sintética aproximadamente quadrada com um gradiente, ruído e uma
+    região clara central (para que a estimativa de área encontre um contorno).
+
+    :param tipo: "cinza" (8 bits, 1 canal), "bgr" (8 bits, 3 canais) ou "16bits" (1 canal).
+    :param megapixels: Quantidade aproximada de pixels, em milhões.
+    :param semente: Semente do gerador de números aleatórios.
+    :return: Array NumPy com a imagem.
+    """
+    lado = int(np.sqrt(megapixels * 1_000_000))
+    gerador = np.random.default_rng(semente)
+    gradiente = np.linspace(0, 180, lado, dtype=np.float32)[np.newaxis, :]
+    ruido = gerador.integers(0, 40, size=(lado, lado), dtype=np.uint8)
+    imagem = (gradiente + ruido).astype(np.uint8)
+    cv2.circle(imagem, (lado // 2, lado // 2), lado // 4, 255, -1)
+
+    if tipo == "bgr":
+        return cv2.merge([imagem, np.roll(imagem, 7, axis=1), np.roll(imagem, 13, axis=0)])
+    if tipo == "16bits":
+        return imagem.astype(np.uint16) * 257
+    return imagem
+
+def medir(funcao, repeticoes):
+    """
+    Executa a função `repeticoes` vezes e retorna o menor tempo, em segundos.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+def medir_estagios(caminho_imagem, repeticoes):
+    """
+    Mede cada estágio do pixerizador para uma imagem, na mesma sequência do processamento.
+
+    :return: Dicionário com o tempo (s) de cada estágio.
+    """
+    imagem_cinza = pixerizador.ler_imagem(caminho_imagem)
+    imagem = cv2.imread(caminho_imagem)  # Versão BGR, apenas para medir a conversão isoladamente.
+    area = estimador_area.extrair_area_km2_a_partir_do_nome_imagem(os.path.basename(caminho_imagem))
+    comando_cli = [sys.executable, os.path.join(RAIZ_PROJETO, 'Source', 'Back', 'pixerizador.py'),
+                   '--imagens', caminho_imagem, '--areas_km', str(area), '--sem_cache']
+
+    return {
+        "ler_imagem": medir(lambda: pixerizador.ler_imagem(caminho_imagem), repeticoes),
+        "ler_imagem_nativa": medir(lambda: pixerizador.ler_imagem(caminho_imagem, profundidade_nativa=True), repeticoes),
+        "imread_bgr_cvtColor": medir(lambda: cv2.cvtColor(cv2.imread(caminho_imagem), cv2.COLOR_BGR2GRAY), repeticoes),
+        "cvtColor": medir(lambda: cv2.cvtColor(imagem, cv2.COLOR_BGR2GRAY), repeticoes),
+        "soma_ponderada_intensidades": medir(lambda: pixerizador.soma_ponderada_intensidades(imagem_cinza, 1.0), repeticoes),
+        "calcular_histograma": medir(lambda: pixerizador.calcular_histograma(imagem_cinza), repeticoes),
+        "calcular_area": medir(lambda: estimador_area.calcular_area(caminho_imagem, 1, 1, memorizar=False), repeticoes),
+        "estimar_area_em_array": medir(lambda: estimador_area.estimar_area_em_array(imagem_cinza, 1, 1, por_regiao=True), repeticoes),
+        "main": medir(lambda: pixerizador.main([caminho_imagem], [area]), repeticoes),
+        "cli_subprocesso": medir(lambda: subprocess.run(comando_cli, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True), repeticoes)
+    }
+
+def executar(tamanhos, tipos, repeticoes, diretorio):
+    """
+    Gera as imagens sintéticas e mede todos os estágios para cada combinação de tipo e tamanho.
+
+    :return: Dicionário {caso: {estágio: {segundos, mb_por_s, imagens_por_s}}}.
+    """
+    resultados = {}
+    for tipo in tipos:
+        for megapixels in tamanhos:
+            imagem = gerar_imagem_sintetica(tipo, megapixels)
+            caso = f"{tipo}_{megapixels}mp"
+            # A área é informada no nome, como nas imagens de exemplo do projeto.
+            caminho_imagem = os.path.join(diretorio, f"{caso}-area_km2_1000.tif")
+            cv2.imwrite(caminho_imagem, imagem)
+            megabytes = imagem.nbytes / (1024 * 1024)
+            del imagem
+
+            tempos = medir_estagios(caminho_imagem, repeticoes)
+            resultados[caso] = {
+                estagio: {
+                    "segundos": segundos,
+                    "mb_por_s": megabytes / segundos if segundos else None,
+                    "imagens_por_s": 1 / segundos if segundos else None
+                }
+                for estagio, segundos in tempos.items()
+            }
+            os.remove(caminho_imagem)
+    return resultados
+
+def comparar_com_baseline(resultados, baseline, tolerancia):
+    """
+    Compara os tempos medidos com os de uma execução anterior.
+
+    :return: Lista de tuplas (caso, estágio, tempo da baseline, tempo atual) acima da tolerância.
+    """
+    regressoes = []
+    for caso, estagios in resultados.items():
+        for estagio, medida in estagios.items():
+            anterior = baseline.get("resultados", {}).get(caso, {}).get(estagio)
+            if anterior and medida["segundos"] > anterior["segundos"] * (1 + tolerancia):
+                regressoes.append((caso, estagio, anterior["segundos"], medida["segundos"]))
+    return regressoes
+
+def imprimir_tabela(resultados):
+    print(f"{'caso':<14}{'estágio':<30}{'tempo (s)':>12}{'MB/s':>12}{'imagens/s':>12}")
+    for caso, estagios in resultados.items():
+        for estagio, medida in estagios.items():
+            print(f"{caso:<14}{estagio:<30}{medida['segundos']:>12.4f}{medida['mb_por_s']:>12.1f}{medida['imagens_por_s']:>12.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede a vazão de cada estágio do pixerizador com imagens sintéticas.")
+    parser.add_argument('--tamanhos', nargs='+', type=float, default=TAMANHOS_PADRAO_MP, help='Tamanhos das imagens sintéticas, em megapixels (ex.: 1 4 16 100 500).')
+    parser.add_argument('--tipos', nargs='+', choices=TIPOS_IMAGEM, default=list(TIPOS_IMAGEM), help='Tipos de imagem a gerar.')
+    parser.add_argument('--repeticoes', type=int, default=3, help='Repetições de cada medida (vale o menor tempo).')
+    parser.add_argument('--salvar_baseline', help='Grava os resultados desta execução como baseline JSON.')
+    parser.add_argument('--baseline', help='Baseline JSON com a qual os resultados serão comparados.')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO, help='Aumento relativo de tempo tolerado antes de acusar regressão (ex.: 0.1 = 10%%).')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="benchmark_pixerizador_") as diretorio:
+        resultados = executar(args.tamanhos, args.tipos, args.repeticoes, diretorio)
+
+    imprimir_tabela(resultados)
+
+    if args.salvar_baseline:
+        with open(args.salvar_baseline, 'w', encoding='utf-8') as arquivo:
+            json.dump({"maquina": platform.node(), "python": platform.python_version(), "resultados": resultados}, arquivo, indent=2)
+        print(f"Baseline gravada em {args.salvar_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as arquivo:
+            regressoes = comparar_com_baseline(resultados, json.load(arquivo), args.tolerancia)
+        for caso, estagio, anterior, atual in regressoes:
+            print(f"REGRESSÃO {caso} {estagio}: {anterior:.4f}s -> {atual:.4f}s ({(atual / anterior - 1) * 100:+.1f}%)")
+        if regressoes:
+            sys.exit(1)
+        print(f"Sem regressões acima de {args.tolerancia * 100:.0f}%.")
@@ -0,0 +1,59 @@
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import time
+
+# Permite importar o back-end a partir da raiz do projeto
+RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ_PROJETO, 'Source'))
+
+from Back import motor, estimador_area
+
+def imagens_de_exemplo():
+    """
+    Retorna as imagens de exemplo do projeto e suas áreas extraídas do nome do arquivo.
+    """
+    imagens = sorted(glob.glob(os.path.join(RAIZ_PROJETO, 'Assets', 'PNGs', '*.png')))
+    imagens += sorted(glob.glob(os.path.join(RAIZ_PROJETO, 'Assets', 'TIFs', '*.tif')))
+    areas = [estimador_area.extrair_area_km2_a_partir_do_nome_imagem(os.path.basename(imagem)) for imagem in imagens]
+    return imagens, areas
+
+def executar_subprocesso(imagens, areas):
+    """
+    Reproduz o caminho antigo da interface: um novo interpretador executando pixerizador.py por lote.
+    """
+    comando = [sys.executable, os.path.join(RAIZ_PROJETO, 'Source', 'Back', 'pixerizador.py'), '--imagens', *imagens, '--areas_km', *map(str, areas)]
+    subprocess.run(comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+
+def executar_motor(imagens, areas):
+    """
+    Caminho atual da interface: chamada direta à API do motor.
+    """
+    motor.processar(motor.RequisicaoProcessamento(imagens=imagens, areas_km2=areas))
+
+def medir(funcao, imagens, areas, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(imagens, areas)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), sum(tempos) / len(tempos)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara a latência por lote do subprocesso com a API do motor.")
+    parser.add_argument('--repeticoes', type=int, default=5, help='Quantidade de execuções de cada caminho.')
+    args = parser.parse_args()
+
+    imagens, areas = imagens_de_exemplo()
+    executar_motor(imagens, areas)  # Aquece os imports e o cache de disco do sistema.
+
+    minimo_sub, media_sub = medir(executar_subprocesso, imagens, areas, args.repeticoes)
+    minimo_motor, media_motor = medir(executar_motor, imagens, areas, args.repeticoes)
+
+    print(f"Lote de {len(imagens)} imagens, {args.repeticoes} repetições")
+    print(f"{'caminho':<12}{'mínimo (s)':>14}{'média (s)':>14}")
+    print(f"{'subprocesso':<12}{minimo_sub:>14.4f}{media_sub:>14.4f}")
+    print(f"{'motor':<12}{minimo_motor:>14.4f}{media_motor:>14.4f}")
+    print(f"Economia por lote (média): {media_sub - media_motor:.4f} s")
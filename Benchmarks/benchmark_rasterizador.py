@@ -0,0 +1,68 @@
+import argparse
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image, TiffImagePlugin
+
+RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RASTERIZADOR = os.path.join(RAIZ_PROJETO, 'Source', 'Back', 'rasterizador.py')
+
+TAMANHOS_PADRAO_MP = [1, 16, 64]
+BACKENDS = ("qgis", "numpy")
+
+def gerar_geotiff_sintetico(caminho, megapixels, semente=0):
+    """
+    Grava um GeoTIFF sintético de 8 bits (gradiente com ruído) georreferenciado em
+    graus sobre a América do Sul.
+
+    :param caminho: Caminho do arquivo a ser gravado.
+    :param megapixels: Quantidade aproximada de pixels, em milhões.
+    :param semente: Semente do gerador de números aleatórios.
+    """
+    lado = int(np.sqrt(megapixels * 1_000_000))
+    gerador = np.random.default_rng(semente)
+    gradiente = np.linspace(0, 200, lado, dtype=np.float32)[np.newaxis, :]
+    imagem = (gradiente + gerador.integers(0, 50, size=(lado, lado), dtype=np.uint8)).astype(np.uint8)
+
+    tags = TiffImagePlugin.ImageFileDirectory_v2()
+    tags[33550] = (40.0 / lado, 40.0 / lado, 0.0)
+    tags[33922] = (0.0, 0.0, 0.0, -80.0, 10.0, 0.0)
+    tags[34735] = (1, 1, 0, 1, 1024, 0, 1, 2)
+    Image.fromarray(imagem).save(caminho, tiffinfo=tags)
+
+def medir(backend, caminho_imagem, repeticoes, diretorio):
+    """
+    Executa o rasterizador em um novo processo e retorna o menor tempo, em segundos.
+    """
+    comando = [sys.executable, RASTERIZADOR, '--backend', backend, caminho_imagem]
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        subprocess.run(comando, cwd=diretorio, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara os backends qgis e numpy do rasterizador.")
+    parser.add_argument('--tamanhos', nargs='+', type=float, default=TAMANHOS_PADRAO_MP, help='Tamanhos dos rasters sintéticos, em megapixels.')
+    parser.add_argument('--repeticoes', type=int, default=3, help='Repetições de cada medida (vale o menor tempo).')
+    args = parser.parse_args()
+
+    backends = [backend for backend in BACKENDS if backend != "qgis" or importlib.util.find_spec("qgis") is not None]
+    if "qgis" not in backends:
+        print("QGIS não encontrado; apenas o backend numpy será medido.", file=sys.stderr)
+
+    print(f"{'tamanho (MP)':>12}{'backend':>10}{'tempo (s)':>12}{'MB/s':>10}")
+    with tempfile.TemporaryDirectory() as diretorio:
+        for megapixels in args.tamanhos:
+            caminho_imagem = os.path.join(diretorio, f"sintetico_{megapixels:g}mp.tif")
+            gerar_geotiff_sintetico(caminho_imagem, megapixels)
+            megabytes = os.path.getsize(caminho_imagem) / (1024 * 1024)
+            for backend in backends:
+                tempo = medir(backend, caminho_imagem, args.repeticoes, diretorio)
+                print(f"{megapixels:>12g}{backend:>10}{tempo:>12.3f}{megabytes / tempo:>10.1f}")
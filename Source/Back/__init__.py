@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Os módulos do back-end importam uns aos outros pelo nome (ex.: "import estimador_area"),
+# como quando pixerizador.py é executado diretamente. Incluir este diretório no sys.path
+# permite que a interface importe o pacote (ex.: "from Back import motor") sem alterar isso.
+_DIRETORIO_BACK = os.path.dirname(os.path.abspath(__file__))
+if _DIRETORIO_BACK not in sys.path:
+    sys.path.append(_DIRETORIO_BACK)
@@ -0,0 +1,110 @@
+import os
+from collections import OrderedDict
+import cv2
+import instrumentacao
+from metadados_imagem import sondar_imagem
+from entradas_matriciais import e_matriz, abrir_matriz, matriz_cinza
+
+# Orçamento padrão do cache (em bytes) para as imagens decodificadas de uma execução
+ORCAMENTO_PADRAO_BYTES = 512 * 1024 * 1024
+
+def decodificar_cinza(caminho_imagem, profundidade_nativa=False):
+    """
+    Decodifica a imagem em um único canal. Imagens de uma banda (sem paleta) são lidas
+    diretamente em cinza, sem passar por BGR, com o mesmo resultado de cv2.imread seguido
+    de cv2.cvtColor; as demais são convertidas com COLOR_BGR2GRAY. Matrizes (.npy, rasters
+    brutos e em memória, ver entradas_matriciais) são mapeadas, sem decodificação.
+
+    :param caminho_imagem: Caminho da imagem.
+    :param profundidade_nativa: Se True, mantém o tipo de dado do arquivo (uint16, float32
+        etc.); caso contrário, a imagem é reduzida a 8 bits como no cv2.imread padrão.
+    :return: Array 2D ou None se o arquivo não puder ser decodificado.
+    """
+    if e_matriz(caminho_imagem):
+        return matriz_cinza(abrir_matriz(caminho_imagem), profundidade_nativa)  # Visão da matriz, sem decodificação.
+
+    metadados = sondar_imagem(caminho_imagem)
+    banda_unica = metadados is not None and metadados["canais"] == 1 and not metadados["paleta"]
+    if profundidade_nativa:
+        flags = (cv2.IMREAD_GRAYSCALE if banda_unica else cv2.IMREAD_ANYCOLOR) | cv2.IMREAD_ANYDEPTH
+    else:
+        flags = cv2.IMREAD_GRAYSCALE if banda_unica else cv2.IMREAD_COLOR
+
+    with instrumentacao.etapa("decodificar", caminho_imagem):
+        imagem = cv2.imread(caminho_imagem, flags)
+    if imagem is None or imagem.ndim == 2:
+        return imagem
+    with instrumentacao.etapa("cvtColor", caminho_imagem):
+        return cv2.cvtColor(imagem, cv2.COLOR_BGRA2GRAY if imagem.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+
+class CacheImagens:
+    """
+    Cache das imagens decodificadas (em escala de cinza) durante uma execução.
+
+    As entradas são identificadas pelo caminho absoluto da imagem junto com a data de
+    modificação e o tamanho do arquivo, de modo que um arquivo alterado no meio do lote
+    é decodificado novamente. Quando o orçamento de bytes é ultrapassado, as imagens
+    usadas há mais tempo são descartadas (LRU).
+    """
+
+    def __init__(self, orcamento_bytes=ORCAMENTO_PADRAO_BYTES):
+        """
+        :param orcamento_bytes: Quantidade máxima de bytes mantida em memória pelo cache.
+        """
+        self.orcamento_bytes = orcamento_bytes
+        self.bytes_ocupados = 0
+        self.acertos = 0
+        self.decodificacoes = 0
+        self._entradas = OrderedDict()
+
+    def _chave(self, caminho_imagem):
+        estado = os.stat(caminho_imagem)
+        return (os.path.abspath(caminho_imagem), estado.st_mtime_ns, estado.st_size)
+
+    def obter_cinza(self, caminho_imagem, profundidade_nativa=False):
+        """
+        Retorna a imagem em escala de cinza, decodificando o arquivo apenas se ele
+        ainda não estiver no cache.
+
+        :param caminho_imagem: Caminho da imagem.
+        :param profundidade_nativa: Se True, mantém o tipo de dado do arquivo (ver decodificar_cinza).
+        :return: A imagem em escala de cinza ou None se o arquivo não puder ser lido.
+        """
+        if e_matriz(caminho_imagem):
+            # Matrizes (.npy, rasters brutos e em memória) são mapeadas, não decodificadas; não ocupam o orçamento.
+            return decodificar_cinza(caminho_imagem, profundidade_nativa)
+        if not os.path.exists(caminho_imagem):
+            return None
+
+        chave = self._chave(caminho_imagem) + (profundidade_nativa,)
+        imagem_cinza = self._entradas.get(chave)
+        if imagem_cinza is not None:
+            self._entradas.move_to_end(chave)  # Marca como usada mais recentemente.
+            self.acertos += 1
+            return imagem_cinza
+
+        imagem_cinza = decodificar_cinza(caminho_imagem, profundidade_nativa)
+        self.decodificacoes += 1
+        if imagem_cinza is None:
+            return None
+        self._armazenar(chave, imagem_cinza)
+        return imagem_cinza
+
+    def _armazenar(self, chave, imagem_cinza):
+        tamanho = imagem_cinza.nbytes
+        if tamanho > self.orcamento_bytes:
+            return  # A imagem sozinha não cabe no orçamento; não é armazenada.
+
+        while self._entradas and self.bytes_ocupados + tamanho > self.orcamento_bytes:
+            _, descartada = self._entradas.popitem(last=False)  # Remove a menos usada.
+            self.bytes_ocupados -= descartada.nbytes
+
+        self._entradas[chave] = imagem_cinza
+        self.bytes_ocupados += tamanho
+
+    def limpar(self):
+        """
+        Remove todas as imagens do cache.
+        """
+        self._entradas.clear()
+        self.bytes_ocupados = 0
@@ -0,0 +1,234 @@
+import hashlib
+import os
+import sqlite3
+import time
+import numpy as np
+
+# Orçamento padrão (em bytes) ocupado pelas entradas do cache em disco
+ORCAMENTO_PADRAO_BYTES = 256 * 1024 * 1024
+
+NOME_ARQUIVO_CACHE = "resultados.sqlite"
+TAMANHO_BLOCO_HASH = 1024 * 1024  # Bytes lidos por vez no cálculo do hash do conteúdo.
+INTERVALO_ACESSOS = 1000  # Acertos acumulados antes de gravar as datas de acesso em uma transação.
+INTERVALO_GRAVACOES = 256  # Entradas novas acumuladas antes de gravá-las em uma transação.
+
+def diretorio_cache_padrao():
+    """
+    Retorna o diretório padrão do cache persistente ($XDG_CACHE_HOME ou ~/.cache).
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "pixelareanormalizer")
+
+def identidade_arquivo(caminho_imagem, por_conteudo=False):
+    """
+    Identifica o conteúdo de um arquivo. A verificação rápida usa caminho, tamanho, data de
+    modificação e inode; a verificação por conteúdo usa o hash BLAKE2 dos bytes do arquivo,
+    de modo que cópias do mesmo arquivo compartilham a entrada.
+
+    :param caminho_imagem: Caminho do arquivo.
+    :param por_conteudo: Se True, usa o hash do conteúdo em vez dos metadados do arquivo.
+    :return: Texto que identifica o arquivo.
+    """
+    if por_conteudo:
+        resumo = hashlib.blake2b(digest_size=20)
+        with open(caminho_imagem, "rb") as arquivo:
+            for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO_HASH), b""):
+                resumo.update(bloco)
+        return "conteudo:" + resumo.hexdigest()
+
+    estado = os.stat(caminho_imagem)
+    return f"arquivo:{os.path.abspath(caminho_imagem)}|{estado.st_size}|{estado.st_mtime_ns}|{estado.st_ino}"
+
+class CacheResultados:
+    """
+    Cache persistente (SQLite) das estatísticas brutas de cada imagem: dimensões,
+    histograma de intensidades e, quando a área da imagem foi estimada, a área estimada.
+    As contagens e somas de qualquer limiar são derivadas do histograma, portanto uma
+    entrada serve para todos os limiares.
+
+    As entradas são identificadas pela identidade do arquivo e pelos parâmetros do kernel
+    (conversão para cinza e profundidade de bits). Quando o orçamento de bytes é
+    ultrapassado, as entradas acessadas há mais tempo são descartadas.
+
+    A chave de cada imagem é calculada uma única vez pelo chamador (chave) e usada tanto
+    na consulta quanto no armazenamento. As entradas novas e as datas de acesso das
+    consultas são acumuladas e gravadas em uma única transação (a cada
+    INTERVALO_GRAVACOES entradas, a cada INTERVALO_ACESSOS acertos, em gravar e ao
+    fechar), e o total de bytes ocupados é mantido em memória em vez de recalculado.
+    """
+
+    def __init__(self, diretorio=None, orcamento_bytes=ORCAMENTO_PADRAO_BYTES, reconstruir=False, por_conteudo=False):
+        """
+        :param diretorio: Diretório do arquivo SQLite (padrão: diretorio_cache_padrao()).
+        :param orcamento_bytes: Quantidade máxima de bytes de entradas mantidas em disco.
+        :param reconstruir: Se True, ignora as entradas existentes e as substitui pelos novos resultados.
+        :param por_conteudo: Se True, identifica os arquivos pelo hash do conteúdo.
+        """
+        self.diretorio = diretorio or diretorio_cache_padrao()
+        self.orcamento_bytes = orcamento_bytes
+        self.reconstruir = reconstruir
+        self.por_conteudo = por_conteudo
+        self.acertos = 0
+        self.falhas = 0
+        self._acessos = {}  # Datas de acesso ainda não gravadas, por chave.
+        self._pendentes = {}  # Entradas novas ainda não gravadas, por chave.
+
+        os.makedirs(self.diretorio, exist_ok=True)
+        self._conexao = sqlite3.connect(os.path.join(self.diretorio, NOME_ARQUIVO_CACHE), timeout=30)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS estatisticas ("
+            " chave TEXT PRIMARY KEY,"
+            " altura INTEGER NOT NULL,"
+            " largura INTEGER NOT NULL,"
+            " histograma BLOB NOT NULL,"
+            " tamanho_bytes INTEGER NOT NULL,"
+            " ultimo_acesso REAL NOT NULL,"
+            " area_estimada REAL)"
+        )
+        colunas = {coluna[1] for coluna in self._conexao.execute("PRAGMA table_info(estatisticas)")}
+        if "area_estimada" not in colunas:  # Cache gravado por uma versão anterior.
+            self._conexao.execute("ALTER TABLE estatisticas ADD COLUMN area_estimada REAL")
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_ultimo_acesso ON estatisticas (ultimo_acesso)")
+        self._conexao.commit()
+        # Total calculado uma vez; outros processos que gravem no mesmo arquivo só são
+        # considerados na próxima abertura.
+        self._bytes_ocupados, = self._conexao.execute("SELECT COALESCE(SUM(tamanho_bytes), 0) FROM estatisticas").fetchone()
+
+    def chave(self, caminho_imagem, parametros_kernel):
+        """
+        Identifica a entrada de uma imagem (ver identidade_arquivo). Com a identificação
+        por conteúdo, o arquivo é lido por inteiro; por isso a chave deve ser calculada
+        uma vez e reaproveitada em obter e armazenar.
+
+        :param caminho_imagem: Caminho da imagem.
+        :param parametros_kernel: Texto que descreve os parâmetros do kernel usado.
+        :return: Texto da chave ou None se o arquivo não existir.
+        """
+        try:
+            return f"{identidade_arquivo(caminho_imagem, self.por_conteudo)}|{parametros_kernel}"
+        except OSError:
+            return None  # Arquivo inexistente: o erro é tratado pelo processamento normal.
+
+    def obter(self, chave):
+        """
+        Busca as estatísticas brutas de uma imagem.
+
+        :param chave: Chave da imagem (ver chave) ou None.
+        :return: Dicionário com altura, largura, histograma e area_estimada (None se a área
+            não tiver sido estimada), ou None se não houver entrada.
+        """
+        entrada = self.consultar(chave)
+        if entrada is None:
+            if chave is not None:
+                self.falhas += 1
+            return None
+
+        self._acessos[chave] = time.time()
+        if len(self._acessos) >= INTERVALO_ACESSOS:
+            self._gravar_acessos()
+            self._conexao.commit()
+        self.acertos += 1
+        return entrada
+
+    def consultar(self, chave):
+        """
+        Igual a obter, sem contar o acerto nem registrar o acesso (ex.: na medição de um
+        lote em fluxo).
+        """
+        if chave is None or (self.reconstruir and chave not in self._pendentes):
+            return None
+        linha = self._pendentes.get(chave)
+        if linha is None:
+            linha = self._conexao.execute(
+                "SELECT altura, largura, histograma, area_estimada FROM estatisticas WHERE chave = ?", (chave,)
+            ).fetchone()
+        if linha is None:
+            return None
+        altura, largura, histograma, area_estimada = linha
+        return {
+            "altura": altura,
+            "largura": largura,
+            "histograma": np.frombuffer(histograma, dtype=np.int64).copy(),
+            "area_estimada": area_estimada
+        }
+
+    def armazenar(self, chave, altura, largura, histograma, area_estimada=None):
+        """
+        Acrescenta as estatísticas brutas de uma imagem às entradas pendentes, gravando o
+        bloco acumulado (e aplicando o orçamento de bytes) a cada INTERVALO_GRAVACOES entradas.
+
+        :param chave: Chave da imagem (ver chave), calculada antes do processamento; None não armazena.
+        :param altura: Altura da imagem em pixels.
+        :param largura: Largura da imagem em pixels.
+        :param histograma: Histograma de intensidades da imagem.
+        :param area_estimada: Área estimada da imagem em km², quando ela não foi informada.
+        """
+        if chave is None:
+            return
+        dados = np.ascontiguousarray(histograma, dtype=np.int64).tobytes()
+        self._pendentes[chave] = (int(altura), int(largura), dados, None if area_estimada is None else float(area_estimada))
+        self._acessos.pop(chave, None)
+        if len(self._pendentes) >= INTERVALO_GRAVACOES:
+            self.gravar()
+
+    def gravar(self):
+        """
+        Grava as entradas pendentes e as datas de acesso em uma única transação e aplica o
+        orçamento de bytes.
+        """
+        if self._pendentes:
+            chaves = list(self._pendentes)
+            anteriores = {}
+            for inicio in range(0, len(chaves), 500):  # Abaixo do limite de parâmetros do SQLite.
+                bloco = chaves[inicio:inicio + 500]
+                anteriores.update(self._conexao.execute(
+                    f"SELECT chave, tamanho_bytes FROM estatisticas WHERE chave IN ({','.join('?' * len(bloco))})", bloco
+                ))
+            agora = time.time()
+            linhas = []
+            for chave, (altura, largura, dados, area_estimada) in self._pendentes.items():
+                tamanho = len(chave) + len(dados)
+                self._bytes_ocupados += tamanho - anteriores.get(chave, 0)
+                linhas.append((chave, altura, largura, dados, tamanho, agora, area_estimada))
+            self._conexao.executemany("INSERT OR REPLACE INTO estatisticas VALUES (?, ?, ?, ?, ?, ?, ?)", linhas)
+            self._pendentes = {}
+        self._gravar_acessos()
+        self._descartar_excedente()
+        self._conexao.commit()
+
+    def _gravar_acessos(self):
+        if self._acessos:
+            self._conexao.executemany("UPDATE estatisticas SET ultimo_acesso = ? WHERE chave = ?", [(data, chave) for chave, data in self._acessos.items()])
+            self._acessos = {}
+
+    def _descartar_excedente(self):
+        if self._bytes_ocupados <= self.orcamento_bytes:
+            return
+        excedente = self._bytes_ocupados - self.orcamento_bytes
+        descartados = 0
+        chaves = []
+        for chave, tamanho in self._conexao.execute("SELECT chave, tamanho_bytes FROM estatisticas ORDER BY ultimo_acesso"):
+            chaves.append((chave,))
+            descartados += tamanho
+            if descartados >= excedente:
+                break
+        self._conexao.executemany("DELETE FROM estatisticas WHERE chave = ?", chaves)
+        self._bytes_ocupados -= descartados
+
+    def limpar(self):
+        """
+        Remove todas as entradas do cache.
+        """
+        self._conexao.execute("DELETE FROM estatisticas")
+        self._conexao.commit()
+        self._acessos = {}
+        self._pendentes = {}
+        self._bytes_ocupados = 0
+
+    def fechar(self):
+        """
+        Grava as entradas e as datas de acesso pendentes e fecha a conexão.
+        """
+        self.gravar()
+        self._conexao.close()
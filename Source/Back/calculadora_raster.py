@@ -0,0 +1,131 @@
+import os
+from xml.sax.saxutils import escape
+import numpy as np
+from PIL import Image
+from escritor_geotiff import EscritorGeoTIFF, TAMANHO_TILE_PADRAO, NIVEL_COMPRESSAO_PADRAO
+from geometria_pixels import ler_tags_geotiff
+from leitor_faixas import abrir_faixas_banda, BYTES_POR_FAIXA_PADRAO
+import instrumentacao
+
+def multiplicar_raster(caminho_entrada, caminho_saida, fator, bytes_por_faixa=BYTES_POR_FAIXA_PADRAO,
+                       tamanho_tile=TAMANHO_TILE_PADRAO, nivel_compressao=NIVEL_COMPRESSAO_PADRAO):
+    """
+    Equivalente à expressão `layer@1 * fator` da calculadora raster do QGIS, sem o QGIS:
+    a banda 1 é lida em faixas, multiplicada pelo fator e gravada em um GeoTIFF em tiles
+    comprimidos, com o georreferenciamento da entrada. O histograma da banda é acumulado
+    na mesma passada.
+
+    :param caminho_entrada: Caminho do raster de entrada.
+    :param caminho_saida: Caminho do GeoTIFF de saída (float32).
+    :param fator: Valor que multiplica a banda 1 (ex.: a área normalizada).
+    :param bytes_por_faixa: Quantidade máxima de bytes decodificados por faixa.
+    :param tamanho_tile: Largura e altura dos tiles da saída, em pixels.
+    :param nivel_compressao: Nível de compressão do zlib (1 a 9).
+    :return: Histograma da banda 1 (uma posição por valor inteiro), ou None se a banda não
+        for inteira.
+    """
+    altura, largura, faixas = _abrir_banda(caminho_entrada, bytes_por_faixa)
+    with EscritorGeoTIFF(caminho_saida, altura, largura, tags_geo=ler_tags_geotiff(caminho_entrada),
+                         tamanho_tile=tamanho_tile, nivel_compressao=nivel_compressao) as escritor:
+        return _multiplicar_faixas(escritor, 0, faixas, fator, caminho_entrada)
+
+def empilhar_rasters(caminhos_entrada, fatores, caminho_saida, bytes_por_faixa=BYTES_POR_FAIXA_PADRAO,
+                     tamanho_tile=TAMANHO_TILE_PADRAO, nivel_compressao=NIVEL_COMPRESSAO_PADRAO):
+    """
+    Como multiplicar_raster, mas grava todos os rasters em um único GeoTIFF, uma banda
+    por entrada, na ordem recebida. Todas as entradas devem ter as mesmas dimensões; o
+    georreferenciamento é o da primeira.
+
+    :param caminhos_entrada: Caminhos dos rasters de entrada.
+    :param fatores: Fator de cada entrada (ex.: a área normalizada).
+    :param caminho_saida: Caminho do GeoTIFF de saída (float32, uma banda por entrada).
+    :param bytes_por_faixa: Quantidade máxima de bytes decodificados por faixa.
+    :param tamanho_tile: Largura e altura dos tiles da saída, em pixels.
+    :param nivel_compressao: Nível de compressão do zlib (1 a 9).
+    :return: Lista com o histograma da banda 1 de cada entrada.
+    """
+    dimensoes = []
+    for caminho in caminhos_entrada:
+        with Image.open(caminho) as imagem:
+            dimensoes.append(imagem.size)
+    largura, altura = dimensoes[0]
+    for caminho, (largura_entrada, altura_entrada) in zip(caminhos_entrada, dimensoes):
+        if (largura_entrada, altura_entrada) != (largura, altura):
+            raise ValueError(f"Dimensões de {caminho} ({largura_entrada} x {altura_entrada}) diferentes das "
+                             f"da primeira camada ({largura} x {altura}); não é possível empilhá-las.")
+
+    histogramas = []
+    with EscritorGeoTIFF(caminho_saida, altura, largura, bandas=len(caminhos_entrada), tags_geo=ler_tags_geotiff(caminhos_entrada[0]),
+                         tamanho_tile=tamanho_tile, nivel_compressao=nivel_compressao) as escritor:
+        for banda, (caminho, fator) in enumerate(zip(caminhos_entrada, fatores)):
+            _, _, faixas = _abrir_banda(caminho, bytes_por_faixa)  # Uma entrada aberta por vez.
+            histogramas.append(_multiplicar_faixas(escritor, banda, faixas, fator, caminho))
+    return histogramas
+
+def escrever_vrt(caminho_vrt, caminhos_rasters, altura, largura, geotransform=None):
+    """
+    Grava um VRT (raster virtual do GDAL) que empilha rasters de uma banda já gravados,
+    um por banda, sem copiar os dados.
+
+    :param caminho_vrt: Caminho do arquivo .vrt.
+    :param caminhos_rasters: Caminhos dos rasters float32, na ordem das bandas.
+    :param altura: Altura comum dos rasters, em pixels.
+    :param largura: Largura comum dos rasters, em pixels.
+    :param geotransform: Geotransform no formato do GDAL, se houver.
+    """
+    diretorio = os.path.dirname(os.path.abspath(caminho_vrt))
+    linhas = [f'<VRTDataset rasterXSize="{largura}" rasterYSize="{altura}">']
+    if geotransform is not None:
+        linhas.append(f"  <GeoTransform>{', '.join(repr(float(valor)) for valor in geotransform)}</GeoTransform>")
+    for banda, caminho in enumerate(caminhos_rasters, start=1):
+        relativo = os.path.relpath(os.path.abspath(caminho), diretorio)
+        linhas += [
+            f'  <VRTRasterBand dataType="Float32" band="{banda}">',
+            f"    <Description>{escape(os.path.basename(caminho))}</Description>",
+            "    <SimpleSource>",
+            f'      <SourceFilename relativeToVRT="1">{escape(relativo)}</SourceFilename>',
+            "      <SourceBand>1</SourceBand>",
+            f'      <SrcRect xOff="0" yOff="0" xSize="{largura}" ySize="{altura}" />',
+            f'      <DstRect xOff="0" yOff="0" xSize="{largura}" ySize="{altura}" />',
+            "    </SimpleSource>",
+            "  </VRTRasterBand>"
+        ]
+    linhas.append("</VRTDataset>")
+    with open(caminho_vrt, "w", encoding="utf-8") as arquivo:
+        arquivo.write("\n".join(linhas) + "\n")
+
+def _multiplicar_faixas(escritor, banda, faixas, fator, caminho_entrada):
+    """
+    Multiplica as faixas de uma banda pelo fator, gravando-as no escritor, e retorna o
+    histograma acumulado na mesma passada (None se a banda não for inteira).
+    """
+    histograma = None
+    for faixa in faixas:
+        if faixa.dtype.kind in "ub":
+            with instrumentacao.etapa("histograma", caminho_entrada):
+                contagem = np.bincount(faixa.ravel(), minlength=256)
+            histograma = contagem if histograma is None else _somar_histogramas(histograma, contagem)
+        with instrumentacao.etapa("multiplicar", caminho_entrada):
+            escritor.escrever_faixa((faixa * np.float64(fator)).astype(np.float32), banda)
+    return histograma
+
+def _abrir_banda(caminho_imagem, bytes_por_faixa):
+    """
+    Abre a banda 1 em faixas; formatos que não permitem a leitura em faixas são
+    decodificados por inteiro, em uma única faixa.
+    """
+    leitura = abrir_faixas_banda(caminho_imagem, bytes_por_faixa)
+    if leitura is not None:
+        return leitura
+
+    with Image.open(caminho_imagem) as imagem:
+        banda = np.asarray(imagem.getchannel(0) if len(imagem.getbands()) > 1 else imagem)
+    if banda.dtype == np.bool_:
+        banda = banda.view(np.uint8)
+    return banda.shape[0], banda.shape[1], iter((banda,))
+
+def _somar_histogramas(acumulado, contagem):
+    if contagem.size > acumulado.size:
+        acumulado, contagem = contagem, acumulado
+    acumulado[:contagem.size] += contagem
+    return acumulado
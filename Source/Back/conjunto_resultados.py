@@ -0,0 +1,274 @@
+import numpy as np
+
+QUANTIDADE_NIVEIS_PADRAO = 256  # Posições de cada histograma.
+
+# Colunas escalares (uma posição por imagem) e o valor que marca a ausência de cada uma
+COLUNAS_ESCALARES = {
+    "soma_ponderada": (np.float64, np.nan),
+    "area_por_pixel": (np.float64, np.nan),
+    "area_normalizada": (np.float64, np.nan),
+    "contagem_pixels_claros": (np.int64, -1)
+}
+
+class ConjuntoResultados:
+    """
+    Resultados de um lote em colunas NumPy: um vetor float64 por campo escalar, a
+    contagem de pixels claros em int64 e os histogramas em uma única matriz (N, 256)
+    int64. Valores ausentes (imagens com erro) são NaN nos vetores float64, -1 na
+    contagem e zeros no histograma; a coluna `erros` indica quais imagens falharam.
+
+    Fatias (conjunto[inicio:fim]) compartilham a memória das colunas, sem cópia; máscaras
+    e listas de índices copiam as linhas selecionadas, como no NumPy. A iteração e
+    registro() entregam os mesmos dicionários de pixerizador.registra_processamento.
+    """
+
+    def __init__(self, caminhos, erros, soma_ponderada, area_por_pixel, area_normalizada,
+                 contagem_pixels_claros, histogramas, limiares=None, varredura_soma_ponderada=None,
+                 varredura_contagem_pixels_claros=None):
+        """
+        :param caminhos: Vetor (N,) de caminhos das imagens.
+        :param erros: Vetor (N,) com a mensagem de erro de cada imagem, ou None.
+        :param soma_ponderada: Vetor float64 (N,).
+        :param area_por_pixel: Vetor float64 (N,).
+        :param area_normalizada: Vetor float64 (N,).
+        :param contagem_pixels_claros: Vetor int64 (N,).
+        :param histogramas: Matriz int64 (N, níveis).
+        :param limiares: Limiares da varredura (apenas quando mais de um foi avaliado).
+        :param varredura_soma_ponderada: Matriz float64 (N, limiares).
+        :param varredura_contagem_pixels_claros: Matriz int64 (N, limiares).
+        """
+        self.caminhos = caminhos
+        self.erros = erros
+        self.soma_ponderada = soma_ponderada
+        self.area_por_pixel = area_por_pixel
+        self.area_normalizada = area_normalizada
+        self.contagem_pixels_claros = contagem_pixels_claros
+        self.histogramas = histogramas
+        self.limiares = limiares
+        self.varredura_soma_ponderada = varredura_soma_ponderada
+        self.varredura_contagem_pixels_claros = varredura_contagem_pixels_claros
+        self._validos = None  # Máscara de validos, refeita quando uma linha é definida.
+
+    @classmethod
+    def vazio(cls, quantidade, limiares=None, quantidade_niveis=QUANTIDADE_NIVEIS_PADRAO):
+        """
+        Cria um conjunto com N linhas ausentes, a serem preenchidas por definir() ou definir_bruto().
+
+        :param quantidade: Quantidade de imagens (N).
+        :param limiares: Lista de limiares avaliados; com mais de um, a varredura também é guardada.
+        :param quantidade_niveis: Posições de cada histograma.
+        """
+        colunas = {nome: np.full(quantidade, ausente, dtype=tipo) for nome, (tipo, ausente) in COLUNAS_ESCALARES.items()}
+        varredura = limiares is not None and len(limiares) > 1
+        return cls(
+            np.empty(quantidade, dtype=object),
+            np.full(quantidade, None, dtype=object),
+            histogramas=np.zeros((quantidade, quantidade_niveis), dtype=np.int64),
+            limiares=np.asarray(limiares, dtype=np.int64) if varredura else None,
+            varredura_soma_ponderada=np.full((quantidade, len(limiares)), np.nan) if varredura else None,
+            varredura_contagem_pixels_claros=np.full((quantidade, len(limiares)), -1, dtype=np.int64) if varredura else None,
+            **colunas
+        )
+
+    @classmethod
+    def de_resultados(cls, resultados, limiares=None):
+        """
+        Monta o conjunto a partir de resultados por imagem (dicionários de
+        registra_processamento ou objetos com os mesmos atributos).
+
+        :param resultados: Lista de resultados, na ordem das imagens.
+        :param limiares: Lista de limiares avaliados (necessária para guardar a varredura).
+        """
+        registros = [resultado if isinstance(resultado, dict) else vars(resultado) for resultado in resultados]
+        niveis = next((len(registro["histograma"]) for registro in registros if registro.get("histograma") is not None), QUANTIDADE_NIVEIS_PADRAO)
+        conjunto = cls.vazio(len(registros), limiares, niveis)
+        for indice, registro in enumerate(registros):
+            conjunto.definir(indice, registro)
+        return conjunto
+
+    @classmethod
+    def de_brutos(cls, brutos, areas_normalizadas, limiares):
+        """
+        Monta o conjunto diretamente das estatísticas brutas (pixerizador.processar_imagem),
+        sem converter os histogramas em listas.
+
+        :param brutos: Lista de estatísticas brutas, na ordem das imagens.
+        :param areas_normalizadas: Área normalizada de cada imagem (None para as imagens com erro).
+        :param limiares: Lista de limiares avaliados.
+        """
+        niveis = next((len(bruto["histograma"]) for bruto in brutos if bruto.get("histograma") is not None), QUANTIDADE_NIVEIS_PADRAO)
+        conjunto = cls.vazio(len(brutos), limiares, niveis)
+        for indice, (bruto, area_normalizada) in enumerate(zip(brutos, areas_normalizadas)):
+            conjunto.definir_bruto(indice, bruto, area_normalizada)
+        return conjunto
+
+    def definir(self, indice, resultado):
+        """
+        Preenche uma linha a partir de um dicionário de resultado.
+        """
+        self.caminhos[indice] = resultado["caminho_imagem"]
+        self.erros[indice] = resultado["erro_processamento"]
+        self._validos = None
+        for nome, (_, ausente) in COLUNAS_ESCALARES.items():
+            valor = resultado.get(nome)
+            getattr(self, nome)[indice] = ausente if valor is None else valor
+        if resultado.get("histograma") is not None:
+            self.histogramas[indice] = resultado["histograma"]
+        if self.limiares is not None and resultado.get("varredura_limiares"):
+            self.varredura_soma_ponderada[indice] = [item["soma_ponderada"] for item in resultado["varredura_limiares"]]
+            self.varredura_contagem_pixels_claros[indice] = [item["contagem_pixels_claros"] for item in resultado["varredura_limiares"]]
+
+    def definir_bruto(self, indice, bruto, area_normalizada):
+        """
+        Preenche uma linha a partir das estatísticas brutas de uma imagem, aplicando a
+        área normalizada (como pixerizador.consolidar_resultado).
+        """
+        self.caminhos[indice] = bruto["caminho_imagem"]
+        self.erros[indice] = bruto["erro_processamento"]
+        self._validos = None
+        if bruto["erro_processamento"] is not None:
+            return
+
+        contagens, somas = zip(*bruto["estatisticas"])
+        self.soma_ponderada[indice] = somas[0] * area_normalizada
+        self.area_por_pixel[indice] = bruto["area_por_pixel"]
+        self.area_normalizada[indice] = area_normalizada
+        self.contagem_pixels_claros[indice] = contagens[0]
+        self.histogramas[indice] = bruto["histograma"]
+        if self.limiares is not None:
+            self.varredura_soma_ponderada[indice] = [soma * area_normalizada for soma in somas]
+            self.varredura_contagem_pixels_claros[indice] = contagens
+
+    def __len__(self):
+        return len(self.caminhos)
+
+    def __getitem__(self, selecao):
+        """
+        Com um inteiro, retorna o dicionário da imagem; com uma fatia, máscara ou lista de
+        índices, retorna um ConjuntoResultados com as linhas selecionadas.
+        """
+        if isinstance(selecao, (int, np.integer)):
+            return self.registro(selecao)
+        return ConjuntoResultados(
+            self.caminhos[selecao], self.erros[selecao], self.soma_ponderada[selecao], self.area_por_pixel[selecao],
+            self.area_normalizada[selecao], self.contagem_pixels_claros[selecao], self.histogramas[selecao],
+            self.limiares,
+            None if self.varredura_soma_ponderada is None else self.varredura_soma_ponderada[selecao],
+            None if self.varredura_contagem_pixels_claros is None else self.varredura_contagem_pixels_claros[selecao]
+        )
+
+    def __iter__(self):
+        return (self.registro(indice) for indice in range(len(self)))
+
+    def registro(self, indice):
+        """
+        Retorna o resultado de uma imagem no formato de pixerizador.registra_processamento.
+        """
+        erro = self.erros[indice]
+        resultado = {"erro_processamento": erro, "caminho_imagem": self.caminhos[indice]}
+        if erro is not None:
+            resultado.update(soma_ponderada=None, area_por_pixel=None, area_normalizada=None, histograma=None, contagem_pixels_claros=None)
+            return resultado
+
+        resultado.update(
+            soma_ponderada=float(self.soma_ponderada[indice]),
+            area_por_pixel=float(self.area_por_pixel[indice]),
+            area_normalizada=float(self.area_normalizada[indice]),
+            histograma=self.histogramas[indice].tolist(),
+            contagem_pixels_claros=int(self.contagem_pixels_claros[indice])
+        )
+        if self.limiares is not None:
+            resultado["varredura_limiares"] = [
+                {"limiar": int(limiar), "soma_ponderada": float(soma), "contagem_pixels_claros": int(contagem)}
+                for limiar, soma, contagem in zip(self.limiares, self.varredura_soma_ponderada[indice], self.varredura_contagem_pixels_claros[indice])
+            ]
+        return resultado
+
+    def como_dicts(self):
+        """
+        Retorna a lista de dicionários de resultado (formato da saída repr).
+        """
+        return list(self)
+
+    @property
+    def validos(self):
+        """
+        Máscara booleana das imagens processadas sem erro, calculada a partir da coluna
+        de erros e mantida até que uma linha seja definida novamente.
+        """
+        if self._validos is None or len(self._validos) != len(self.erros):
+            self._validos = np.equal(self.erros, None)
+            self._validos.flags.writeable = False  # Compartilhada entre as chamadas.
+        return self._validos
+
+    def histograma_total(self):
+        """
+        Soma dos histogramas de todas as imagens (as imagens com erro têm histograma nulo).
+        """
+        return self.histogramas.sum(axis=0)
+
+    def histograma_medio(self):
+        """
+        Média dos histogramas das imagens sem erro.
+        """
+        validos = self.validos
+        if not validos.any():
+            return np.zeros(self.histogramas.shape[1])
+        return self.histogramas[validos].mean(axis=0)
+
+    def percentuais(self, coluna="soma_ponderada"):
+        """
+        Participação percentual de cada imagem no total de uma coluna escalar (ex.: o
+        percentual do consumo de energia). As imagens com erro ficam com NaN.
+
+        :param coluna: Nome da coluna escalar.
+        :return: Vetor float64 (N,) cuja soma, nas imagens sem erro, é 100.
+        """
+        valores = np.where(self.validos, getattr(self, coluna), np.nan).astype(np.float64)
+        total = np.nansum(valores)
+        return valores * (100.0 / total) if total else np.where(self.validos, 0.0, np.nan)
+
+    def salvar(self, caminho_saida):
+        """
+        Grava o conjunto em um arquivo .npz comprimido, sem perda: carregar() devolve as
+        mesmas colunas, inclusive a distinção entre erro e ausência de erro.
+
+        :param caminho_saida: Caminho do arquivo .npz.
+        """
+        colunas = {nome: getattr(self, nome) for nome in COLUNAS_ESCALARES}
+        if self.limiares is not None:
+            colunas.update(
+                limiares=self.limiares,
+                varredura_soma_ponderada=self.varredura_soma_ponderada,
+                varredura_contagem_pixels_claros=self.varredura_contagem_pixels_claros
+            )
+        np.savez_compressed(
+            caminho_saida,
+            caminho_imagem=np.asarray([str(caminho) for caminho in self.caminhos], dtype=str),
+            erro_processamento=np.asarray([erro or "" for erro in self.erros], dtype=str),
+            possui_erro=~self.validos,
+            histogramas=self.histogramas,
+            **colunas
+        )
+
+    @classmethod
+    def carregar(cls, caminho_arquivo):
+        """
+        Lê um conjunto gravado por salvar() ou por saida_resultados.escrever_npz, que usam
+        o mesmo esquema.
+
+        :param caminho_arquivo: Caminho do arquivo .npz.
+        """
+        with np.load(caminho_arquivo, allow_pickle=False) as arquivo:
+            possui_erro = arquivo["possui_erro"]
+            erros = np.array([erro if falhou else None for erro, falhou in zip(arquivo["erro_processamento"].tolist(), possui_erro)], dtype=object)
+            varredura = "limiares" in arquivo.files
+            return cls(
+                np.array(arquivo["caminho_imagem"].tolist(), dtype=object),
+                erros,
+                histogramas=arquivo["histogramas"],
+                limiares=arquivo["limiares"] if varredura else None,
+                varredura_soma_ponderada=arquivo["varredura_soma_ponderada"] if varredura else None,
+                varredura_contagem_pixels_claros=arquivo["varredura_contagem_pixels_claros"] if varredura else None,
+                **{nome: arquivo[nome] for nome in COLUNAS_ESCALARES}
+            )
@@ -0,0 +1,184 @@
+import json
+import os
+import time
+import numpy as np
+from logger import logging
+
+VERSAO_DIARIO = 2  # Incrementada quando o formato dos registros muda.
+INTERVALO_IMAGENS_PADRAO = 100  # Imagens concluídas acumuladas antes de cada gravação.
+INTERVALO_SEGUNDOS_PADRAO = 60.0  # Tempo máximo entre gravações enquanto há imagens pendentes.
+
+# Campos das estatísticas brutas (pixerizador.processar_imagem) guardados no diário
+CAMPOS_BRUTO = ("erro_processamento", "caminho_imagem", "area_km2", "altura", "largura", "area_por_pixel", "limiar")
+
+# Campos NumPy das estatísticas brutas, gravados como listas; pesos_linhas e
+# histograma_ponderado existem apenas no modo georreferenciado.
+CAMPOS_MATRIZES = {"histograma": np.int64, "pesos_linhas": np.float64, "histograma_ponderado": np.float64}
+
+def parametros_diario(kernel, limiares):
+    """
+    Identifica os parâmetros que determinam as estatísticas brutas de um lote; um diário
+    só pode ser retomado com os mesmos parâmetros.
+
+    :param kernel: ParametrosKernel do histograma.
+    :param limiares: Lista de limiares avaliados.
+    :return: Texto com os parâmetros.
+    """
+    return f"{kernel.chave};limiares={','.join(str(int(limiar)) for limiar in limiares)}"
+
+def chave_entrada(caminho_imagem, area_km2, limiar=None, georreferencia=None):
+    """
+    Identifica uma entrada do lote no diário: a mesma imagem com outra área, outro
+    limiar próprio ou outra georreferência é uma nova entrada.
+    """
+    return json.dumps([str(caminho_imagem), area_km2, limiar, georreferencia])
+
+def verificar_diario(caminho_diario, parametros):
+    """
+    Verifica, sem modificá-lo, se um diário pode ser retomado com os parâmetros informados.
+
+    :raises ValueError: Se o arquivo não for um diário ou tiver sido gravado com outros parâmetros.
+    """
+    if os.path.exists(caminho_diario):
+        with open(caminho_diario, "rb") as arquivo:
+            _verificar_cabecalho(arquivo.readline(), caminho_diario, parametros)
+
+class DiarioProcessamento:
+    """
+    Diário das imagens concluídas de um lote longo: as estatísticas brutas (não
+    normalizadas) de cada imagem, inclusive as que falharam com sua mensagem de erro,
+    são acrescentadas a um arquivo NDJSON. Os registros são acumulados e gravados em
+    bloco, com fsync, a cada `intervalo_imagens` imagens ou `intervalo_segundos`
+    segundos; uma interrupção perde no máximo o bloco em andamento, e uma última linha
+    incompleta é descartada ao retomar.
+    """
+
+    def __init__(self, caminho_diario, parametros, retomar=False, repetir_falhas=False,
+                 intervalo_imagens=INTERVALO_IMAGENS_PADRAO, intervalo_segundos=INTERVALO_SEGUNDOS_PADRAO):
+        """
+        :param caminho_diario: Caminho do arquivo do diário.
+        :param parametros: Parâmetros do lote (ver parametros_diario).
+        :param retomar: Se True e o diário existir, reaproveita as imagens já registradas;
+            caso contrário, o diário é recriado.
+        :param repetir_falhas: Se True, as imagens registradas com erro são processadas novamente.
+        :param intervalo_imagens: Imagens acumuladas antes de cada gravação.
+        :param intervalo_segundos: Tempo máximo entre gravações.
+        :raises ValueError: Se o diário a ser retomado tiver sido gravado com outros parâmetros.
+        """
+        self.caminho_diario = caminho_diario
+        self.repetir_falhas = repetir_falhas
+        self.intervalo_imagens = max(1, intervalo_imagens)
+        self.intervalo_segundos = intervalo_segundos
+        self.retomadas = 0
+        self._registros = {}
+        self._pendentes = []
+        self._ultima_gravacao = time.monotonic()
+
+        if retomar and os.path.exists(caminho_diario):
+            tamanho_valido = self._carregar(parametros)
+            self._arquivo = open(caminho_diario, "r+b")
+            self._arquivo.truncate(tamanho_valido)  # Descarta uma última linha incompleta.
+            self._arquivo.seek(tamanho_valido)
+        else:
+            self._arquivo = open(caminho_diario, "wb")
+            self._escrever([{"diario_pixerizador": VERSAO_DIARIO, "parametros": parametros}])
+
+    def obter(self, chave):
+        """
+        Estatísticas brutas registradas para uma entrada do lote (ver chave_entrada), ou
+        None se ela ainda não foi concluída (ou falhou e repetir_falhas está ativo).
+        """
+        bruto = self.consultar(chave)
+        if bruto is not None:
+            self.retomadas += 1
+        return bruto
+
+    def consultar(self, chave):
+        """
+        Igual a obter, sem contar a entrada como retomada (ex.: na medição de um lote em fluxo).
+        """
+        bruto = self._registros.get(chave)
+        if bruto is None or (self.repetir_falhas and bruto["erro_processamento"] is not None):
+            return None
+        return dict(bruto)
+
+    def registrar(self, chave, bruto):
+        """
+        Acrescenta as estatísticas brutas de uma imagem concluída, gravando o bloco
+        acumulado quando um dos intervalos é atingido.
+        """
+        registro = {campo: bruto.get(campo) for campo in CAMPOS_BRUTO}
+        for campo in CAMPOS_MATRIZES:
+            registro[campo] = None if bruto.get(campo) is None else np.asarray(bruto[campo]).tolist()
+        registro["estatisticas"] = bruto.get("estatisticas")
+        self._pendentes.append({"chave": chave, "bruto": registro})
+        if len(self._pendentes) >= self.intervalo_imagens or time.monotonic() - self._ultima_gravacao >= self.intervalo_segundos:
+            self.gravar()
+
+    def gravar(self):
+        """
+        Grava os registros acumulados em uma única escrita, seguida de fsync.
+        """
+        if self._pendentes:
+            self._escrever(self._pendentes)
+            self._pendentes = []
+
+    def fechar(self):
+        """
+        Grava os registros pendentes e fecha o arquivo.
+        """
+        if not self._arquivo.closed:
+            self.gravar()
+            self._arquivo.close()
+            if self.retomadas:
+                logging.info("Diário %s: %d imagens retomadas.", self.caminho_diario, self.retomadas)
+
+    def _escrever(self, registros):
+        linhas = "".join(json.dumps(registro, ensure_ascii=False, default=_converter_escalar) + "\n" for registro in registros)
+        self._arquivo.write(linhas.encode("utf-8"))
+        self._arquivo.flush()
+        os.fsync(self._arquivo.fileno())
+        self._ultima_gravacao = time.monotonic()
+
+    def _carregar(self, parametros):
+        with open(self.caminho_diario, "rb") as arquivo:
+            cabecalho = arquivo.readline()
+            _verificar_cabecalho(cabecalho, self.caminho_diario, parametros)
+            tamanho_valido = len(cabecalho)
+            for linha in arquivo:
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError:
+                    logging.warning("Diário %s: registro incompleto descartado.", self.caminho_diario)
+                    break  # Apenas a última linha pode estar incompleta (interrupção durante a gravação).
+                if not linha.endswith(b"\n"):
+                    break
+                self._registros[registro["chave"]] = _bruto_do_registro(registro["bruto"])  # O registro mais recente prevalece.
+                tamanho_valido += len(linha)
+        return tamanho_valido
+
+def _verificar_cabecalho(linha, caminho_diario, parametros):
+    try:
+        cabecalho = json.loads(linha)
+    except json.JSONDecodeError:
+        cabecalho = None
+    if not isinstance(cabecalho, dict) or cabecalho.get("diario_pixerizador") != VERSAO_DIARIO:
+        raise ValueError(f"{caminho_diario} não é um diário do pixerizador na versão {VERSAO_DIARIO}.")
+    if cabecalho.get("parametros") != parametros:
+        raise ValueError(f"O diário {caminho_diario} foi gravado com outros parâmetros ({cabecalho.get('parametros')}); use os mesmos parâmetros ou um novo diário.")
+
+def _bruto_do_registro(registro):
+    bruto = dict(registro)
+    for campo, tipo in CAMPOS_MATRIZES.items():
+        if bruto.get(campo) is not None:
+            bruto[campo] = np.asarray(bruto[campo], dtype=tipo)
+        else:
+            bruto[campo] = None
+    if bruto["estatisticas"] is not None:
+        bruto["estatisticas"] = [tuple(estatistica) for estatistica in bruto["estatisticas"]]
+    return bruto
+
+def _converter_escalar(valor):
+    if isinstance(valor, np.generic):
+        return valor.item()
+    raise TypeError(f"Valor não serializável no diário: {valor!r}")
@@ -0,0 +1,155 @@
+import csv
+import fnmatch
+import json
+import os
+from estimador_area import extrair_area_km2_a_partir_do_nome_imagem
+
+# Extensões consideradas na varredura de diretórios quando nenhum padrão é informado
+EXTENSOES_IMAGEM = (".tif", ".tiff", ".png", ".jpg", ".jpeg", ".bmp", ".gif", ".npy")
+EXTENSOES_NDJSON = (".ndjson", ".jsonl", ".json")
+
+# Nomes aceitos para cada coluna do manifesto (CSV com cabeçalho ou chaves do NDJSON)
+COLUNAS_CAMINHO = ("caminho_imagem", "caminho", "path")
+COLUNAS_AREA = ("area_km2", "area", "areas_km")
+COLUNAS_LIMIAR = ("limiar", "threshold")
+
+def ler_manifesto(caminho_manifesto):
+    """
+    Lê um manifesto de lote linha a linha, sem carregar o arquivo inteiro em memória.
+
+    Formatos aceitos:
+        - CSV (caminho, area_km2[, limiar]), com ou sem cabeçalho; com cabeçalho, as
+          colunas são identificadas pelos nomes (ver COLUNAS_CAMINHO, COLUNAS_AREA e COLUNAS_LIMIAR).
+        - NDJSON (.ndjson, .jsonl ou .json): um objeto por linha com as mesmas chaves.
+
+    Caminhos relativos são resolvidos a partir do diretório do manifesto. Sem área, ela
+    vem do nome do arquivo (area_km2_<valor>) ou, se também não constar no nome, fica
+    None para ser estimada durante o processamento.
+
+    :param caminho_manifesto: Caminho do arquivo de manifesto.
+    :return: Gerador de tuplas (caminho_imagem, area_km2, limiar), com área e limiar opcionais (None).
+    :raises ValueError: Se uma linha for inválida (a mensagem indica o arquivo e a linha).
+    """
+    diretorio_base = os.path.dirname(os.path.abspath(caminho_manifesto))
+    with open(caminho_manifesto, newline="", encoding="utf-8-sig") as arquivo:
+        if caminho_manifesto.lower().endswith(EXTENSOES_NDJSON):
+            linhas = _linhas_ndjson(arquivo, caminho_manifesto)
+        else:
+            linhas = _linhas_csv(arquivo)
+        for numero, caminho_imagem, area_km2, limiar in linhas:
+            yield _criar_entrada(caminho_imagem, area_km2, limiar, diretorio_base, f"{caminho_manifesto}:{numero}")
+
+def varrer_diretorio(diretorio, padrao=None):
+    """
+    Lista as imagens de um diretório em ordem alfabética. Os nomes são ordenados um
+    diretório por vez durante a varredura, de modo que apenas as entradas do diretório em
+    andamento ficam em memória. Como no glob, arquivos e diretórios ocultos (iniciados por
+    ".") são ignorados. A área de cada imagem vem do nome do arquivo (area_km2_<valor>) ou
+    fica None para ser estimada.
+
+    :param diretorio: Diretório a ser varrido.
+    :param padrao: Padrão glob relativo ao diretório (ex.: "*.tif" ou "**/*.tif" para
+        incluir os subdiretórios); sem padrão, todos os arquivos com extensão de imagem
+        (EXTENSOES_IMAGEM) do próprio diretório.
+    :return: Gerador de tuplas (caminho_imagem, area_km2, None).
+    :raises ValueError: Se o diretório não existir.
+    """
+    if not os.path.isdir(diretorio):
+        raise ValueError(f"Diretório inexistente: {diretorio}")
+    segmentos = (padrao or "*").replace(os.sep, "/").split("/")
+    for caminho_imagem in _percorrer(diretorio, [], segmentos):
+        if padrao is None and not caminho_imagem.lower().endswith(EXTENSOES_IMAGEM):
+            continue
+        yield caminho_imagem, extrair_area_km2_a_partir_do_nome_imagem(os.path.basename(caminho_imagem)), None
+
+def _percorrer(diretorio, relativo, segmentos):
+    # Profundidade máxima dos arquivos: ilimitada com "**", senão a quantidade de segmentos do padrão.
+    if "**" not in segmentos and len(relativo) >= len(segmentos):
+        return
+    with os.scandir(diretorio) as iterador:
+        entradas = sorted((entrada for entrada in iterador if not entrada.name.startswith(".")), key=_chave_ordem)
+    for entrada in entradas:
+        partes = relativo + [entrada.name]
+        if entrada.is_dir(follow_symlinks=False):
+            yield from _percorrer(entrada.path, partes, segmentos)
+        elif entrada.is_file() and _corresponde(partes, segmentos):
+            yield entrada.path
+
+def _chave_ordem(entrada):
+    # O separador após o nome dos diretórios reproduz a ordem dos caminhos completos ordenados.
+    return entrada.name + "/" if entrada.is_dir(follow_symlinks=False) else entrada.name
+
+def _corresponde(partes, segmentos):
+    # Casamento de um caminho relativo, segmento a segmento, com um padrão glob em que "**" representa zero ou mais diretórios.
+    if not segmentos:
+        return not partes
+    if segmentos[0] == "**":
+        return len(segmentos) == 1 or any(_corresponde(partes[inicio:], segmentos[1:]) for inicio in range(len(partes)))
+    return bool(partes) and fnmatch.fnmatch(partes[0], segmentos[0]) and _corresponde(partes[1:], segmentos[1:])
+
+def colunas_lote(entradas):
+    """
+    Reúne as entradas de um lote nas listas usadas pelo processamento.
+
+    :param entradas: Iterável de tuplas (caminho_imagem, area_km2, limiar).
+    :return: Tupla (imagens, areas_km2, limiares_imagens); limiares_imagens é None quando
+        nenhuma entrada define um limiar próprio.
+    """
+    imagens, areas_km2, limiares_imagens = [], [], []
+    for caminho_imagem, area_km2, limiar in entradas:
+        imagens.append(caminho_imagem)
+        areas_km2.append(area_km2)
+        limiares_imagens.append(limiar)
+    if all(limiar is None for limiar in limiares_imagens):
+        limiares_imagens = None
+    return imagens, areas_km2, limiares_imagens
+
+def _linhas_csv(arquivo):
+    leitor = csv.reader(arquivo)
+    indices = None
+    for linha in leitor:
+        if not any(campo.strip() for campo in linha):
+            continue
+        if indices is None:
+            # A primeira linha é cabeçalho se nomear a coluna do caminho; senão, as colunas
+            # são posicionais: caminho, área e limiar, nesta ordem.
+            nomes = [campo.strip().lower() for campo in linha]
+            indices = (0, 1, 2)
+            if _indice_coluna(nomes, COLUNAS_CAMINHO) is not None:
+                indices = (_indice_coluna(nomes, COLUNAS_CAMINHO), _indice_coluna(nomes, COLUNAS_AREA), _indice_coluna(nomes, COLUNAS_LIMIAR))
+                continue
+        yield leitor.line_num, *(_campo(linha, indice) for indice in indices)
+
+def _linhas_ndjson(arquivo, caminho_manifesto):
+    for numero, linha in enumerate(arquivo, start=1):
+        if not linha.strip():
+            continue
+        try:
+            registro = json.loads(linha)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{caminho_manifesto}:{numero}: JSON inválido ({e.msg}).") from None
+        if not isinstance(registro, dict):
+            raise ValueError(f"{caminho_manifesto}:{numero}: cada linha deve ser um objeto JSON.")
+        yield numero, _valor(registro, COLUNAS_CAMINHO), _valor(registro, COLUNAS_AREA), _valor(registro, COLUNAS_LIMIAR)
+
+def _indice_coluna(nomes, aceitos):
+    return next((indice for indice, nome in enumerate(nomes) if nome in aceitos), None)
+
+def _campo(linha, indice):
+    if indice is None or indice >= len(linha):
+        return None
+    return linha[indice].strip() or None
+
+def _valor(registro, aceitos):
+    return next((registro[nome] for nome in aceitos if registro.get(nome) not in (None, "")), None)
+
+def _criar_entrada(caminho_imagem, area_km2, limiar, diretorio_base, origem):
+    if not caminho_imagem:
+        raise ValueError(f"{origem}: caminho da imagem ausente.")
+    caminho_imagem = os.path.join(diretorio_base, os.path.expanduser(str(caminho_imagem)))
+    try:
+        area_km2 = float(area_km2) if area_km2 is not None else extrair_area_km2_a_partir_do_nome_imagem(os.path.basename(caminho_imagem))
+        limiar = int(limiar) if limiar is not None else None
+    except ValueError:
+        raise ValueError(f"{origem}: área ou limiar inválido.") from None
+    return caminho_imagem, area_km2, limiar
@@ -0,0 +1,168 @@
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Optional, Tuple
+import cv2
+import numpy as np
+
+EXTENSAO_NPY = ".npy"
+EXTENSAO_DESCRITOR = ".json"  # Descritor de um raster bruto: <arquivo>.json ao lado do arquivo.
+
+# Nomes aceitos para cada campo do descritor de um raster bruto
+CHAVES_TIPO = ("tipo", "dtype")
+CHAVES_FORMA = ("forma", "shape")
+CHAVES_DESLOCAMENTO = ("deslocamento", "offset")
+CHAVES_ORDEM = ("ordem", "order")
+
+@dataclass(eq=False)
+class MatrizEmMemoria:
+    """
+    Raster já em memória, recebido pelo protocolo de buffer (ndarray, memoryview, bytes,
+    mmap etc.) e usado sem cópia. É aceito no lugar do caminho de uma imagem; `nome`
+    identifica a imagem nos resultados e nos logs (ver nome_imagem).
+
+    As matrizes em memória são processadas sempre no processo que as recebeu (enviá-las
+    aos processos do pool exigiria copiá-las) e não usam o cache de resultados nem o diário.
+
+    :param dados: Objeto com o protocolo de buffer.
+    :param nome: Identificação da imagem nos resultados.
+    :param tipo: Tipo de dado (dtype) dos pixels, para buffers sem tipo (ex.: bytes).
+    :param forma: Forma (altura, largura[, canais]), para buffers sem forma.
+    :raises ValueError: Se o buffer não puder ser interpretado como um raster.
+    """
+    dados: Any = field(repr=False)
+    nome: str = "<memória>"
+    tipo: Any = None
+    forma: Optional[Tuple[int, ...]] = None
+    matriz: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self):
+        if self.tipo is not None or self.forma is not None:
+            matriz = np.frombuffer(self.dados, dtype=self.tipo or np.uint8)
+            self.matriz = matriz.reshape(self.forma) if self.forma is not None else matriz
+        else:
+            self.matriz = np.asarray(memoryview(self.dados))
+        if self.matriz.ndim not in (2, 3):
+            raise ValueError(f"{self.nome}: o buffer deve ter 2 ou 3 dimensões (informe tipo e forma para buffers sem forma).")
+
+    def __str__(self):
+        return self.nome
+
+def nome_imagem(imagem):
+    """
+    Identificação de uma imagem nos resultados e nos logs: o caminho do arquivo ou o
+    nome da MatrizEmMemoria.
+    """
+    return imagem.nome if isinstance(imagem, MatrizEmMemoria) else str(imagem)
+
+def e_matriz(caminho_imagem):
+    """
+    Indica se a entrada é uma matriz: um MatrizEmMemoria, um arquivo .npy ou um raster
+    bruto acompanhado do descritor <arquivo>.json.
+    """
+    if isinstance(caminho_imagem, MatrizEmMemoria):
+        return True
+    if not os.path.isfile(caminho_imagem):
+        return False
+    return caminho_imagem.lower().endswith(EXTENSAO_NPY) or os.path.isfile(caminho_imagem + EXTENSAO_DESCRITOR)
+
+def abrir_matriz(caminho_imagem):
+    """
+    Abre a matriz sem ler os pixels: arquivos .npy com np.load(mmap_mode="r") e rasters
+    brutos com np.memmap, de acordo com o descritor. Os pixels são lidos sob demanda pelo
+    sistema operacional, e as páginas ficam no cache de páginas compartilhado entre os
+    processos que abrem o mesmo arquivo.
+
+    O descritor é um objeto JSON com o tipo de dado ("tipo"), a forma ("forma": [altura,
+    largura] ou [altura, largura, canais]) e, opcionalmente, o deslocamento em bytes do
+    início dos pixels ("deslocamento") e a ordem ("ordem": "C" ou "F").
+
+    :param caminho_imagem: Caminho do arquivo ou MatrizEmMemoria.
+    :return: Array de 2 ou 3 dimensões, somente leitura.
+    :raises ValueError: Se o descritor ou a forma da matriz forem inválidos.
+    """
+    if isinstance(caminho_imagem, MatrizEmMemoria):
+        return caminho_imagem.matriz
+    if caminho_imagem.lower().endswith(EXTENSAO_NPY):
+        matriz = np.load(caminho_imagem, mmap_mode="r", allow_pickle=False)
+    else:
+        tipo, forma, deslocamento, ordem = _ler_descritor(caminho_imagem + EXTENSAO_DESCRITOR)
+        matriz = np.memmap(caminho_imagem, dtype=tipo, mode="r", offset=deslocamento, shape=forma, order=ordem)
+    if matriz.ndim not in (2, 3):
+        raise ValueError(f"{caminho_imagem}: a matriz deve ter 2 ou 3 dimensões (altura, largura[, canais]).")
+    return matriz
+
+def dimensoes_matriz(caminho_imagem):
+    """
+    :return: Tupla (altura, largura) da matriz, lida do cabeçalho do .npy ou do descritor.
+    """
+    return abrir_matriz(caminho_imagem).shape[:2]
+
+def matriz_cinza(matriz, profundidade_nativa=False):
+    """
+    Converte a matriz (ou um intervalo de linhas dela) para o único canal contado pelo
+    histograma. Matrizes de uma banda são entregues sem cópia quando o tipo cabe no
+    kernel: uint8 no modo de 8 bits e qualquer tipo na profundidade nativa. Matrizes
+    uint16 no modo de 8 bits são reduzidas aos 8 bits mais significativos, como o OpenCV
+    faz com arquivos de 16 bits; matrizes de 3 ou 4 canais (RGB ou RGBA, na convenção do
+    NumPy) são convertidas para cinza.
+
+    :param matriz: Array de 2 ou 3 dimensões.
+    :param profundidade_nativa: Se True, mantém o tipo de dado da matriz.
+    :return: Array 2D em escala de cinza.
+    :raises ValueError: Se a quantidade de canais ou o tipo de dado não forem suportados.
+    """
+    if matriz.ndim == 3:
+        if matriz.shape[2] == 1:
+            matriz = matriz[..., 0]
+        elif matriz.shape[2] in (3, 4):
+            codigo = cv2.COLOR_RGBA2GRAY if matriz.shape[2] == 4 else cv2.COLOR_RGB2GRAY
+            matriz = cv2.cvtColor(np.ascontiguousarray(matriz), codigo)
+        else:
+            raise ValueError(f"Matrizes com {matriz.shape[2]} canais não são suportadas.")
+    if profundidade_nativa or matriz.dtype == np.uint8:
+        return matriz
+    if matriz.dtype.kind == "u" and matriz.dtype.itemsize == 2:
+        return (matriz >> 8).astype(np.uint8)
+    raise ValueError(f"Matrizes do tipo {matriz.dtype} exigem a profundidade nativa (--profundidade_nativa).")
+
+def abrir_faixas_matriz(caminho_imagem, bytes_por_faixa, profundidade_nativa=False):
+    """
+    Prepara a leitura de uma matriz em faixas horizontais. Cada faixa é uma visão das
+    linhas da matriz (sem cópia, exceto quando matriz_cinza precisa converter os pixels),
+    de modo que apenas as páginas da faixa em uso precisam estar em memória.
+
+    :param caminho_imagem: Caminho do arquivo ou MatrizEmMemoria.
+    :param bytes_por_faixa: Quantidade máxima de bytes da matriz por faixa.
+    :param profundidade_nativa: Se True, mantém o tipo de dado da matriz.
+    :return: Tupla (altura, largura, faixas), onde faixas é um gerador de arrays em escala de cinza.
+    """
+    matriz = abrir_matriz(caminho_imagem)
+    altura, largura = matriz.shape[:2]
+    bytes_por_linha = max(1, largura * matriz.itemsize * (matriz.shape[2] if matriz.ndim == 3 else 1))
+    linhas_por_faixa = max(1, bytes_por_faixa // bytes_por_linha)
+
+    def faixas():
+        for topo in range(0, altura, linhas_por_faixa):
+            yield matriz_cinza(matriz[topo:topo + linhas_por_faixa], profundidade_nativa)
+
+    return altura, largura, faixas()
+
+def _ler_descritor(caminho_descritor):
+    try:
+        with open(caminho_descritor, encoding="utf-8") as arquivo:
+            descritor = json.load(arquivo)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"{caminho_descritor}: JSON inválido ({e.msg}).") from None
+    if not isinstance(descritor, dict):
+        raise ValueError(f"{caminho_descritor}: o descritor deve ser um objeto JSON.")
+    tipo, forma = _valor(descritor, CHAVES_TIPO), _valor(descritor, CHAVES_FORMA)
+    if tipo is None or forma is None:
+        raise ValueError(f"{caminho_descritor}: o descritor deve informar o tipo e a forma da matriz.")
+    try:
+        return np.dtype(tipo), tuple(int(dimensao) for dimensao in forma), int(_valor(descritor, CHAVES_DESLOCAMENTO) or 0), _valor(descritor, CHAVES_ORDEM) or "C"
+    except (TypeError, ValueError):
+        raise ValueError(f"{caminho_descritor}: tipo, forma ou deslocamento inválido.") from None
+
+def _valor(descritor, aceitos):
+    return next((descritor[nome] for nome in aceitos if descritor.get(nome) is not None), None)
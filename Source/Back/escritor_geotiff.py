@@ -0,0 +1,195 @@
+import struct
+import zlib
+import numpy as np
+
+TAMANHO_TILE_PADRAO = 256  # Largura e altura de cada tile, em pixels (múltiplo de 16, como exige o TIFF).
+NIVEL_COMPRESSAO_PADRAO = 1  # Nível do zlib (1 = mais rápido, 9 = menor arquivo); acima de 1 o ganho em float32 é pequeno e o custo, várias vezes maior.
+LIMITE_TIFF_CLASSICO = 2 ** 32 - 1  # Acima deste tamanho, o arquivo é gravado como BigTIFF.
+TAMANHO_CABECALHO = 16  # Espaço reservado no início do arquivo (cabe o cabeçalho do BigTIFF).
+
+COMPRESSAO_DEFLATE = 8
+FOTOMETRIA_MIN_PRETO = 1
+CONFIGURACAO_PLANAR_SEPARADA = 2  # Cada banda em seus próprios tiles.
+
+# Formato de amostra do TIFF (tag 339) para cada tipo do NumPy
+FORMATO_AMOSTRA = {"u": 1, "i": 2, "f": 3}
+
+# Tipos de campo do TIFF: código e formato do struct
+TIPOS_CAMPO = {"SHORT": (3, "H"), "LONG": (4, "I"), "DOUBLE": (12, "d"), "ASCII": (2, "s"), "LONG8": (16, "Q")}
+
+# Tipo de campo das tags GeoTIFF copiadas do raster de entrada
+TIPOS_TAGS_GEO = {33550: "DOUBLE", 33922: "DOUBLE", 34264: "DOUBLE", 34735: "SHORT", 34736: "DOUBLE", 34737: "ASCII"}
+
+class EscritorGeoTIFF:
+    """
+    Grava um GeoTIFF em tiles comprimidos (deflate) à medida que as faixas de linhas
+    chegam, sem manter o raster inteiro em memória: apenas uma linha de tiles por banda
+    fica no buffer. As bandas são gravadas em planos separados, de modo que podem ser
+    escritas em qualquer ordem.
+
+    Uso:
+        with EscritorGeoTIFF(caminho, altura, largura, tags_geo=tags) as escritor:
+            for faixa in faixas:
+                escritor.escrever_faixa(faixa)
+    """
+
+    def __init__(self, caminho_saida, altura, largura, bandas=1, tipo=np.float32, tags_geo=None,
+                 tamanho_tile=TAMANHO_TILE_PADRAO, nivel_compressao=NIVEL_COMPRESSAO_PADRAO):
+        """
+        :param caminho_saida: Caminho do GeoTIFF a ser gravado.
+        :param altura: Altura do raster em pixels.
+        :param largura: Largura do raster em pixels.
+        :param bandas: Quantidade de bandas.
+        :param tipo: Tipo NumPy das amostras.
+        :param tags_geo: Tags GeoTIFF a copiar ({tag: valores}), como as de geometria_pixels.ler_tags_geotiff.
+        :param tamanho_tile: Largura e altura dos tiles, em pixels.
+        :param nivel_compressao: Nível de compressão do zlib.
+        """
+        if tamanho_tile % 16:
+            raise ValueError("O tamanho do tile deve ser múltiplo de 16.")
+        self.altura = altura
+        self.largura = largura
+        self.bandas = bandas
+        self.tipo = np.dtype(tipo)
+        self.tags_geo = tags_geo or {}
+        self.tamanho_tile = tamanho_tile
+        self.nivel_compressao = nivel_compressao
+
+        self.tiles_por_linha = -(-largura // tamanho_tile)
+        self.linhas_de_tiles = -(-altura // tamanho_tile)
+        quantidade_tiles = self.tiles_por_linha * self.linhas_de_tiles * bandas
+        self._deslocamentos = [0] * quantidade_tiles
+        self._tamanhos = [0] * quantidade_tiles
+        self._buffers = {}  # Linhas ainda não gravadas de cada banda.
+        self._linhas_gravadas = [0] * bandas
+
+        self._arquivo = open(caminho_saida, "wb")
+        self._arquivo.write(b"\0" * TAMANHO_CABECALHO)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_excecao, *_):
+        if tipo_excecao is None:
+            self.fechar()
+        else:
+            self._arquivo.close()
+        return False
+
+    def escrever_faixa(self, faixa, banda=0):
+        """
+        Acrescenta as próximas linhas de uma banda. Cada linha completa de tiles é
+        comprimida e gravada imediatamente.
+
+        :param faixa: Array (linhas, largura) com as próximas linhas da banda.
+        :param banda: Índice da banda (a partir de 0).
+        """
+        if faixa.shape[1] != self.largura:
+            raise ValueError(f"Faixa com largura {faixa.shape[1]}; esperada {self.largura}.")
+        pendentes = self._buffers.get(banda)
+        faixa = np.asarray(faixa, dtype=self.tipo)
+        pendentes = faixa if pendentes is None else np.concatenate((pendentes, faixa))
+
+        while pendentes.shape[0] >= self.tamanho_tile:
+            self._gravar_linha_de_tiles(pendentes[:self.tamanho_tile], banda)
+            pendentes = pendentes[self.tamanho_tile:]
+        self._buffers[banda] = pendentes if pendentes.shape[0] else None
+
+    def _gravar_linha_de_tiles(self, linhas, banda):
+        linha_de_tiles = self._linhas_gravadas[banda] // self.tamanho_tile
+        if linhas.shape[0] < self.tamanho_tile or self.largura % self.tamanho_tile:
+            # Os tiles da borda são completados com zeros até o tamanho do tile.
+            completo = np.zeros((self.tamanho_tile, self.tiles_por_linha * self.tamanho_tile), dtype=self.tipo)
+            completo[:linhas.shape[0], :self.largura] = linhas
+            linhas = completo
+
+        primeiro = (banda * self.linhas_de_tiles + linha_de_tiles) * self.tiles_por_linha
+        for coluna in range(self.tiles_por_linha):
+            tile = np.ascontiguousarray(linhas[:, coluna * self.tamanho_tile:(coluna + 1) * self.tamanho_tile])
+            dados = zlib.compress(tile.astype(self.tipo.newbyteorder("<"), copy=False).tobytes(), self.nivel_compressao)
+            self._deslocamentos[primeiro + coluna] = self._arquivo.tell()
+            self._tamanhos[primeiro + coluna] = len(dados)
+            self._arquivo.write(dados)
+        self._linhas_gravadas[banda] += self.tamanho_tile
+
+    def fechar(self):
+        """
+        Grava as linhas restantes e o diretório de tags (IFD) e fecha o arquivo.
+        """
+        for banda, pendentes in self._buffers.items():
+            if pendentes is not None:
+                self._gravar_linha_de_tiles(pendentes, banda)
+        self._buffers.clear()
+        if any(linhas < self.altura for linhas in self._linhas_gravadas):
+            self._arquivo.close()
+            raise ValueError("Nem todas as linhas de todas as bandas foram gravadas.")
+
+        inicio_ifd = self._arquivo.tell()
+        inicio_ifd += inicio_ifd % 2  # O IFD começa em um deslocamento par.
+        big_tiff = inicio_ifd + self._tamanho_estimado_ifd() > LIMITE_TIFF_CLASSICO
+        self._arquivo.seek(inicio_ifd)
+        self._arquivo.write(self._montar_ifd(inicio_ifd, big_tiff))
+
+        self._arquivo.seek(0)
+        if big_tiff:
+            self._arquivo.write(b"II" + struct.pack("<HHHQ", 43, 8, 0, inicio_ifd))
+        else:
+            self._arquivo.write(b"II" + struct.pack("<HI", 42, inicio_ifd))
+        self._arquivo.close()
+
+    def _tamanho_estimado_ifd(self):
+        return 64 * 20 + 16 * len(self._deslocamentos) + 8 * sum(len(_como_tupla(valor)) + 1 for valor in self.tags_geo.values())
+
+    def _montar_ifd(self, inicio_ifd, big_tiff):
+        tipo_deslocamento = "LONG8" if big_tiff else "LONG"
+        tags = {
+            256: ("LONG", (self.largura,)),
+            257: ("LONG", (self.altura,)),
+            258: ("SHORT", (self.tipo.itemsize * 8,) * self.bandas),
+            259: ("SHORT", (COMPRESSAO_DEFLATE,)),
+            262: ("SHORT", (FOTOMETRIA_MIN_PRETO,)),
+            277: ("SHORT", (self.bandas,)),
+            284: ("SHORT", (CONFIGURACAO_PLANAR_SEPARADA,)),
+            322: ("LONG", (self.tamanho_tile,)),
+            323: ("LONG", (self.tamanho_tile,)),
+            324: (tipo_deslocamento, tuple(self._deslocamentos)),
+            325: (tipo_deslocamento, tuple(self._tamanhos)),
+            339: ("SHORT", (FORMATO_AMOSTRA[self.tipo.kind],) * self.bandas)
+        }
+        if self.bandas > 1:
+            tags[338] = ("SHORT", (0,) * (self.bandas - 1))  # ExtraSamples: bandas além da primeira, sem significado definido.
+        for tag, valor in self.tags_geo.items():
+            if tag in TIPOS_TAGS_GEO:
+                tags[tag] = (TIPOS_TAGS_GEO[tag], _como_tupla(valor))
+
+        formato_contagem, formato_entrada, tamanho_valor = ("Q", "HHQ", 8) if big_tiff else ("H", "HHI", 4)
+        tamanho_entrada = struct.calcsize("<" + formato_entrada) + tamanho_valor
+        inicio_dados = inicio_ifd + struct.calcsize("<" + formato_contagem) + len(tags) * tamanho_entrada + tamanho_valor
+
+        entradas, dados_externos = [], b""
+        for tag in sorted(tags):
+            nome_tipo, valores = tags[tag]
+            codigo, formato = TIPOS_CAMPO[nome_tipo]
+            if nome_tipo == "ASCII":
+                bruto = valores[0].encode("ascii", "replace") + b"\0"
+                contagem = len(bruto)
+            else:
+                bruto = struct.pack(f"<{len(valores)}{formato}", *valores)
+                contagem = len(valores)
+
+            if len(bruto) <= tamanho_valor:
+                campo = bruto.ljust(tamanho_valor, b"\0")
+            else:
+                # O valor não cabe na entrada: fica após o IFD e a entrada guarda seu deslocamento.
+                deslocamento = inicio_dados + len(dados_externos)
+                campo = struct.pack("<Q" if big_tiff else "<I", deslocamento)
+                dados_externos += bruto + b"\0" * (len(bruto) % 2)
+            entradas.append(struct.pack("<" + formato_entrada, tag, codigo, contagem) + campo)
+
+        proximo_ifd = b"\0" * tamanho_valor  # Único IFD do arquivo.
+        return struct.pack("<" + formato_contagem, len(entradas)) + b"".join(entradas) + proximo_ifd + dados_externos
+
+def _como_tupla(valor):
+    if isinstance(valor, (str, bytes)):
+        return (valor.decode("ascii", "replace") if isinstance(valor, bytes) else valor,)
+    return tuple(valor)
@@ -1,56 +1,114 @@
 import cv2
 import re
 import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import instrumentacao
+from cache_imagens import decodificar_cinza
+from cache_resultados import identidade_arquivo
+from entradas_matriciais import MatrizEmMemoria, nome_imagem
 
-def estimar_area(caminho_imagem, x_m, y_m):
+LIMIAR_BINARIZACAO = 127  # Intensidade acima da qual o pixel pertence à região.
+MAXIMO_ESTIMATIVAS_MEMORIZADAS = 1024  # Estimativas mantidas em memória, por identidade do arquivo.
+
+_estimativas = OrderedDict()  # Área estimada por (identidade do arquivo, resolução x, resolução y).
+_trava_estimativas = threading.Lock()  # A interface estima áreas em um pool enquanto o lote roda em outra thread.
+
+def estimar_area(caminho_imagem, x_m, y_m, cache=None):
     """
     Estima a área de uma região em uma imagem em km².
 
     Parâmetros:
-    - caminho_imagem: str, caminho da imagem a ser analisada
+    - caminho_imagem: str, caminho da imagem a ser analisada (ou MatrizEmMemoria)
     - x_m: float, resolução em metros por pixel na direção x
     - y_m: float, resolução em metros por pixel na direção y
+    - cache: CacheImagens, opcional, cache de imagens decodificadas da execução
 
     Retorna:
     - float, área em km²
     """
-    resultado1 = extrair_area_km2_a_partir_do_nome_imagem(os.path.basename(caminho_imagem))
-    return resultado1 if resultado1 else calcular_area(caminho_imagem, x_m, y_m)
+    resultado1 = extrair_area_km2_a_partir_do_nome_imagem(os.path.basename(nome_imagem(caminho_imagem)))
+    return resultado1 if resultado1 else calcular_area(caminho_imagem, x_m, y_m, cache)
 
-def calcular_area(caminho_imagem, resolucao_x, resolucao_y):
+def calcular_area(caminho_imagem, resolucao_x, resolucao_y, cache=None, memorizar=True):
     """
     Calcula a área de uma região em uma imagem em km².
 
     Parâmetros:
-    - caminho_imagem: str, caminho da imagem a ser analisada
+    - caminho_imagem: str, caminho da imagem a ser analisada (ou MatrizEmMemoria)
     - resolucao_x: float, resolução em metros por pixel na direção x
     - resolucao_y: float, resolução em metros por pixel na direção y
+    - cache: CacheImagens, opcional, cache de imagens decodificadas da execução
+    - memorizar: bool, reaproveita a estimativa anterior do mesmo arquivo (mesma identidade)
 
     Retorna:
     - float, área em km²
     """
-    # 1. Carregar a imagem do mapa
-    imagem = cv2.imread(caminho_imagem)
+    chave = None
+    if memorizar and not isinstance(caminho_imagem, MatrizEmMemoria):  # Matrizes em memória não têm um arquivo que as identifique.
+        try:
+            chave = (identidade_arquivo(caminho_imagem), resolucao_x, resolucao_y)
+        except OSError:
+            chave = None  # Arquivo inexistente: o erro é tratado na leitura abaixo.
+        with _trava_estimativas:
+            if chave in _estimativas:
+                _estimativas.move_to_end(chave)
+                return _estimativas[chave]
 
-    # 2. Converter para escala de cinza
-    imagem_gray = cv2.cvtColor(imagem, cv2.COLOR_BGR2GRAY)
+    # 1 e 2. Carregar a imagem do mapa em escala de cinza (reaproveitando o cache, se houver)
+    with instrumentacao.etapa("area.ler", caminho_imagem):
+        if cache is not None:
+            imagem_gray = cache.obter_cinza(caminho_imagem)
+        else:
+            imagem_gray = decodificar_cinza(caminho_imagem)
+    if imagem_gray is None:
+        raise ValueError(f"Não foi possível ler a imagem {caminho_imagem} para estimar a área.")
 
-    # 3. Binarizar a imagem (ajuste o limiar conforme necessário)
-    _, imagem_binaria = cv2.threshold(imagem_gray, 127, 255, cv2.THRESH_BINARY)
+    # 3 a 7. Contar os pixels da região e converter para km²
+    with instrumentacao.etapa("area.contar", caminho_imagem):
+        area_em_km2 = estimar_area_em_array(imagem_gray, resolucao_x, resolucao_y)["area_km2"]
 
-    # 4. Encontrar contornos
-    contornos, _ = cv2.findContours(imagem_binaria, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if chave is not None:
+        with _trava_estimativas:
+            _estimativas[chave] = area_em_km2
+            if len(_estimativas) > MAXIMO_ESTIMATIVAS_MEMORIZADAS:
+                _estimativas.popitem(last=False)  # Descarta a estimativa usada há mais tempo.
+    return area_em_km2
 
-    # 5. Calcular área do contorno
-    area_em_pixels = cv2.contourArea(contornos[0])  # Considerando o primeiro contorno
+def estimar_area_em_array(imagem_cinza, resolucao_x, resolucao_y, limiar=LIMIAR_BINARIZACAO, por_regiao=False, conectividade=8):
+    """
+    Estima a área da região clara de uma imagem já decodificada, contando os pixels
+    acima do limiar (sem traçar contornos). Todas as ilhas da região são somadas.
 
-    # 6. Calcular a área em m²
-    area_em_m2 = area_em_pixels * (resolucao_x * resolucao_y)  # Área em m²
+    Parâmetros:
+    - imagem_cinza: array NumPy 2D, imagem em escala de cinza
+    - resolucao_x: float, resolução em metros por pixel na direção x
+    - resolucao_y: float, resolução em metros por pixel na direção y
+    - limiar: int, intensidade acima da qual o pixel pertence à região
+    - por_regiao: bool, também calcula a área de cada região conexa (rotulagem de componentes)
+    - conectividade: int, 4 ou 8, vizinhança usada na rotulagem das regiões
 
-    # 7. Converter para km²
-    area_em_km2 = area_em_m2 / 1_000_000  # 1 km² = 1_000_000 m²
+    Retorna:
+    - dict com "area_km2" (total), "pixels" (quantidade de pixels da região) e
+      "regioes_km2" (áreas de cada região conexa em ordem decrescente, ou None se
+      por_regiao for False)
+    """
+    area_pixel_km2 = (resolucao_x * resolucao_y) / 1_000_000  # 1 km² = 1_000_000 m²
+    mascara = imagem_cinza > limiar  # Mesmo critério de cv2.threshold com THRESH_BINARY.
+    pixels = int(np.count_nonzero(mascara))
 
-    return area_em_km2
+    regioes_km2 = None
+    if por_regiao:
+        _, _, estatisticas, _ = cv2.connectedComponentsWithStats(mascara.view(np.uint8), connectivity=conectividade)
+        areas_regioes = np.sort(estatisticas[1:, cv2.CC_STAT_AREA])[::-1]  # O rótulo 0 é o fundo.
+        regioes_km2 = (areas_regioes * area_pixel_km2).tolist()
+
+    return {
+        "area_km2": pixels * area_pixel_km2,
+        "pixels": pixels,
+        "regioes_km2": regioes_km2
+    }
 
 def extrair_area_km2_a_partir_do_nome_imagem(nome_imagem):
     # Expressão regular para encontrar 'area_km2_' seguido de um número (pode ser inteiro ou decimal)
@@ -0,0 +1,117 @@
+from functools import lru_cache
+import numpy as np
+from PIL import Image
+
+RAIO_TERRA_KM = 6371.0088  # Raio médio da Terra (esfera de mesmo volume do elipsoide WGS84).
+
+# Tags GeoTIFF com o posicionamento do raster
+TAG_ESCALA_PIXEL = 33550  # ModelPixelScaleTag
+TAG_PONTOS_CONTROLE = 33922  # ModelTiepointTag
+TAG_TRANSFORMACAO = 34264  # ModelTransformationTag
+TAG_CHAVES_GEO = 34735  # GeoKeyDirectoryTag
+TAG_PARAMETROS_DOUBLE = 34736  # GeoDoubleParamsTag
+TAG_PARAMETROS_ASCII = 34737  # GeoAsciiParamsTag
+TAGS_GEOTIFF = (TAG_ESCALA_PIXEL, TAG_PONTOS_CONTROLE, TAG_TRANSFORMACAO, TAG_CHAVES_GEO, TAG_PARAMETROS_DOUBLE, TAG_PARAMETROS_ASCII)
+CHAVE_TIPO_MODELO = 1024  # GTModelTypeGeoKey: 1 = projetado, 2 = geográfico (graus).
+MODELO_PROJETADO = 1
+MODELO_GEOGRAFICO = 2
+
+QUANTIDADE_VETORES_MEMORIZADOS = 64  # Vetores de área por linha mantidos em cache.
+
+def ler_tags_geotiff(caminho_imagem):
+    """
+    Lê as tags GeoTIFF (posicionamento e sistema de coordenadas) de uma imagem, para que
+    possam ser copiadas para um raster derivado.
+
+    :param caminho_imagem: Caminho da imagem.
+    :return: Dicionário {tag: valores} (vazio se a imagem não for um GeoTIFF).
+    """
+    try:
+        with Image.open(caminho_imagem) as imagem:
+            tags = getattr(imagem, "tag_v2", {})
+            return {tag: tags[tag] for tag in TAGS_GEOTIFF if tag in tags}
+    except (OSError, ValueError):
+        return {}
+
+def ler_geotransform(caminho_imagem):
+    """
+    Lê o posicionamento de um GeoTIFF no formato do GDAL:
+    (x_origem, largura_pixel, rotacao_x, y_origem, rotacao_y, altura_pixel).
+
+    :param caminho_imagem: Caminho da imagem.
+    :return: Tupla (geotransform, geografico), em que geografico indica coordenadas em
+        graus, ou None se a imagem não tiver as tags GeoTIFF.
+    """
+    tags = ler_tags_geotiff(caminho_imagem)
+    if TAG_TRANSFORMACAO in tags and len(tags[TAG_TRANSFORMACAO]) >= 8:
+        a, b, _, d, e, f, _, h = tags[TAG_TRANSFORMACAO][:8]
+        geotransform = (d, a, b, h, e, f)
+    elif TAG_ESCALA_PIXEL in tags and TAG_PONTOS_CONTROLE in tags:
+        escala_x, escala_y = tags[TAG_ESCALA_PIXEL][:2]
+        i, j, _, x, y, _ = tags[TAG_PONTOS_CONTROLE][:6]
+        geotransform = (x - i * escala_x, escala_x, 0.0, y + j * escala_y, 0.0, -escala_y)
+    else:
+        return None
+
+    tipo_modelo = _tipo_modelo(tags.get(TAG_CHAVES_GEO))
+    if tipo_modelo is None:
+        # Sem a chave do modelo: coordenadas dentro dos limites de longitude/latitude são tratadas como graus.
+        x_origem, largura_pixel, _, y_origem, _, _ = geotransform
+        tipo_modelo = MODELO_GEOGRAFICO if abs(x_origem) <= 360 and abs(y_origem) <= 90 and abs(largura_pixel) < 1 else MODELO_PROJETADO
+    return tuple(float(valor) for valor in geotransform), tipo_modelo == MODELO_GEOGRAFICO
+
+def _tipo_modelo(chaves):
+    if not chaves or len(chaves) < 4:
+        return None
+    quantidade = chaves[3]
+    for posicao in range(4, 4 + 4 * quantidade, 4):
+        chave, local, _, valor = chaves[posicao:posicao + 4]
+        if chave == CHAVE_TIPO_MODELO and local == 0:
+            return valor
+    return None
+
+def limites_para_geotransform(oeste, sul, leste, norte, altura, largura):
+    """
+    Monta o geotransform de um raster em graus a partir dos limites da imagem.
+
+    :param oeste: Longitude da borda esquerda.
+    :param sul: Latitude da borda inferior.
+    :param leste: Longitude da borda direita.
+    :param norte: Latitude da borda superior.
+    :param altura: Altura da imagem em pixels.
+    :param largura: Largura da imagem em pixels.
+    :return: Geotransform no formato do GDAL.
+    """
+    if not (-90 <= sul < norte <= 90) or oeste == leste:
+        raise ValueError(f"Limites inválidos: oeste={oeste}, sul={sul}, leste={leste}, norte={norte}.")
+    return (float(oeste), (leste - oeste) / largura, 0.0, float(norte), 0.0, -(norte - sul) / altura)
+
+@lru_cache(maxsize=QUANTIDADE_VETORES_MEMORIZADOS)
+def areas_por_linha(geotransform, altura, geografico=True):
+    """
+    Calcula a área (km²) de um pixel de cada linha do raster. Em coordenadas geográficas,
+    a área de uma célula entre as latitudes φ1 e φ2 com largura Δλ (radianos) é
+    R² · Δλ · |sen φ1 − sen φ2| (Terra esférica); em coordenadas projetadas, todas as
+    linhas têm a mesma área.
+
+    O resultado é memorizado por (geotransform, altura), de modo que rasters com a
+    mesma grade compartilham o vetor; por isso ele é somente leitura.
+
+    :param geotransform: Tupla no formato do GDAL (sem rotação).
+    :param altura: Quantidade de linhas do raster.
+    :param geografico: Se True, as coordenadas estão em graus de longitude/latitude.
+    :return: Array float64 (altura,) com a área de um pixel de cada linha, em km².
+    """
+    _, largura_pixel, rotacao_x, y_origem, rotacao_y, altura_pixel = geotransform
+    if rotacao_x or rotacao_y:
+        raise ValueError("Rasters com rotação no geotransform não são suportados.")
+
+    if geografico:
+        bordas = np.radians(y_origem + altura_pixel * np.arange(altura + 1, dtype=np.float64))
+        senos = np.sin(np.clip(bordas, -np.pi / 2, np.pi / 2))
+        areas = RAIO_TERRA_KM ** 2 * abs(np.radians(largura_pixel)) * np.abs(np.diff(senos))
+    else:
+        areas = np.full(altura, abs(largura_pixel * altura_pixel) / 1_000_000)  # Metros² para km².
+
+    areas.flags.writeable = False
+    return areas
@@ -0,0 +1,217 @@
+import argparse
+import os
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.ticker import MaxNLocator
+from conjunto_resultados import ConjuntoResultados
+
+LIMITE_BARRAS = 40  # Acima desta quantidade de imagens, as barras mostram as maiores e agrupam as demais.
+LIMITE_ROTULOS_VALOR = 40  # Valores escritos dentro das barras apenas até esta quantidade de barras.
+LIMITE_FATIAS = 12  # Fatias do gráfico de pizza antes do agrupamento em "Outras".
+MENOR_FRACAO_FATIA = 0.01  # Fatias menores que esta fração do total também vão para "Outras".
+QUANTIDADE_FAIXAS_DISTRIBUICAO = 50  # Faixas de valores do gráfico de distribuição.
+LIMITE_FAIXAS_HISTOGRAMA = 1024  # Histogramas com mais níveis são exibidos com níveis vizinhos somados.
+FORMATOS_GRAFICOS = ("png", "svg")
+
+# Gráficos de barras exportados: (nome do arquivo, coluna, título, rótulo do eixo y)
+GRAFICOS_BARRAS = (
+    ("somas_ponderadas", "soma_ponderada", "Somas ponderadas (Consumo de energia)", "Soma ponderada"),
+    ("areas_por_pixel", "area_por_pixel", "Áreas por pixel", "Área por pixel (km²/pixel)"),
+    ("areas_normalizadas", "area_normalizada", "Áreas normalizadas", "Área normalizada (km²)")
+)
+
+def agrupar_maiores(valores, rotulos, quantidade=LIMITE_BARRAS, media=False):
+    """
+    Mantém os `quantidade` maiores valores e reúne os demais em uma única entrada "Outras".
+
+    :param valores: Vetor de valores.
+    :param rotulos: Rótulo de cada valor.
+    :param quantidade: Quantidade de valores mantidos individualmente.
+    :param media: Se True, "Outras" recebe a média dos demais valores; caso contrário, a soma.
+    :return: Tupla (valores, rotulos); os mantidos ficam na ordem original.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    if valores.size <= quantidade:
+        return valores, list(rotulos)
+    maiores = np.sort(np.argpartition(valores, -quantidade)[-quantidade:]) if quantidade > 0 else np.empty(0, dtype=np.intp)
+    restantes = np.ones(valores.size, dtype=bool)
+    restantes[maiores] = False
+    agrupados = valores[restantes]
+    rotulo = f"Outras ({agrupados.size}, média)" if media else f"Outras ({agrupados.size})"
+    rotulos = [rotulos[indice] for indice in maiores] + [rotulo]
+    return np.append(valores[maiores], agrupados.mean() if media else agrupados.sum()), rotulos
+
+def desenhar_barras(figura, valores, rotulos, titulo, titulo_metrica, limite_barras=LIMITE_BARRAS):
+    """
+    Desenha um gráfico de barras, uma por imagem. Com mais de `limite_barras` imagens,
+    apenas as maiores aparecem individualmente e as demais são representadas pela sua
+    média em uma barra "Outras".
+
+    :param figura: Figura do Matplotlib (é limpa antes do desenho).
+    :param valores: Valor de cada imagem.
+    :param rotulos: Rótulo de cada imagem.
+    :param titulo: Título do gráfico.
+    :param titulo_metrica: Rótulo do eixo y.
+    :param limite_barras: Quantidade máxima de barras individuais.
+    """
+    figura.clear()
+    eixo = figura.add_subplot()
+    valores, rotulos = agrupar_maiores(valores, rotulos, limite_barras, media=True)
+    posicoes = np.arange(len(valores))
+    barras = eixo.bar(posicoes, valores, color=colormaps["viridis"](np.linspace(0, 1, len(valores))))
+    if len(valores) <= LIMITE_ROTULOS_VALOR:
+        eixo.bar_label(barras, fmt="%.2f", label_type="center", color="black")  # Um único artista de texto por série.
+
+    eixo.yaxis.set_major_locator(MaxNLocator(nbins=20))  # Funciona também quando todos os valores são zero.
+    if not np.any(valores < 0):
+        eixo.set_ylim(bottom=0)
+    eixo.set_xticks(posicoes, rotulos, rotation=45, ha="right")
+    eixo.set_title(titulo)
+    eixo.set_ylabel(titulo_metrica)
+    figura.tight_layout()
+
+def desenhar_distribuicao(figura, valores, titulo, titulo_metrica, quantidade_faixas=QUANTIDADE_FAIXAS_DISTRIBUICAO):
+    """
+    Desenha a distribuição dos valores das imagens em faixas, alternativa às barras
+    individuais quando há muitas imagens.
+
+    :param figura: Figura do Matplotlib (é limpa antes do desenho).
+    :param valores: Valor de cada imagem.
+    :param titulo: Título do gráfico.
+    :param titulo_metrica: Rótulo do eixo x (a grandeza medida).
+    :param quantidade_faixas: Quantidade de faixas de valores.
+    """
+    figura.clear()
+    eixo = figura.add_subplot()
+    valores = np.asarray(valores, dtype=np.float64)
+    eixo.hist(valores[np.isfinite(valores)], bins=quantidade_faixas, color="steelblue")
+    eixo.set_title(f"{titulo} — distribuição de {valores.size} imagens")
+    eixo.set_xlabel(titulo_metrica)
+    eixo.set_ylabel("Quantidade de imagens")
+    figura.tight_layout()
+
+def desenhar_histograma(figura, histograma_agregado):
+    """
+    Desenha o histograma agregado das intensidades de todas as imagens, como um único
+    artista em degraus. Com mais de LIMITE_FAIXAS_HISTOGRAMA níveis (ex.: os 65536 da
+    profundidade nativa), níveis vizinhos são somados em faixas de mesma largura.
+
+    :param figura: Figura do Matplotlib (é limpa antes do desenho).
+    :param histograma_agregado: Soma dos histogramas (uma posição por nível).
+    """
+    figura.clear()
+    eixo = figura.add_subplot()
+    histograma_agregado = np.asarray(histograma_agregado)
+    niveis = histograma_agregado.size
+    largura_faixa = -(-niveis // LIMITE_FAIXAS_HISTOGRAMA)
+    faixas = np.add.reduceat(histograma_agregado, np.arange(0, niveis, largura_faixa))
+    bordas = np.minimum(np.arange(faixas.size + 1) * largura_faixa, niveis) - 0.5
+    eixo.stairs(faixas, bordas, fill=True, color="gray", alpha=0.7)
+    eixo.set_title("Histograma Agregado de Intensidades")
+    eixo.set_xlabel("Intensidade do Pixel")
+    eixo.set_ylabel("Frequência Total" if largura_faixa == 1 else f"Frequência Total (faixas de {largura_faixa} níveis)")
+    eixo.set_xlim([0, niveis - 1])
+    figura.tight_layout()
+
+def desenhar_pizza(figura, percentuais, rotulos, limite_fatias=LIMITE_FATIAS):
+    """
+    Desenha o percentual de consumo de energia de cada imagem. Com mais de
+    `limite_fatias` imagens, ou com fatias menores que MENOR_FRACAO_FATIA do total, as
+    menores são somadas em "Outras".
+
+    :param figura: Figura do Matplotlib (é limpa antes do desenho).
+    :param percentuais: Percentual de cada imagem.
+    :param rotulos: Rótulo de cada imagem.
+    :param limite_fatias: Quantidade máxima de fatias individuais.
+    """
+    figura.clear()
+    eixo = figura.add_subplot()
+    percentuais = np.nan_to_num(np.asarray(percentuais, dtype=np.float64))
+    total = percentuais.sum()
+    visiveis = int(np.count_nonzero(percentuais >= total * MENOR_FRACAO_FATIA)) if total > 0 else 0
+    percentuais, rotulos = agrupar_maiores(percentuais, rotulos, min(limite_fatias, visiveis))
+    if percentuais.sum() > 0:
+        eixo.pie(percentuais, labels=rotulos, autopct="%1.1f%%", startangle=140)
+    eixo.set_title("Percentual de Consumo de Energia por Imagem")
+    eixo.axis("equal")  # Para garantir que o gráfico seja circular
+
+class RenderizadorGraficos:
+    """
+    Desenha e exporta os gráficos de um lote sem interface gráfica (backend Agg). Cada
+    gráfico tem uma única figura, reaproveitada a cada desenho.
+    """
+
+    TAMANHOS = {"barras": (20, 10), "histograma": (10, 5), "pizza": (8, 8)}
+
+    def __init__(self, limite_barras=LIMITE_BARRAS, limite_fatias=LIMITE_FATIAS, dpi=100):
+        """
+        :param limite_barras: Quantidade máxima de barras individuais (as demais formam "Outras").
+        :param limite_fatias: Quantidade máxima de fatias do gráfico de pizza.
+        :param dpi: Resolução das imagens PNG.
+        """
+        self.limite_barras = limite_barras
+        self.limite_fatias = limite_fatias
+        self.dpi = dpi
+        self._figuras = {}
+
+    def figura(self, tipo):
+        """
+        Retorna a figura do tipo de gráfico ("barras", "histograma" ou "pizza"), criando-a
+        na primeira chamada.
+        """
+        if tipo not in self._figuras:
+            figura = Figure(figsize=self.TAMANHOS[tipo])
+            FigureCanvasAgg(figura)
+            self._figuras[tipo] = figura
+        return self._figuras[tipo]
+
+    def exportar(self, conjunto, diretorio_saida, formatos=("png",)):
+        """
+        Exporta todos os gráficos do lote (somas ponderadas, áreas por pixel, áreas
+        normalizadas, histograma agregado e pizza) em uma única passada. Com mais imagens
+        do que o limite de barras, também exporta a distribuição de cada grandeza.
+
+        :param conjunto: ConjuntoResultados do lote (as imagens com erro são ignoradas).
+        :param diretorio_saida: Diretório dos arquivos gerados.
+        :param formatos: Formatos dos arquivos (png e/ou svg).
+        :return: Lista de caminhos gravados.
+        """
+        os.makedirs(diretorio_saida, exist_ok=True)
+        validos = conjunto[conjunto.validos]
+        rotulos = [os.path.basename(str(caminho)) for caminho in validos.caminhos]
+        gravados = []
+
+        for nome, coluna, titulo, titulo_metrica in GRAFICOS_BARRAS:
+            desenhar_barras(self.figura("barras"), getattr(validos, coluna), rotulos, titulo, titulo_metrica, self.limite_barras)
+            gravados += self._gravar("barras", diretorio_saida, nome, formatos)
+            if len(validos) > self.limite_barras:
+                desenhar_distribuicao(self.figura("barras"), getattr(validos, coluna), titulo, titulo_metrica)
+                gravados += self._gravar("barras", diretorio_saida, nome + "_distribuicao", formatos)
+
+        desenhar_histograma(self.figura("histograma"), validos.histograma_total())
+        gravados += self._gravar("histograma", diretorio_saida, "histograma_agregado", formatos)
+
+        desenhar_pizza(self.figura("pizza"), validos.percentuais(), rotulos, self.limite_fatias)
+        gravados += self._gravar("pizza", diretorio_saida, "percentual_consumo_energia", formatos)
+        return gravados
+
+    def _gravar(self, tipo, diretorio_saida, nome, formatos):
+        caminhos = []
+        for formato in formatos:
+            caminho = os.path.join(diretorio_saida, f"{nome}.{formato}")
+            self.figura(tipo).savefig(caminho, format=formato, dpi=self.dpi)
+            caminhos.append(caminho)
+        return caminhos
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta os gráficos de um lote a partir de um arquivo .npz de resultados.")
+    parser.add_argument('resultados', help='Arquivo .npz gravado por pixerizador.py --formato npz ou por ConjuntoResultados.salvar.')
+    parser.add_argument('--saida', required=True, help='Diretório dos gráficos.')
+    parser.add_argument('--formatos_graficos', nargs='+', choices=FORMATOS_GRAFICOS, default=['png'], help='Formatos dos arquivos gerados.')
+    parser.add_argument('--top_k', type=int, default=LIMITE_BARRAS, help='Quantidade máxima de barras individuais; as demais imagens são agrupadas em "Outras".')
+    args = parser.parse_args()
+
+    for caminho in RenderizadorGraficos(args.top_k).exportar(ConjuntoResultados.carregar(args.resultados), args.saida, args.formatos_graficos):
+        print(caminho)
@@ -0,0 +1,205 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from contextlib import nullcontext
+
+# Contexto devolvido por etapa() quando a instrumentação está desativada: não mede nada.
+_ETAPA_NULA = nullcontext()
+
+_coletor = None  # Coletor ativo (None = instrumentação desativada).
+
+class _Coletor:
+    """
+    Guarda as etapas medidas no processo atual.
+    """
+
+    def __init__(self, medir_memoria):
+        self.medir_memoria = medir_memoria
+        self.pid = os.getpid()
+        self.eventos = []
+        self.pilha = threading.local()
+
+    def etapas_abertas(self):
+        if not hasattr(self.pilha, "etapas"):
+            self.pilha.etapas = []
+        return self.pilha.etapas
+
+class _Etapa:
+    """
+    Mede uma etapa: tempo de parede, tempo de CPU da thread e pico de bytes alocados
+    (via tracemalloc) entre a entrada e a saída do bloco.
+    """
+    __slots__ = ("coletor", "nome", "imagem", "inicio_ns", "inicio_cpu_ns", "memoria_inicial", "pico_absoluto")
+
+    def __init__(self, coletor, nome, imagem):
+        self.coletor = coletor
+        self.nome = nome
+        self.imagem = imagem
+
+    def __enter__(self):
+        self.memoria_inicial = self.pico_absoluto = 0
+        if self.coletor.medir_memoria:
+            atual, pico = tracemalloc.get_traced_memory()
+            abertas = self.coletor.etapas_abertas()
+            if abertas:
+                # O pico é zerado a seguir; a etapa externa guarda o que já tinha sido atingido.
+                abertas[-1].pico_absoluto = max(abertas[-1].pico_absoluto, pico)
+            tracemalloc.reset_peak()
+            self.memoria_inicial = self.pico_absoluto = atual
+        self.coletor.etapas_abertas().append(self)
+        self.inicio_cpu_ns = time.thread_time_ns()
+        self.inicio_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *excecao):
+        fim_ns = time.perf_counter_ns()
+        fim_cpu_ns = time.thread_time_ns()
+        abertas = self.coletor.etapas_abertas()
+        abertas.pop()
+
+        pico_bytes = None
+        if self.coletor.medir_memoria:
+            _, pico = tracemalloc.get_traced_memory()
+            self.pico_absoluto = max(self.pico_absoluto, pico)
+            pico_bytes = self.pico_absoluto - self.memoria_inicial
+            if abertas:
+                abertas[-1].pico_absoluto = max(abertas[-1].pico_absoluto, self.pico_absoluto)
+
+        self.coletor.eventos.append({
+            "nome": self.nome,
+            "imagem": None if self.imagem is None else str(self.imagem),  # Matrizes em memória ficam registradas pelo nome.
+            "inicio_ns": self.inicio_ns,
+            "duracao_ns": fim_ns - self.inicio_ns,
+            "cpu_ns": fim_cpu_ns - self.inicio_cpu_ns,
+            "pico_bytes": pico_bytes,
+            "pid": os.getpid(),
+            "tid": threading.get_ident()
+        })
+        return False
+
+def ativar(medir_memoria=True):
+    """
+    Ativa a instrumentação no processo atual, descartando as medidas anteriores.
+
+    :param medir_memoria: Se True, mede o pico de bytes alocados com tracemalloc (que
+        deixa as alocações mais lentas enquanto estiver ativo).
+    """
+    global _coletor
+    _coletor = _Coletor(medir_memoria)
+    if medir_memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def desativar():
+    """
+    Desativa a instrumentação e retorna os eventos coletados.
+
+    :return: Lista de eventos (um dicionário por etapa medida).
+    """
+    global _coletor
+    eventos = coletar()
+    if _coletor is not None and _coletor.medir_memoria and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _coletor = None
+    return eventos
+
+def ativa():
+    """
+    Indica se a instrumentação está ativa no processo atual. Um coletor herdado do
+    processo pai (fork de um worker) não conta: o worker deve ativar o seu.
+    """
+    return _coletor is not None and _coletor.pid == os.getpid()
+
+def medindo_memoria():
+    """
+    Indica se a instrumentação ativa também mede o pico de bytes alocados.
+    """
+    return _coletor is not None and _coletor.medir_memoria
+
+def etapa(nome, imagem=None):
+    """
+    Retorna um gerenciador de contexto que mede o bloco como uma etapa. Com a
+    instrumentação desativada, retorna um contexto vazio, sem nenhuma medida.
+
+    :param nome: Nome da etapa (ex.: "decodificar", "histograma").
+    :param imagem: Caminho da imagem processada na etapa (ou MatrizEmMemoria), se houver.
+    """
+    if _coletor is None:
+        return _ETAPA_NULA
+    return _Etapa(_coletor, nome, imagem)
+
+def coletar():
+    """
+    Retorna e remove os eventos coletados até agora no processo atual.
+    """
+    if _coletor is None:
+        return []
+    eventos, _coletor.eventos = _coletor.eventos, []
+    return eventos
+
+def incorporar(eventos):
+    """
+    Acrescenta ao coletor atual os eventos medidos em outro processo (ex.: um worker).
+    """
+    if _coletor is not None:
+        _coletor.eventos.extend(eventos)
+
+def exportar_chrome_trace(eventos, caminho_saida):
+    """
+    Grava os eventos no formato Trace Event do Chrome (chrome://tracing ou Perfetto).
+
+    :param eventos: Lista de eventos retornada por coletar() ou desativar().
+    :param caminho_saida: Caminho do arquivo JSON a ser gravado.
+    """
+    inicio_ns = min((evento["inicio_ns"] for evento in eventos), default=0)
+    trace = []
+    for evento in eventos:
+        argumentos = {"cpu_ms": evento["cpu_ns"] / 1e6}
+        if evento["imagem"] is not None:
+            argumentos["imagem"] = evento["imagem"]
+        if evento["pico_bytes"] is not None:
+            argumentos["pico_bytes"] = evento["pico_bytes"]
+        trace.append({
+            "name": evento["nome"],
+            "cat": "pixerizador",
+            "ph": "X",
+            "ts": (evento["inicio_ns"] - inicio_ns) / 1000,
+            "dur": evento["duracao_ns"] / 1000,
+            "pid": evento["pid"],
+            "tid": evento["tid"],
+            "args": argumentos
+        })
+    with open(caminho_saida, "w", encoding="utf-8") as arquivo:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, arquivo, ensure_ascii=False)
+
+def resumir(eventos):
+    """
+    Agrega os eventos por etapa.
+
+    :return: Dicionário ordenado {etapa: {quantidade, parede_s, cpu_s, pico_bytes}}, com
+        os tempos somados e o maior pico de memória de cada etapa.
+    """
+    resumo = OrderedDict()
+    for evento in sorted(eventos, key=lambda evento: evento["inicio_ns"]):
+        item = resumo.setdefault(evento["nome"], {"quantidade": 0, "parede_s": 0.0, "cpu_s": 0.0, "pico_bytes": None})
+        item["quantidade"] += 1
+        item["parede_s"] += evento["duracao_ns"] / 1e9
+        item["cpu_s"] += evento["cpu_ns"] / 1e9
+        if evento["pico_bytes"] is not None:
+            item["pico_bytes"] = max(item["pico_bytes"] or 0, evento["pico_bytes"])
+    return resumo
+
+def tabela_resumo(eventos):
+    """
+    Formata o resumo por etapa como uma tabela de texto.
+    """
+    linhas = [f"{'etapa':<24}{'n':>6}{'parede (s)':>12}{'média (ms)':>12}{'CPU (s)':>10}{'pico (MB)':>11}"]
+    for nome, item in resumir(eventos).items():
+        pico = f"{item['pico_bytes'] / (1024 * 1024):>11.1f}" if item["pico_bytes"] is not None else f"{'-':>11}"
+        linhas.append(
+            f"{nome:<24}{item['quantidade']:>6}{item['parede_s']:>12.4f}"
+            f"{item['parede_s'] * 1000 / item['quantidade']:>12.2f}{item['cpu_s']:>10.4f}{pico}"
+        )
+    return "\n".join(linhas)
@@ -0,0 +1,123 @@
+import numpy as np
+import cv2
+from PIL import Image
+
+# Quantidade padrão de bytes decodificados por faixa (antes da conversão para cinza)
+BYTES_POR_FAIXA_PADRAO = 64 * 1024 * 1024
+
+# Modos do Pillow cuja conversão para cinza reproduz exatamente cv2.imread + cv2.cvtColor
+MODOS_SUPORTADOS = ("1", "L", "RGB")
+
+# Modos de uma banda lidos sem conversão quando a profundidade nativa é mantida (16 bits, inteiros e float)
+MODOS_NATIVOS = ("I;16", "I;16L", "I;16B", "I", "F")
+BYTES_POR_AMOSTRA = {"I;16": 2, "I;16L": 2, "I;16B": 2, "I": 4, "F": 4}
+
+TAG_ORIENTACAO = 274  # Tag TIFF de orientação; apenas a orientação padrão (1) é lida em faixas.
+
+def abrir_faixas_cinza(caminho_imagem, bytes_por_faixa=BYTES_POR_FAIXA_PADRAO, profundidade_nativa=False):
+    """
+    Prepara a leitura de uma imagem TIFF em faixas horizontais, sem decodificar a
+    imagem inteira. As strips (ou linhas de tiles) do arquivo são agrupadas até atingir
+    o limite de bytes por faixa, de modo que o pico de memória seja proporcional ao
+    tamanho da faixa e não ao tamanho da imagem.
+
+    :param caminho_imagem: Caminho da imagem a ser lida.
+    :param bytes_por_faixa: Quantidade máxima de bytes decodificados por faixa.
+    :param profundidade_nativa: Se True, também lê TIFFs de uma banda de 16 bits, inteiros
+        de 32 bits e float, mantendo o tipo de dado do arquivo.
+    :return: Tupla (altura, largura, faixas), onde faixas é um gerador de arrays em escala
+        de cinza, ou None se o formato não permitir a leitura em faixas.
+    """
+    modos = MODOS_SUPORTADOS + MODOS_NATIVOS if profundidade_nativa else MODOS_SUPORTADOS
+    return _abrir_faixas(caminho_imagem, bytes_por_faixa, _converter_para_cinza, modos)
+
+def abrir_faixas_banda(caminho_imagem, bytes_por_faixa=BYTES_POR_FAIXA_PADRAO):
+    """
+    Como abrir_faixas_cinza, mas entrega os valores da primeira banda do raster (como o
+    GDAL os lê: 0 ou 1 em imagens de 1 bit e o canal vermelho em imagens RGB), sem
+    conversão para cinza.
+
+    :param caminho_imagem: Caminho da imagem a ser lida.
+    :param bytes_por_faixa: Quantidade máxima de bytes decodificados por faixa.
+    :return: Tupla (altura, largura, faixas) ou None se o formato não permitir a leitura em faixas.
+    """
+    return _abrir_faixas(caminho_imagem, bytes_por_faixa, _extrair_primeira_banda)
+
+def _abrir_faixas(caminho_imagem, bytes_por_faixa, converter, modos=MODOS_SUPORTADOS):
+    """
+    Lê as faixas de uma imagem TIFF, aplicando `converter(faixa, modo)` a cada uma.
+    """
+    try:
+        with Image.open(caminho_imagem) as imagem:
+            if imagem.format != "TIFF" or imagem.mode not in modos:
+                return None
+            if imagem.tag_v2.get(TAG_ORIENTACAO, 1) != 1:
+                return None
+            largura, altura = imagem.size
+            modo = imagem.mode
+            bytes_por_linha = largura * len(imagem.getbands()) * BYTES_POR_AMOSTRA.get(modo, 1)
+            tiles = list(imagem.tile)
+    except OSError:
+        return None
+
+    grupos = _agrupar_tiles(tiles, bytes_por_linha, bytes_por_faixa)
+
+    def faixas():
+        for topo, base, grupo in grupos:
+            yield converter(_ler_grupo(caminho_imagem, largura, topo, base, grupo), modo)
+
+    return altura, largura, faixas()
+
+def _agrupar_tiles(tiles, bytes_por_linha, bytes_por_faixa):
+    """
+    Agrupa os tiles por linha (mesmo intervalo vertical) e junta linhas consecutivas
+    enquanto couberem no limite de bytes por faixa.
+    """
+    linhas = {}
+    for tile in tiles:
+        _, y0, _, y1 = tile[1]
+        linhas.setdefault((y0, y1), []).append(tile)
+
+    grupos = []
+    for (y0, y1) in sorted(linhas):
+        if grupos:
+            topo, base, grupo = grupos[-1]
+            if base == y0 and (y1 - topo) * bytes_por_linha <= bytes_por_faixa:
+                grupos[-1] = (topo, y1, grupo + linhas[(y0, y1)])
+                continue
+        grupos.append((y0, y1, list(linhas[(y0, y1)])))
+    return grupos
+
+def _ler_grupo(caminho_imagem, largura, topo, base, grupo):
+    """
+    Decodifica apenas os tiles de um grupo, deslocados para o início da faixa.
+    """
+    with Image.open(caminho_imagem) as parte:
+        parte.tile = [_deslocar_tile(tile, topo) for tile in grupo]
+        parte._size = (largura, base - topo)  # Restringe a imagem à altura da faixa.
+        parte.load()
+        return np.asarray(parte)
+
+def _converter_para_cinza(faixa, modo):
+    if modo == "1":
+        return np.where(faixa, np.uint8(255), np.uint8(0))  # Mesmo resultado do OpenCV (0 ou 255).
+    if modo == "RGB":
+        return cv2.cvtColor(faixa, cv2.COLOR_RGB2GRAY)
+    return faixa
+
+def _extrair_primeira_banda(faixa, modo):
+    if modo == "1":
+        return np.not_equal(faixa, 0).view(np.uint8)  # Valores 0 ou 1, como na banda lida pelo GDAL.
+    if modo == "RGB":
+        return np.ascontiguousarray(faixa[..., 0])
+    return faixa
+
+def _deslocar_tile(tile, topo):
+    """
+    Desloca verticalmente a extensão de um tile para que a faixa comece na linha 0.
+    """
+    x0, y0, x1, y1 = tile[1]
+    extensao = (x0, y0 - topo, x1, y1 - topo)
+    if hasattr(tile, "_replace"):  # Versões recentes do Pillow usam uma namedtuple.
+        return tile._replace(extents=extensao)
+    return (tile[0], extensao) + tuple(tile[2:])
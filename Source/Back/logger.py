@@ -1,12 +1,171 @@
+import atexit
+import copy
+import json
 import logging
+import multiprocessing
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-def configurar_logs():
+ARQUIVO_LOG_PADRAO = 'processamento_imagens.log'
+NIVEL_PADRAO = 'INFO'  # Pode ser alterado pela variável de ambiente PIXELAREA_NIVEL_LOG.
+TAMANHO_MAXIMO_PADRAO_BYTES = 10 * 1024 * 1024  # Tamanho do arquivo de log antes da rotação.
+QUANTIDADE_BACKUPS_PADRAO = 3  # Arquivos antigos mantidos após a rotação.
+FORMATO_TEXTO = '%(asctime)s - %(levelname)s - %(message)s'
+IMAGENS_NO_RESUMO = 5  # Quantidade de imagens listadas nominalmente no resumo dos resultados.
+
+_ouvintes = []  # QueueListeners que gravam os registros no arquivo, cada um em uma thread própria.
+_fila_processos = None  # Fila dos registros emitidos pelos processos filhos (workers do pool).
+
+class FormatadorJSON(logging.Formatter):
+    """
+    Formata cada registro como um objeto JSON em uma linha. Dados passados em
+    `extra={"dados": {...}}` são incluídos como campos do registro.
+    """
+
+    def format(self, record):
+        registro = {
+            "tempo": self.formatTime(record),
+            "nivel": record.levelname,
+            "modulo": record.module,
+            "mensagem": record.getMessage()
+        }
+        dados = getattr(record, "dados", None)
+        if dados is not None:
+            registro["dados"] = dados
+        if record.exc_info:
+            registro["excecao"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            registro["excecao"] = record.exc_text  # Já formatada no processo filho (HandlerProcesso).
+        return json.dumps(registro, ensure_ascii=False, default=str)
+
+class HandlerFila(QueueHandler):
+    """
+    Enfileira os registros sem formatá-los. O QueueHandler padrão formata o registro na
+    thread de quem o emite e descarta exc_info; aqui apenas a mensagem é resolvida com
+    seus argumentos (que podem mudar depois da chamada), e o registro segue com exc_info
+    e os dados extras para o formatador do ouvinte.
+    """
+
+    def prepare(self, record):
+        registro = copy.copy(record)
+        registro.msg = record.getMessage()
+        registro.args = None
+        return registro
+
+class HandlerProcesso(QueueHandler):
+    """
+    Envia os registros de um processo filho ao ouvinte do processo principal, por uma
+    fila entre processos. Os registros precisam ser serializados: a mensagem é resolvida
+    e o traceback da exceção é formatado aqui, pois não pode ser enviado a outro processo.
+    """
+
+    def prepare(self, record):
+        registro = copy.copy(record)
+        registro.msg = record.getMessage()
+        registro.args = None
+        if record.exc_info:
+            registro.exc_text = registro.exc_text or logging.Formatter().formatException(record.exc_info)
+            registro.exc_info = None
+        return registro
+
+def configurar_logs(nivel=None, arquivo=ARQUIVO_LOG_PADRAO, estruturado=False,
+                    tamanho_maximo_bytes=TAMANHO_MAXIMO_PADRAO_BYTES, quantidade_backups=QUANTIDADE_BACKUPS_PADRAO):
     """
     Configura o sistema de logging para registrar eventos e erros em um arquivo.
     O arquivo de log será chamado 'processamento_imagens.log'.
+
+    Quem emite um registro apenas resolve a mensagem com seus argumentos e o enfileira
+    (HandlerFila); a formatação (data, JSON, traceback da exceção) e a escrita em disco
+    acontecem na thread do ouvinte. Os processos filhos criados por fork (ex.: workers do
+    pool) enviam seus registros por uma fila entre processos (HandlerProcesso), lida por
+    outro ouvinte que grava no mesmo handler; assim apenas o processo principal escreve e
+    rotaciona o arquivo, que é rotacionado ao atingir o tamanho máximo. Mensagens abaixo
+    do nível configurado não são formatadas.
+
+    :param nivel: Nível mínimo registrado (ex.: "DEBUG", "INFO"). Padrão: variável de
+        ambiente PIXELAREA_NIVEL_LOG ou INFO.
+    :param arquivo: Caminho do arquivo de log.
+    :param estruturado: Se True, grava um objeto JSON por linha em vez de texto.
+    :param tamanho_maximo_bytes: Tamanho do arquivo que dispara a rotação.
+    :param quantidade_backups: Quantidade de arquivos rotacionados mantidos.
+    """
+    global _fila_processos
+    nivel = (nivel or os.environ.get('PIXELAREA_NIVEL_LOG') or NIVEL_PADRAO).upper()
+    raiz = logging.getLogger()
+    raiz.setLevel(nivel)  # Define o nível de logging; abaixo dele nada é formatado.
+
+    encerrar_logs()  # Reconfiguração: os ouvintes anteriores esvaziam as filas antes de sair.
+    for handler in [h for h in raiz.handlers if isinstance(h, QueueHandler)]:
+        raiz.removeHandler(handler)
+
+    handler_arquivo = RotatingFileHandler(arquivo, maxBytes=tamanho_maximo_bytes, backupCount=quantidade_backups, encoding='utf-8')
+    handler_arquivo.setFormatter(FormatadorJSON() if estruturado else logging.Formatter(FORMATO_TEXTO))
+
+    fila = queue.SimpleQueue()
+    raiz.addHandler(HandlerFila(fila))
+    _fila_processos = multiprocessing.Queue()
+    for fila_ouvinte in (fila, _fila_processos):
+        ouvinte = QueueListener(fila_ouvinte, handler_arquivo, respect_handler_level=True)
+        ouvinte.start()
+        _ouvintes.append(ouvinte)
+
+def encerrar_logs():
+    """
+    Grava os registros pendentes na fila e encerra a thread de escrita.
+    """
+    global _fila_processos
+    for ouvinte in _ouvintes:
+        ouvinte.stop()
+    for handler in {handler for ouvinte in _ouvintes for handler in ouvinte.handlers}:
+        handler.close()
+    _ouvintes.clear()
+    if _fila_processos is not None:
+        _fila_processos.close()
+        _fila_processos = None
+
+def _apos_fork():
+    """
+    Em um processo filho (ex.: worker do pool), as threads dos ouvintes não existem; os
+    registros passam a ser enviados pela fila entre processos ao ouvinte do processo
+    principal, que continua sendo o único a escrever no arquivo.
+    """
+    if not _ouvintes:
+        return
+    raiz = logging.getLogger()
+    for handler in [h for h in raiz.handlers if isinstance(h, QueueHandler)]:
+        raiz.removeHandler(handler)
+    raiz.addHandler(HandlerProcesso(_fila_processos))
+    _ouvintes.clear()
+
+atexit.register(encerrar_logs)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_apos_fork)
+
+def resumir_resultados(resultados):
+    """
+    Resume uma lista de resultados para o log, sem os histogramas e sem os demais
+    campos de cada imagem.
+
+    :param resultados: Lista de resultados (dicionários ou ResultadoImagem) ou ConjuntoResultados.
+    :return: Dicionário com a quantidade de imagens, as imagens com erro e a soma total.
     """
-    logging.basicConfig(
-        filename='processamento_imagens.log',  # Nome do arquivo onde os logs serão armazenados.
-        level=logging.DEBUG,  # Define o nível de logging; DEBUG para registrar tudo.
-        format='%(asctime)s - %(levelname)s - %(message)s'  # Formato das mensagens de log.
-    )
\ No newline at end of file
+    if hasattr(resultados, "validos"):  # ConjuntoResultados: resumo direto das colunas.
+        validos = resultados.validos
+        return {
+            "quantidade": len(resultados),
+            "com_erro": int((~validos).sum()),
+            "imagens_com_erro": [str(caminho) for caminho in resultados.caminhos[~validos][:IMAGENS_NO_RESUMO]],
+            "soma_ponderada_total": float(resultados.soma_ponderada[validos].sum()),
+            "imagens": [os.path.basename(caminho) for caminho in resultados.caminhos[:IMAGENS_NO_RESUMO]]
+        }
+    registros = [resultado if isinstance(resultado, dict) else vars(resultado) for resultado in resultados]
+    com_erro = [registro["caminho_imagem"] for registro in registros if registro["erro_processamento"] is not None]
+    somas = [registro["soma_ponderada"] for registro in registros if registro.get("soma_ponderada") is not None]
+    return {
+        "quantidade": len(registros),
+        "com_erro": len(com_erro),
+        "imagens_com_erro": com_erro[:IMAGENS_NO_RESUMO],
+        "soma_ponderada_total": float(sum(somas)),
+        "imagens": [os.path.basename(registro["caminho_imagem"]) for registro in registros[:IMAGENS_NO_RESUMO]]
+    }
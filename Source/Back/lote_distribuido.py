@@ -0,0 +1,305 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import numpy as np
+import motor
+import pixerizador
+from conjunto_resultados import ConjuntoResultados
+from entradas_lote import ler_manifesto, varrer_diretorio
+from saida_resultados import FORMATOS_SAIDA, escrever_ndjson, escrever_npz
+from logger import logging, configurar_logs
+
+VERSAO_PARCIAL = 2  # Incrementada quando as colunas do arquivo parcial mudam.
+
+def selecionar_particao(entradas, particao, particoes):
+    """
+    Seleciona as entradas de uma partição do lote. A entrada de posição i pertence à
+    partição i % particoes, o que equilibra as partições sem conhecer o tamanho do lote
+    de antemão; as entradas das demais partições são descartadas durante a leitura.
+
+    Como a partição depende da posição, todas as partições precisam ler o lote na mesma
+    ordem (manifestos são lidos na ordem das linhas e diretórios, em ordem alfabética). A
+    impressão digital de todas as entradas, na ordem lida, é gravada em cada arquivo
+    parcial, e reduzir recusa partições que leram listas diferentes.
+
+    :param entradas: Iterável de tuplas (caminho_imagem, area_km2, limiar), na ordem do lote.
+    :param particao: Índice da partição (0 a particoes - 1).
+    :param particoes: Quantidade de partições do lote.
+    :return: Tupla (indices, imagens, areas_km2, limiares_imagens, quantidade_total,
+        impressao_lote); limiares_imagens é None quando nenhuma entrada define um limiar próprio.
+    """
+    if not 0 <= particao < particoes:
+        raise ValueError(f"Partição {particao} fora do intervalo de 0 a {particoes - 1}.")
+    indices, imagens, areas_km2, limiares_imagens = [], [], [], []
+    quantidade_total = 0
+    impressao = hashlib.sha256()
+    for indice, (caminho_imagem, area_km2, limiar) in enumerate(entradas):
+        quantidade_total += 1
+        impressao.update(json.dumps([str(caminho_imagem), area_km2, limiar]).encode("utf-8") + b"\n")
+        if indice % particoes == particao:
+            indices.append(indice)
+            imagens.append(caminho_imagem)
+            areas_km2.append(area_km2)
+            limiares_imagens.append(limiar)
+    if all(limiar is None for limiar in limiares_imagens):
+        limiares_imagens = None
+    return indices, imagens, areas_km2, limiares_imagens, quantidade_total, impressao.hexdigest()
+
+def mapear(requisicao, indices, quantidade_total, caminho_saida, particao=0, particoes=1, impressao_lote=""):
+    """
+    Processa as imagens de uma partição e grava suas estatísticas brutas (não
+    normalizadas) em um arquivo parcial.
+
+    :param requisicao: Parâmetros da partição (motor.RequisicaoProcessamento).
+    :param indices: Posição de cada imagem da requisição no lote completo.
+    :param quantidade_total: Quantidade de imagens do lote completo.
+    :param caminho_saida: Caminho do arquivo parcial (.npz).
+    :param particao: Índice desta partição.
+    :param particoes: Quantidade de partições do lote.
+    :param impressao_lote: Impressão digital das entradas do lote completo (ver selecionar_particao).
+    :return: Quantidade de imagens gravadas.
+    """
+    brutos = motor.iterar_brutos(requisicao)
+    return gravar_parcial(caminho_saida, zip(indices, brutos), requisicao.limiares, requisicao.kernel(), quantidade_total, particao, particoes, impressao_lote)
+
+def gravar_parcial(caminho_saida, brutos_indexados, limiares, kernel, quantidade_total, particao=0, particoes=1, impressao_lote=""):
+    """
+    Grava as estatísticas brutas de uma partição em um arquivo .npz comprimido: posição
+    no lote, caminho, erro, área por pixel, histograma e, para cada limiar, a contagem de
+    pixels claros e a soma das intensidades. O arquivo é gravado com outro nome e
+    renomeado ao final, de modo que um arquivo parcial nunca fica incompleto.
+
+    :param caminho_saida: Caminho do arquivo parcial.
+    :param brutos_indexados: Iterável de tuplas (posição no lote, estatísticas brutas).
+    :param limiares: Lista de limiares avaliados.
+    :param kernel: ParametrosKernel do histograma.
+    :param quantidade_total: Quantidade de imagens do lote completo.
+    :param particao: Índice desta partição.
+    :param particoes: Quantidade de partições do lote.
+    :param impressao_lote: Impressão digital das entradas do lote completo (ver selecionar_particao).
+    :return: Quantidade de imagens gravadas.
+    """
+    indices, caminhos, erros, areas_por_pixel, limiares_imagens, histogramas, contagens, somas = ([] for _ in range(8))
+    for indice, bruto in brutos_indexados:
+        indices.append(indice)
+        caminhos.append(str(bruto["caminho_imagem"]))
+        erros.append(bruto["erro_processamento"])
+        limiares_imagens.append(-1 if bruto.get("limiar") is None else bruto["limiar"])
+        if bruto["erro_processamento"] is None:
+            areas_por_pixel.append(bruto["area_por_pixel"])
+            histogramas.append(bruto["histograma"])
+            contagens.append([contagem for contagem, _ in bruto["estatisticas"]])
+            somas.append([soma for _, soma in bruto["estatisticas"]])
+        else:
+            areas_por_pixel.append(np.nan)
+            histogramas.append(np.zeros(kernel.niveis, dtype=np.int64))
+            contagens.append([-1] * len(limiares))
+            somas.append([np.nan] * len(limiares))
+
+    temporario = caminho_saida + ".tmp"
+    with open(temporario, "wb") as arquivo:
+        np.savez_compressed(
+            arquivo,
+            versao=np.int64(VERSAO_PARCIAL),
+            chave_kernel=np.array(kernel.chave),
+            limiares=np.asarray(limiares, dtype=np.int64),
+            quantidade_total=np.int64(quantidade_total),
+            particao=np.int64(particao),
+            particoes=np.int64(particoes),
+            impressao_lote=np.array(impressao_lote),
+            indices=np.asarray(indices, dtype=np.int64),
+            caminho_imagem=np.asarray(caminhos, dtype=str),
+            erro_processamento=np.asarray([erro or "" for erro in erros], dtype=str),
+            possui_erro=np.asarray([erro is not None for erro in erros], dtype=bool),
+            area_por_pixel=np.asarray(areas_por_pixel, dtype=np.float64),
+            limiar_imagem=np.asarray(limiares_imagens, dtype=np.int64),
+            histogramas=np.asarray(histogramas, dtype=np.int64).reshape(len(indices), kernel.niveis),
+            contagens=np.asarray(contagens, dtype=np.int64).reshape(len(indices), len(limiares)),
+            somas_intensidades=np.asarray(somas, dtype=np.float64).reshape(len(indices), len(limiares))
+        )
+    os.replace(temporario, caminho_saida)
+    return len(indices)
+
+def carregar_parcial(caminho_parcial):
+    """
+    Lê um arquivo gravado por gravar_parcial.
+
+    :param caminho_parcial: Caminho do arquivo parcial.
+    :return: Dicionário com as colunas do arquivo.
+    :raises ValueError: Se o arquivo não for um resultado parcial desta versão.
+    """
+    try:
+        arquivo = np.load(caminho_parcial, allow_pickle=False)
+    except ValueError:
+        arquivo = None  # Não é um arquivo NumPy.
+    if not isinstance(arquivo, np.lib.npyio.NpzFile) or "versao" not in arquivo.files or int(arquivo["versao"]) != VERSAO_PARCIAL:
+        raise ValueError(f"{caminho_parcial} não é um resultado parcial na versão {VERSAO_PARCIAL}.")
+    with arquivo:
+        return {nome: arquivo[nome] for nome in arquivo.files}
+
+def reduzir(caminhos_parciais):
+    """
+    Reúne os arquivos parciais de todas as partições de um lote, na ordem original das
+    imagens, e normaliza as áreas pela maior área por pixel do lote inteiro. O resultado
+    é o mesmo do processamento do lote em um único processo.
+
+    :param caminhos_parciais: Caminhos dos arquivos parciais, em qualquer ordem.
+    :return: Tupla (brutos, areas_normalizadas, limiares, niveis), como em
+        pixerizador.iterar_brutos e pixerizador.calcular_areas_normalizadas.
+    :raises ValueError: Se os parciais forem de lotes ou parâmetros diferentes (inclusive
+        listas de imagens lidas em outra ordem), ou se faltarem ou se repetirem imagens do lote.
+    """
+    parciais = [carregar_parcial(caminho) for caminho in caminhos_parciais]
+    if not parciais:
+        raise ValueError("Nenhum resultado parcial foi informado.")
+    referencia = parciais[0]
+    for caminho, parcial in zip(caminhos_parciais, parciais):
+        for nome in ("chave_kernel", "limiares", "quantidade_total", "particoes"):
+            if not np.array_equal(parcial[nome], referencia[nome]):
+                raise ValueError(f"{caminho} foi gerado com outro valor de {nome} ({parcial[nome]} em vez de {referencia[nome]}).")
+        if parcial["impressao_lote"] != referencia["impressao_lote"]:
+            raise ValueError(f"{caminho} foi gerado com outra lista de imagens (caminhos, áreas, limiares ou ordem diferentes) que {caminhos_parciais[0]}.")
+
+    indices = np.concatenate([parcial["indices"] for parcial in parciais])
+    quantidade_total = int(referencia["quantidade_total"])
+    presentes = np.bincount(indices, minlength=quantidade_total) if indices.size else np.zeros(quantidade_total, dtype=np.int64)
+    if np.any(presentes > 1):
+        raise ValueError(f"{int(np.count_nonzero(presentes > 1))} imagens aparecem em mais de um resultado parcial.")
+    if presentes.size != quantidade_total or np.any(presentes == 0):
+        raise ValueError(f"Faltam {int(np.count_nonzero(presentes == 0))} das {quantidade_total} imagens do lote; verifique se todas as partições foram informadas.")
+
+    brutos = list(itertools.chain.from_iterable(_brutos_da_parcial(parcial) for parcial in parciais))
+    brutos = [brutos[posicao] for posicao in np.argsort(indices, kind="stable")]
+    limiares = referencia["limiares"].tolist()
+    return brutos, pixerizador.calcular_areas_normalizadas(brutos), limiares, referencia["histogramas"].shape[1]
+
+def _brutos_da_parcial(parcial):
+    for linha, caminho_imagem in enumerate(parcial["caminho_imagem"].tolist()):
+        bruto = {
+            "erro_processamento": None,
+            "caminho_imagem": caminho_imagem,
+            "area_por_pixel": None,
+            "pesos_linhas": None,
+            "limiar": None if parcial["limiar_imagem"][linha] < 0 else int(parcial["limiar_imagem"][linha]),
+            "histograma": None,
+            "histograma_ponderado": None,
+            "estatisticas": None
+        }
+        if parcial["possui_erro"][linha]:
+            bruto["erro_processamento"] = str(parcial["erro_processamento"][linha])
+        else:
+            bruto["area_por_pixel"] = float(parcial["area_por_pixel"][linha])
+            bruto["histograma"] = parcial["histogramas"][linha]
+            bruto["estatisticas"] = list(zip(parcial["contagens"][linha].tolist(), parcial["somas_intensidades"][linha].tolist()))
+        yield bruto
+
+def _entradas_da_linha_de_comando(parser, args):
+    if sum(bool(opcao) for opcao in (args.imagens, args.manifesto, args.varrer)) != 1:
+        parser.error("Informe as imagens com apenas uma das opções --imagens, --manifesto ou --varrer.")
+    if args.manifesto:
+        return ler_manifesto(args.manifesto)
+    if args.varrer:
+        return varrer_diretorio(args.varrer, args.padrao)
+    areas_km2 = args.areas_km
+    if areas_km2 is None and args.georreferenciado:
+        areas_km2 = [None] * len(args.imagens)  # As áreas vêm da geometria de cada imagem.
+    if areas_km2 is None or len(areas_km2) != len(args.imagens):
+        parser.error("O número de imagens deve ser igual ao número de áreas.")
+    return zip(args.imagens, areas_km2, itertools.repeat(None))
+
+def _executar_mapa(parser, args):
+    limiares = pixerizador.interpretar_limiares(args.limiar)
+    try:
+        indices, imagens, areas_km2, limiares_imagens, quantidade_total, impressao_lote = selecionar_particao(_entradas_da_linha_de_comando(parser, args), args.particao, args.particoes)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if limiares_imagens is not None and len(limiares) > 1:
+        parser.error("Os limiares do manifesto não podem ser combinados com uma varredura de --limiar.")
+
+    requisicao = motor.RequisicaoProcessamento(
+        imagens=imagens,
+        areas_km2=areas_km2,
+        limiares=limiares,
+        bytes_por_faixa=int(args.faixa_mb * 1024 * 1024) if args.faixa_mb else None,
+        workers=args.workers,
+        usar_cache_resultados=not args.sem_cache,
+        diretorio_cache=args.dir_cache,
+        georreferencias=[True] * len(imagens) if args.georreferenciado else None,
+        profundidade_nativa=args.profundidade_nativa,
+        niveis=args.niveis,
+        valor_maximo_float=args.valor_maximo_float,
+        limiares_imagens=limiares_imagens
+    )
+    try:
+        requisicao.kernel()
+    except ValueError as e:
+        parser.error(str(e))
+    quantidade = mapear(requisicao, indices, quantidade_total, args.saida, args.particao, args.particoes, impressao_lote)
+    logging.info("Partição %d de %d: %d de %d imagens gravadas em %s.", args.particao, args.particoes, quantidade, quantidade_total, args.saida)
+
+def _executar_reducao(parser, args):
+    try:
+        brutos, areas_normalizadas, limiares, niveis = reduzir(args.parciais)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    if args.formato == 'repr':
+        conjunto = ConjuntoResultados.de_brutos(brutos, areas_normalizadas, limiares)
+        print(conjunto.como_dicts() if len(conjunto) else [])
+        return
+
+    resultados = (
+        motor.ResultadoImagem(**pixerizador.consolidar_resultado(bruto, area_normalizada, limiares)).como_dict()
+        for bruto, area_normalizada in zip(brutos, areas_normalizadas)
+    )
+    if args.formato == 'ndjson':
+        if args.saida:
+            with open(args.saida, 'w', encoding='utf-8') as arquivo:
+                quantidade = escrever_ndjson(resultados, arquivo)
+        else:
+            quantidade = escrever_ndjson(resultados, sys.stdout)
+        logging.info("%d resultados escritos em NDJSON.", quantidade)
+    else:
+        if not args.saida:
+            parser.error("--saida é obrigatório com --formato npz.")
+        quantidade = escrever_npz(resultados, len(brutos), args.saida, limiares, niveis)
+        logging.info("%d resultados escritos em %s.", quantidade, args.saida)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Divide um lote em partições processadas de forma independente (mapear) e reúne os resultados parciais com a normalização global (reduzir).")
+    parser.add_argument('--nivel_log', '--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default=None, help='Nível mínimo registrado no arquivo de log (padrão: INFO ou a variável PIXELAREA_NIVEL_LOG).')
+    parser.add_argument('--log_json', action='store_true', help='Grava o log como um objeto JSON por linha.')
+    subcomandos = parser.add_subparsers(required=True)
+
+    mapa = subcomandos.add_parser('mapear', aliases=['map'], help='Processa uma partição do lote e grava as estatísticas brutas em um arquivo parcial.')
+    mapa.add_argument('--imagens', nargs='+', help='Caminhos das imagens do lote completo.')
+    mapa.add_argument('--areas_km', nargs='+', type=float, help='Área em km² de cada imagem do lote completo.')
+    mapa.add_argument('--manifesto', '--manifest', default=None, help='Manifesto CSV ou NDJSON do lote completo (ver pixerizador.py --manifesto).')
+    mapa.add_argument('--varrer', '--scan', default=None, help='Diretório com as imagens do lote completo.')
+    mapa.add_argument('--padrao', '--glob', default=None, help='Com --varrer, padrão glob dos arquivos.')
+    mapa.add_argument('--particao', '--shard', type=int, default=0, help='Índice desta partição (0 a --particoes - 1); a imagem de posição i pertence à partição i %% --particoes.')
+    mapa.add_argument('--particoes', '--shards', type=int, default=1, help='Quantidade de partições do lote.')
+    mapa.add_argument('--saida', required=True, help='Arquivo parcial (.npz) gravado por esta partição.')
+    mapa.add_argument('--limiar', nargs='+', default=[str(pixerizador.LIMIAR_PADRAO)], help='Limiar para considerar pixels claros; aceita varreduras como pixerizador.py.')
+    mapa.add_argument('--faixa_mb', type=float, default=None, help='Lê as imagens TIFF em faixas de até este tamanho em MB.')
+    mapa.add_argument('--workers', type=int, default=1, help='Quantidade de processos usados nesta partição.')
+    mapa.add_argument('--sem_cache', '--no-cache', action='store_true', help='Não usa o cache persistente de resultados.')
+    mapa.add_argument('--dir_cache', default=None, help='Diretório do cache persistente de resultados.')
+    mapa.add_argument('--georreferenciado', action='store_true', help='Considera a latitude de cada linha, lendo o geotransform dos GeoTIFFs.')
+    mapa.add_argument('--profundidade_nativa', '--native-depth', action='store_true', help='Mantém a profundidade nativa das imagens (ver pixerizador.py).')
+    mapa.add_argument('--niveis', '--bins', type=int, default=None, help='Com --profundidade_nativa, quantidade de posições do histograma.')
+    mapa.add_argument('--valor_maximo_float', type=float, default=1.0, help='Com --profundidade_nativa, valor das imagens de ponto flutuante associado à última posição do histograma.')
+    mapa.set_defaults(executar=_executar_mapa)
+
+    reducao = subcomandos.add_parser('reduzir', aliases=['reduce'], help='Reúne os arquivos parciais de todas as partições e emite os resultados finais.')
+    reducao.add_argument('parciais', nargs='+', help='Arquivos parciais gravados por "mapear", em qualquer ordem.')
+    reducao.add_argument('--formato', '--format', choices=FORMATOS_SAIDA, default='repr', help='Formato da saída, como em pixerizador.py.')
+    reducao.add_argument('--saida', help='Arquivo de saída (obrigatório para npz; para ndjson, o padrão é a saída padrão).')
+    reducao.set_defaults(executar=_executar_reducao)
+
+    args = parser.parse_args()
+    configurar_logs(args.nivel_log, estruturado=args.log_json)
+    args.executar(parser, args)
@@ -0,0 +1,154 @@
+import struct
+
+# Tags TIFF/Exif utilizadas na leitura do cabeçalho
+TAG_LARGURA = 256
+TAG_ALTURA = 257
+TAG_BITS_POR_AMOSTRA = 258
+TAG_FOTOMETRICA = 262
+TAG_ORIENTACAO = 274
+TAG_AMOSTRAS_POR_PIXEL = 277
+
+# Quantidade de canais de cada tipo de cor do PNG (campo "color type" do IHDR)
+CANAIS_POR_TIPO_COR_PNG = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+TIPO_COR_PNG_PALETA = 3
+FOTOMETRICA_PALETA = 3  # Valor da tag PhotometricInterpretation em TIFFs com paleta.
+
+# Marcadores SOF do JPEG (exceto DHT, JPG e DAC, que compartilham a faixa 0xC0-0xCF)
+MARCADORES_SOF_JPEG = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# Tamanho (em bytes) de cada tipo de campo de uma entrada de IFD do TIFF
+TAMANHO_TIPO_TIFF = {1: 1, 3: 2, 4: 4, 16: 8}
+
+def sondar_imagem(caminho_imagem):
+    """
+    Lê apenas o cabeçalho da imagem (IHDR do PNG, IFD do TIFF ou SOF do JPEG) para obter
+    suas dimensões, sem decodificar os pixels.
+
+    As dimensões seguem a orientação aplicada pelo OpenCV: imagens com orientação
+    TIFF/Exif de 5 a 8 (rotacionadas em 90°) têm altura e largura trocadas.
+
+    :param caminho_imagem: Caminho da imagem.
+    :return: Dicionário com largura, altura, canais, profundidade_bits e paleta (True
+        quando o único canal guarda índices de uma paleta de cores), ou None se o formato
+        não for suportado ou o cabeçalho não puder ser lido.
+    """
+    try:
+        with open(caminho_imagem, 'rb') as arquivo:
+            assinatura = arquivo.read(8)
+            arquivo.seek(0)
+            if assinatura.startswith(b'\x89PNG\r\n\x1a\n'):
+                return _sondar_png(arquivo)
+            if assinatura[:4] in (b'II*\x00', b'MM\x00*', b'II+\x00', b'MM\x00+'):
+                return _sondar_tiff(arquivo, 0)
+            if assinatura.startswith(b'\xff\xd8'):
+                return _sondar_jpeg(arquivo)
+    except (OSError, struct.error, ValueError):
+        return None
+    return None
+
+def _sondar_png(arquivo):
+    cabecalho = arquivo.read(26)
+    if cabecalho[12:16] != b'IHDR':
+        return None
+    largura, altura, profundidade_bits, tipo_cor = struct.unpack('>IIBB', cabecalho[16:26])
+    return _metadados(largura, altura, CANAIS_POR_TIPO_COR_PNG.get(tipo_cor), profundidade_bits, tipo_cor == TIPO_COR_PNG_PALETA)
+
+def _sondar_tiff(arquivo, inicio):
+    """
+    Lê as tags do primeiro IFD de uma estrutura TIFF que começa em `inicio` (no próprio
+    arquivo TIFF ou dentro do segmento Exif de um JPEG).
+    """
+    arquivo.seek(inicio)
+    cabecalho = arquivo.read(16)
+    ordem = '<' if cabecalho[:2] == b'II' else '>'
+    versao, = struct.unpack(ordem + 'H', cabecalho[2:4])
+    if versao == 43:  # BigTIFF: offsets e contadores de 8 bytes.
+        deslocamento_ifd, = struct.unpack(ordem + 'Q', cabecalho[8:16])
+        formato_contagem, formato_entrada, tamanho_entrada, tamanho_valor = 'Q', 'HHQ', 20, 8
+    else:
+        deslocamento_ifd, = struct.unpack(ordem + 'I', cabecalho[4:8])
+        formato_contagem, formato_entrada, tamanho_entrada, tamanho_valor = 'H', 'HHI', 12, 4
+
+    arquivo.seek(inicio + deslocamento_ifd)
+    tamanho_contagem = struct.calcsize(formato_contagem)
+    quantidade, = struct.unpack(ordem + formato_contagem, arquivo.read(tamanho_contagem))
+    entradas = arquivo.read(quantidade * tamanho_entrada)
+
+    tags = {}
+    for posicao in range(0, len(entradas) - tamanho_entrada + 1, tamanho_entrada):
+        entrada = entradas[posicao:posicao + tamanho_entrada]
+        tag, tipo, contagem = struct.unpack(ordem + formato_entrada, entrada[:-tamanho_valor])
+        if tag not in (TAG_LARGURA, TAG_ALTURA, TAG_BITS_POR_AMOSTRA, TAG_FOTOMETRICA, TAG_ORIENTACAO, TAG_AMOSTRAS_POR_PIXEL):
+            continue
+        tamanho = TAMANHO_TIPO_TIFF.get(tipo)
+        if tamanho is None or contagem == 0:
+            continue
+        valor = entrada[-tamanho_valor:]
+        if tamanho * contagem > tamanho_valor:
+            # O valor não cabe na entrada; ela guarda o deslocamento do primeiro valor.
+            deslocamento, = struct.unpack(ordem + ('Q' if tamanho_valor == 8 else 'I'), valor)
+            retorno = arquivo.tell()
+            arquivo.seek(inicio + deslocamento)
+            valor = arquivo.read(tamanho)
+            arquivo.seek(retorno)
+        tags[tag], = struct.unpack(ordem + {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}[tamanho], valor[:tamanho])
+
+    if TAG_LARGURA not in tags or TAG_ALTURA not in tags:
+        return None
+    metadados = _metadados(tags[TAG_LARGURA], tags[TAG_ALTURA], tags.get(TAG_AMOSTRAS_POR_PIXEL, 1), tags.get(TAG_BITS_POR_AMOSTRA, 1), tags.get(TAG_FOTOMETRICA) == FOTOMETRICA_PALETA)
+    return _aplicar_orientacao(metadados, tags.get(TAG_ORIENTACAO, 1))
+
+def _sondar_jpeg(arquivo):
+    arquivo.seek(2)
+    orientacao = 1
+    while True:
+        marcador = arquivo.read(2)
+        if len(marcador) < 2 or marcador[0] != 0xFF:
+            return None
+        while marcador[1] == 0xFF:  # Bytes de preenchimento entre marcadores.
+            marcador = marcador[1:] + arquivo.read(1)
+        tipo = marcador[1]
+        if tipo in (0xD8, 0x01) or 0xD0 <= tipo <= 0xD7:
+            continue  # Marcadores sem segmento de dados.
+        tamanho, = struct.unpack('>H', arquivo.read(2))
+        inicio_segmento = arquivo.tell()
+        if tipo in MARCADORES_SOF_JPEG:
+            profundidade_bits, altura, largura, canais = struct.unpack('>BHHB', arquivo.read(6))
+            return _aplicar_orientacao(_metadados(largura, altura, canais, profundidade_bits), orientacao)
+        if tipo == 0xE1 and arquivo.read(6) == b'Exif\x00\x00':
+            exif = _sondar_orientacao_exif(arquivo, inicio_segmento + 6)
+            if exif is not None:
+                orientacao = exif
+        if tipo == 0xDA:
+            return None  # Início dos dados comprimidos sem um SOF: arquivo inválido.
+        arquivo.seek(inicio_segmento + tamanho - 2)
+
+def _sondar_orientacao_exif(arquivo, inicio):
+    """
+    Obtém a orientação do IFD Exif de um JPEG (estrutura TIFF sem largura e altura).
+    """
+    arquivo.seek(inicio)
+    cabecalho = arquivo.read(8)
+    ordem = '<' if cabecalho[:2] == b'II' else '>'
+    deslocamento_ifd, = struct.unpack(ordem + 'I', cabecalho[4:8])
+    arquivo.seek(inicio + deslocamento_ifd)
+    quantidade, = struct.unpack(ordem + 'H', arquivo.read(2))
+    for _ in range(quantidade):
+        tag, tipo, _, valor = struct.unpack(ordem + 'HHI4s', arquivo.read(12))
+        if tag == TAG_ORIENTACAO and tipo == 3:
+            return struct.unpack(ordem + 'H', valor[:2])[0]
+    return None
+
+def _metadados(largura, altura, canais, profundidade_bits, paleta=False):
+    return {
+        "largura": largura,
+        "altura": altura,
+        "canais": canais,
+        "profundidade_bits": profundidade_bits,
+        "paleta": paleta
+    }
+
+def _aplicar_orientacao(metadados, orientacao):
+    if orientacao in (5, 6, 7, 8):  # Rotações de 90°: o OpenCV troca altura e largura.
+        metadados["largura"], metadados["altura"] = metadados["altura"], metadados["largura"]
+    return metadados
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from cache_resultados import diretorio_cache_padrao, identidade_arquivo
+from entradas_matriciais import e_matriz, abrir_matriz
+import instrumentacao
+
+WORKERS_PADRAO = 2  # Threads de decodificação; o Pillow libera o GIL enquanto decodifica.
+SUBDIRETORIO_CACHE = "miniaturas"
+
+# Modos que o Tk exibe diretamente; os demais (16 bits, inteiros e float) são reescalados para 8 bits.
+MODOS_EXIBIVEIS = ("1", "L", "P", "RGB", "RGBA")
+
+def gerar_miniatura(caminho_imagem, tamanho):
+    """
+    Decodifica a imagem em resolução reduzida e gera a miniatura. Em JPEGs, o draft do
+    Pillow decodifica diretamente em 1/2, 1/4 ou 1/8 da resolução; nos demais formatos,
+    a imagem é reduzida por um fator inteiro (reduce) antes do redimensionamento final.
+    Matrizes (.npy e rasters brutos) são amostradas a cada `fator` pixels diretamente do
+    arquivo mapeado.
+
+    :param caminho_imagem: Caminho da imagem.
+    :param tamanho: Tupla (largura, altura) máxima da miniatura.
+    :return: Imagem do Pillow pronta para exibição.
+    """
+    if e_matriz(caminho_imagem):
+        matriz = abrir_matriz(caminho_imagem)
+        fator = max(1, min(matriz.shape[1] // tamanho[0], matriz.shape[0] // tamanho[1]))
+        amostra = np.array(matriz[::fator, ::fator])
+        miniatura = Image.fromarray(amostra[..., 0] if amostra.ndim == 3 and amostra.shape[2] == 1 else amostra)
+        miniatura.thumbnail(tamanho)
+        return _para_exibicao(miniatura)
+
+    with Image.open(caminho_imagem) as imagem:
+        imagem.draft("RGB" if imagem.mode not in ("L", "1") else imagem.mode, tamanho)
+        fator = max(1, min(imagem.width // tamanho[0], imagem.height // tamanho[1]))
+        origem = imagem
+        if imagem.mode == "1":
+            origem = imagem.convert("L")  # Reduz em tons de cinza, sem serrilhado.
+        elif imagem.mode.startswith("I;16"):
+            origem = imagem.convert("I")  # O reduce não aceita os modos de 16 bits.
+        miniatura = origem.reduce(fator) if fator > 1 and origem.mode != "P" else origem.copy()
+    miniatura.thumbnail(tamanho)
+    return _para_exibicao(miniatura)
+
+def _para_exibicao(imagem):
+    if imagem.mode in MODOS_EXIBIVEIS:
+        return imagem
+    if imagem.mode in ("LA", "PA", "RGBX", "CMYK", "YCbCr", "LAB", "HSV"):
+        return imagem.convert("RGBA" if "A" in imagem.mode else "RGB")
+    valores = np.asarray(imagem, dtype=np.float64)
+    maior = valores.max() if valores.size else 0
+    escala = 255.0 / maior if maior > 0 else 0.0
+    return Image.fromarray(np.clip(valores * escala, 0, 255).astype(np.uint8))
+
+class ServicoMiniaturas:
+    """
+    Gera miniaturas fora da thread da interface. As imagens são decodificadas em um pool
+    de threads e as miniaturas prontas ficam em uma fila até que a thread da interface
+    chame entregar_prontas(), que executa os callbacks registrados. As miniaturas também
+    são gravadas em disco, identificadas pelo arquivo (caminho, tamanho e data de
+    modificação) e pelo tamanho pedido.
+
+    Uso com o Tk:
+        servico.solicitar(caminho, (100, 100), lambda imagem, erro: ...)
+        root.after(50, servico.entregar_prontas)  # Repetido periodicamente.
+    """
+
+    def __init__(self, workers=WORKERS_PADRAO, diretorio_cache=None, usar_cache=True):
+        """
+        :param workers: Quantidade de threads de decodificação.
+        :param diretorio_cache: Diretório das miniaturas em disco (padrão: dentro de diretorio_cache_padrao()).
+        :param usar_cache: Se False, as miniaturas não são lidas nem gravadas em disco.
+        """
+        self.diretorio_cache = diretorio_cache or os.path.join(diretorio_cache_padrao(), SUBDIRETORIO_CACHE)
+        self.usar_cache = usar_cache
+        self.acertos = 0
+        self.geradas = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="miniaturas")
+        self._prontas = queue.SimpleQueue()
+
+    def solicitar(self, caminho_imagem, tamanho, ao_concluir):
+        """
+        Agenda a geração de uma miniatura. Retorna imediatamente.
+
+        :param caminho_imagem: Caminho da imagem.
+        :param tamanho: Tupla (largura, altura) máxima da miniatura.
+        :param ao_concluir: Função chamada por entregar_prontas() com (imagem, erro); em
+            caso de falha, imagem é None e erro é a exceção.
+        :return: Future da geração.
+        """
+        return self.executar(self.obter, ao_concluir, caminho_imagem, tuple(tamanho))
+
+    def executar(self, funcao, ao_concluir, *args):
+        """
+        Executa outra tarefa lenta da interface no mesmo pool (ex.: a estimativa de área
+        de uma imagem) e entrega o resultado pela mesma fila. Retorna imediatamente.
+
+        :param funcao: Função executada no pool com os argumentos `args`.
+        :param ao_concluir: Função chamada por entregar_prontas() com (resultado, erro).
+        :return: Future da tarefa.
+        """
+        return self._executor.submit(self._executar, funcao, args, ao_concluir)
+
+    def _executar(self, funcao, args, ao_concluir):
+        try:
+            resultado = funcao(*args)
+        except Exception as erro:  # O erro é entregue ao callback, na thread da interface.
+            self._prontas.put((ao_concluir, None, erro))
+        else:
+            self._prontas.put((ao_concluir, resultado, None))
+
+    def obter(self, caminho_imagem, tamanho):
+        """
+        Retorna a miniatura, lendo-a do disco se já tiver sido gerada. Bloqueia a thread
+        que a chama; na interface, use solicitar().
+
+        :param caminho_imagem: Caminho da imagem.
+        :param tamanho: Tupla (largura, altura) máxima da miniatura.
+        :return: Imagem do Pillow.
+        """
+        caminho_cache = self._caminho_cache(caminho_imagem, tamanho) if self.usar_cache else None
+        if caminho_cache is not None and os.path.exists(caminho_cache):
+            try:
+                with Image.open(caminho_cache) as imagem:
+                    imagem.load()
+                    self.acertos += 1
+                    return imagem.copy()
+            except OSError:
+                pass  # Arquivo corrompido: a miniatura é gerada novamente.
+
+        with instrumentacao.etapa("miniatura", caminho_imagem):
+            miniatura = gerar_miniatura(caminho_imagem, tamanho)
+        self.geradas += 1
+        if caminho_cache is not None:
+            self._gravar(miniatura, caminho_cache)
+        return miniatura
+
+    def _caminho_cache(self, caminho_imagem, tamanho):
+        chave = f"{identidade_arquivo(caminho_imagem)}|{tamanho[0]}x{tamanho[1]}"
+        return os.path.join(self.diretorio_cache, hashlib.blake2b(chave.encode("utf-8"), digest_size=16).hexdigest() + ".png")
+
+    def _gravar(self, miniatura, caminho_cache):
+        temporario = f"{caminho_cache}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.diretorio_cache, exist_ok=True)
+            miniatura.save(temporario, format="PNG")
+            os.replace(temporario, caminho_cache)  # Outra thread nunca lê um arquivo pela metade.
+        except OSError:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+
+    def entregar_prontas(self, limite=None):
+        """
+        Executa, na thread que chama (a da interface), os callbacks das miniaturas prontas.
+
+        :param limite: Quantidade máxima de callbacks executados nesta chamada.
+        :return: Quantidade de callbacks executados.
+        """
+        entregues = 0
+        while limite is None or entregues < limite:
+            try:
+                ao_concluir, imagem, erro = self._prontas.get_nowait()
+            except queue.Empty:
+                break
+            ao_concluir(imagem, erro)
+            entregues += 1
+        return entregues
+
+    def encerrar(self):
+        """
+        Cancela as miniaturas ainda não iniciadas e encerra o pool.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
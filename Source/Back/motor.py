@@ -0,0 +1,591 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import List, Optional
+import pixerizador
+from conjunto_resultados import ConjuntoResultados
+from cache_imagens import CacheImagens, ORCAMENTO_PADRAO_BYTES
+from cache_resultados import CacheResultados, ORCAMENTO_PADRAO_BYTES as ORCAMENTO_PADRAO_RESULTADOS_BYTES
+from diario_processamento import DiarioProcessamento, parametros_diario, INTERVALO_IMAGENS_PADRAO
+from entradas_matriciais import MatrizEmMemoria, nome_imagem
+
+@dataclass
+class RequisicaoProcessamento:
+    """
+    Parâmetros de um lote de imagens a ser processado pelo motor.
+
+    :param imagens: Caminhos das imagens a serem processadas (inclusive matrizes .npy e
+        rasters brutos com descritor) ou rasters em memória: MatrizEmMemoria ou qualquer
+        objeto com o protocolo de buffer (ndarray, memoryview), identificado nos resultados
+        como "<memória N>" pela sua posição no lote. Como o nome não identifica o conteúdo,
+        uma SessaoResultados processa novamente os rasters em memória a cada requisição.
+    :param areas_km2: Área de cada imagem em km² (None para estimá-la).
+    :param limiares: Limiares para considerar pixels claros; os campos principais do
+        resultado usam o primeiro, os demais formam a varredura de limiares.
+    :param bytes_por_faixa: Limite de bytes por faixa na leitura de TIFFs (None lê a imagem inteira).
+    :param workers: Quantidade de processos usados na etapa por imagem.
+    :param orcamento_cache_bytes: Orçamento do cache de imagens decodificadas.
+    :param usar_cache_resultados: Usa o cache persistente das estatísticas brutas entre execuções.
+    :param reconstruir_cache: Recalcula todas as imagens e substitui as entradas do cache persistente.
+    :param diretorio_cache: Diretório do cache persistente (None usa o diretório padrão).
+    :param cache_por_conteudo: Identifica as imagens pelo hash do conteúdo em vez dos metadados do arquivo.
+    :param orcamento_cache_resultados_bytes: Orçamento em disco do cache persistente.
+    :param georreferencias: Georreferência de cada imagem (None, True para ler o geotransform
+        do GeoTIFF ou os limites (oeste, sul, leste, norte) em graus); None desativa o modo
+        georreferenciado para o lote inteiro.
+    :param profundidade_nativa: Mantém o tipo de dado das imagens (16 bits, float) em vez de
+        reduzi-las a 8 bits; os histogramas passam a ter `niveis` posições.
+    :param niveis: Posições do histograma com a profundidade nativa (None usa 65536).
+    :param valor_maximo_float: Valor associado à última posição em imagens de ponto flutuante.
+    :param limiares_imagens: Limiar próprio de cada imagem (None usa o do lote), que substitui
+        o limiar principal da imagem; None usa os limiares do lote para todas.
+    :param caminho_diario: Diário em que as estatísticas brutas de cada imagem concluída
+        são registradas periodicamente (None desativa o diário).
+    :param retomar: Reaproveita as imagens já registradas no diário, em vez de recriá-lo.
+    :param repetir_falhas: Ao retomar, processa novamente as imagens registradas com erro.
+    :param intervalo_diario: Imagens concluídas acumuladas antes de cada gravação do diário.
+    """
+    imagens: List[str]
+    areas_km2: List[Optional[float]]
+    limiares: List[int] = field(default_factory=lambda: [pixerizador.LIMIAR_PADRAO])
+    bytes_por_faixa: Optional[int] = None
+    workers: int = 1
+    orcamento_cache_bytes: int = ORCAMENTO_PADRAO_BYTES
+    usar_cache_resultados: bool = True
+    reconstruir_cache: bool = False
+    diretorio_cache: Optional[str] = None
+    cache_por_conteudo: bool = False
+    orcamento_cache_resultados_bytes: int = ORCAMENTO_PADRAO_RESULTADOS_BYTES
+    georreferencias: Optional[List] = None
+    profundidade_nativa: bool = False
+    niveis: Optional[int] = None
+    valor_maximo_float: float = 1.0
+    limiares_imagens: Optional[List[Optional[int]]] = None
+    caminho_diario: Optional[str] = None
+    retomar: bool = False
+    repetir_falhas: bool = False
+    intervalo_diario: int = INTERVALO_IMAGENS_PADRAO
+
+    def __post_init__(self):
+        self.imagens = [
+            imagem if isinstance(imagem, (str, MatrizEmMemoria)) else MatrizEmMemoria(imagem, f"<memória {indice}>")
+            for indice, imagem in enumerate(self.imagens)
+        ]
+
+    def kernel(self):
+        """
+        Parâmetros do histograma desta requisição (pixerizador.ParametrosKernel).
+        """
+        return pixerizador.ParametrosKernel(self.profundidade_nativa, self.niveis, self.valor_maximo_float)
+
+@dataclass
+class ResultadoImagem:
+    """
+    Resultado do processamento de uma imagem. Em caso de falha, apenas
+    caminho_imagem e erro_processamento são preenchidos.
+    """
+    erro_processamento: Optional[str]
+    caminho_imagem: str
+    soma_ponderada: Optional[float] = None
+    area_por_pixel: Optional[float] = None
+    area_normalizada: Optional[float] = None
+    histograma: Optional[List[int]] = None
+    contagem_pixels_claros: Optional[int] = None
+    varredura_limiares: Optional[List[dict]] = None
+
+    def como_dict(self):
+        """
+        Converte o resultado no dicionário produzido por pixerizador.registra_processamento.
+        """
+        resultado = asdict(self)
+        if resultado["varredura_limiares"] is None:
+            del resultado["varredura_limiares"]
+        return resultado
+
+def _abrir_cache_resultados(requisicao):
+    if not requisicao.usar_cache_resultados:
+        return None
+    return CacheResultados(
+        requisicao.diretorio_cache,
+        requisicao.orcamento_cache_resultados_bytes,
+        reconstruir=requisicao.reconstruir_cache,
+        por_conteudo=requisicao.cache_por_conteudo
+    )
+
+def _abrir_diario(requisicao):
+    if requisicao.caminho_diario is None:
+        return None
+    return DiarioProcessamento(
+        requisicao.caminho_diario,
+        parametros_diario(requisicao.kernel(), requisicao.limiares),
+        retomar=requisicao.retomar,
+        repetir_falhas=requisicao.repetir_falhas,
+        intervalo_imagens=requisicao.intervalo_diario
+    )
+
+def _fechar(cache_resultados, diario):
+    if diario is not None:
+        diario.fechar()  # Grava as imagens concluídas mesmo se o lote for interrompido por uma exceção.
+    if cache_resultados is not None:
+        cache_resultados.fechar()
+
+def iterar(requisicao):
+    """
+    Processa um lote de imagens no próprio processo, entregando o resultado de cada
+    imagem assim que fica pronto.
+
+    :param requisicao: Parâmetros do lote (RequisicaoProcessamento).
+    :return: Gerador de ResultadoImagem, na ordem das imagens da requisição.
+    """
+    cache = CacheImagens(requisicao.orcamento_cache_bytes)
+    diario = _abrir_diario(requisicao)
+    cache_resultados = _abrir_cache_resultados(requisicao)
+
+    try:
+        resultados = pixerizador.iterar_resultados(
+            list(requisicao.imagens),
+            list(requisicao.areas_km2),
+            cache,
+            list(requisicao.limiares),
+            requisicao.bytes_por_faixa,
+            requisicao.workers,
+            cache_resultados,
+            requisicao.georreferencias,
+            requisicao.kernel(),
+            requisicao.limiares_imagens,
+            diario
+        )
+        for resultado in resultados:
+            yield ResultadoImagem(**resultado)
+    finally:
+        _fechar(cache_resultados, diario)
+
+def processar(requisicao):
+    """
+    Processa um lote de imagens no próprio processo, sem iniciar um novo interpretador.
+
+    :param requisicao: Parâmetros do lote (RequisicaoProcessamento).
+    :return: Lista de ResultadoImagem, na ordem das imagens da requisição.
+    """
+    return list(iterar(requisicao))
+
+def iterar_brutos(requisicao):
+    """
+    Processa um lote de imagens sem normalizar as áreas, entregando as estatísticas brutas
+    de cada imagem (ver pixerizador.processar_imagem) na ordem da requisição. Como a
+    normalização depende apenas da maior área por pixel, lotes divididos entre processos
+    ou máquinas podem ser normalizados depois, com as estatísticas de todas as partes.
+
+    :param requisicao: Parâmetros do lote (RequisicaoProcessamento).
+    :return: Gerador de dicionários de estatísticas brutas.
+    """
+    cache = CacheImagens(requisicao.orcamento_cache_bytes)
+    diario = _abrir_diario(requisicao)
+    cache_resultados = _abrir_cache_resultados(requisicao)
+    try:
+        kernel = requisicao.kernel()
+        preparos, entradas = pixerizador.preparar_lote(
+            list(requisicao.imagens),
+            list(requisicao.areas_km2),
+            cache,
+            requisicao.bytes_por_faixa,
+            cache_resultados,
+            requisicao.georreferencias,
+            kernel,
+            requisicao.limiares_imagens,
+            diario
+        )
+        yield from pixerizador.iterar_brutos(preparos, entradas, list(requisicao.limiares), cache, requisicao.bytes_por_faixa, requisicao.workers, cache_resultados, kernel, diario)
+    finally:
+        _fechar(cache_resultados, diario)
+
+def processar_conjunto(requisicao):
+    """
+    Processa um lote de imagens no próprio processo e retorna os resultados em colunas
+    NumPy, sem converter os histogramas em listas.
+
+    :param requisicao: Parâmetros do lote (RequisicaoProcessamento).
+    :return: ConjuntoResultados, na ordem das imagens da requisição.
+    """
+    cache = CacheImagens(requisicao.orcamento_cache_bytes)
+    diario = _abrir_diario(requisicao)
+    cache_resultados = _abrir_cache_resultados(requisicao)
+    try:
+        return pixerizador.processar_conjunto(
+            list(requisicao.imagens),
+            list(requisicao.areas_km2),
+            cache,
+            list(requisicao.limiares),
+            requisicao.bytes_por_faixa,
+            requisicao.workers,
+            cache_resultados,
+            requisicao.georreferencias,
+            requisicao.kernel(),
+            requisicao.limiares_imagens,
+            diario
+        )
+    finally:
+        _fechar(cache_resultados, diario)
+
+class LoteEmFluxo:
+    """
+    Lote lido de uma fonte de entradas (ex.: um manifesto) sem reunir o lote em memória.
+    As entradas são percorridas duas vezes: a criação do lote executa a etapa leve de cada
+    imagem (pixerizador.medir_fluxo), que conta as imagens, encontra a maior área por pixel
+    e guarda a área e as dimensões de cada uma em um arquivo temporário; a iteração lê as
+    entradas novamente, em blocos, e entrega o ResultadoImagem de cada uma. Os caches, o
+    diário e o arquivo temporário ficam abertos até o fim da iteração ou até fechar().
+    """
+
+    def __init__(self, abrir_entradas, requisicao, georreferencia=None):
+        """
+        :param abrir_entradas: Função sem argumentos que retorna um novo iterável de tuplas
+            (caminho_imagem, area_km2, limiar), como entradas_lote.ler_manifesto.
+        :param requisicao: Demais parâmetros do lote (RequisicaoProcessamento); as listas
+            imagens, areas_km2, georreferencias e limiares_imagens são ignoradas.
+        :param georreferencia: Georreferência de todas as imagens (None, True ou os limites
+            (oeste, sul, leste, norte) em graus).
+        :raises ValueError: Se uma entrada for inválida.
+        """
+        self.abrir_entradas = abrir_entradas
+        self.requisicao = requisicao
+        self.georreferencia = georreferencia
+        self._cache = CacheImagens(requisicao.orcamento_cache_bytes)
+        self._diario = _abrir_diario(requisicao)
+        self._cache_resultados = _abrir_cache_resultados(requisicao)
+        self._medidas = None
+        try:
+            self.quantidade, self.maior_area_por_pixel, self._medidas = pixerizador.medir_fluxo(
+                abrir_entradas, self._cache, requisicao.bytes_por_faixa, georreferencia, self._diario,
+                self._cache_resultados, requisicao.kernel()
+            )
+        except BaseException:
+            self.fechar()
+            raise
+
+    def __len__(self):
+        return self.quantidade
+
+    def __iter__(self):
+        try:
+            resultados = pixerizador.iterar_resultados_em_fluxo(
+                self.abrir_entradas,
+                (self.quantidade, self.maior_area_por_pixel, self._medidas),
+                self._cache,
+                list(self.requisicao.limiares),
+                self.requisicao.bytes_por_faixa,
+                self.requisicao.workers,
+                self._cache_resultados,
+                self.georreferencia,
+                self.requisicao.kernel(),
+                self._diario
+            )
+            for resultado in resultados:
+                yield ResultadoImagem(**resultado)
+        finally:
+            self.fechar()
+
+    def fechar(self):
+        """
+        Fecha o diário, o cache de resultados e o arquivo de medidas da primeira passada
+        (sem efeito se já estiverem fechados).
+        """
+        _fechar(self._cache_resultados, self._diario)
+        if self._medidas is not None:
+            self._medidas.close()
+        self._cache_resultados = self._diario = self._medidas = None
+
+class SessaoResultados:
+    """
+    Conjunto de imagens processadas que guarda as estatísticas brutas (não normalizadas)
+    de cada uma. Como a soma ponderada é apenas a soma das intensidades multiplicada pela
+    área normalizada, incluir, remover ou alterar a área de uma imagem só atualiza a maior
+    área por pixel; os resultados são recalculados a partir dos agregados, sem ler pixels.
+    """
+
+    def __init__(self, limiares=None):
+        """
+        :param limiares: Limiares para considerar pixels claros (o primeiro define os campos principais).
+        """
+        self.limiares = list(limiares) if limiares else [pixerizador.LIMIAR_PADRAO]
+        self._brutos = {}  # Estatísticas brutas por caminho (ou nome da matriz em memória), na ordem das imagens.
+        self._maior_area_por_pixel = None
+
+    def __len__(self):
+        return len(self._brutos)
+
+    def __contains__(self, caminho_imagem):
+        return caminho_imagem in self._brutos
+
+    @property
+    def maior_area_por_pixel(self):
+        return self._maior_area_por_pixel
+
+    def processar(self, requisicao, ao_adicionar=None, cancelado=None):
+        """
+        Processa as imagens da requisição que ainda não estão na sessão e as adiciona.
+        Os rasters em memória (MatrizEmMemoria) são sempre processados, substituindo o de
+        mesmo nome: o nome não identifica o conteúdo do buffer. Os limiares da sessão têm
+        precedência sobre os da requisição.
+
+        :param requisicao: Parâmetros do lote (RequisicaoProcessamento).
+        :param ao_adicionar: Função chamada com (concluidas, total) após cada imagem nova adicionada.
+        :param cancelado: Evento (threading.Event) que interrompe o lote após a imagem em
+            andamento; as imagens já concluídas permanecem na sessão.
+        """
+        georreferencias = requisicao.georreferencias or [None] * len(requisicao.imagens)
+        limiares_imagens = requisicao.limiares_imagens or [None] * len(requisicao.imagens)
+        novas = [
+            (caminho, area, georreferencia, limiar)
+            for caminho, area, georreferencia, limiar in zip(requisicao.imagens, requisicao.areas_km2, georreferencias, limiares_imagens)
+            if isinstance(caminho, MatrizEmMemoria) or caminho not in self._brutos
+        ]
+        if not novas:
+            return
+
+        imagens, areas_km2, georreferencias, limiares_imagens = (list(coluna) for coluna in zip(*novas))
+        cache = CacheImagens(requisicao.orcamento_cache_bytes)
+        cache_resultados = _abrir_cache_resultados(requisicao)
+        try:
+            kernel = requisicao.kernel()
+            preparos, entradas = pixerizador.preparar_lote(imagens, areas_km2, cache, requisicao.bytes_por_faixa, cache_resultados, georreferencias, kernel, limiares_imagens)
+            if cancelado is not None and cancelado.is_set():
+                return
+            brutos = pixerizador.iterar_brutos(preparos, entradas, self.limiares, cache, requisicao.bytes_por_faixa, requisicao.workers, cache_resultados, kernel)
+            try:
+                for concluidas, bruto in enumerate(brutos, start=1):
+                    self.adicionar(bruto)
+                    if ao_adicionar is not None:
+                        ao_adicionar(concluidas, len(imagens))
+                    if cancelado is not None and cancelado.is_set():
+                        break
+            finally:
+                brutos.close()
+        finally:
+            if cache_resultados is not None:
+                cache_resultados.fechar()
+
+    def sincronizar(self, requisicao, ao_adicionar=None, cancelado=None):
+        """
+        Ajusta a sessão para conter exatamente as imagens da requisição, na mesma ordem:
+        remove as que saíram, atualiza as áreas alteradas e processa apenas as novas (e os
+        rasters em memória, ver processar).
+        Se o lote for cancelado, a sessão fica apenas com as imagens já processadas.
+
+        :param requisicao: Parâmetros do lote (RequisicaoProcessamento).
+        :param ao_adicionar: Função chamada com (concluidas, total) após cada imagem nova adicionada.
+        :param cancelado: Evento (threading.Event) que interrompe o lote.
+        """
+        areas_por_caminho = dict(zip(map(nome_imagem, requisicao.imagens), requisicao.areas_km2))
+        for caminho_imagem in [caminho for caminho in self._brutos if caminho not in areas_por_caminho]:
+            self.remover(caminho_imagem)
+
+        for caminho_imagem, bruto in self._brutos.items():
+            area_km2 = areas_por_caminho[caminho_imagem]
+            if area_km2 is not None and area_km2 != bruto["area_km2"] and bruto["altura"] is not None:
+                self.alterar_area(caminho_imagem, area_km2)
+
+        self.processar(requisicao, ao_adicionar, cancelado)
+        nomes = [nome_imagem(caminho) for caminho in requisicao.imagens]
+        self._brutos = {nome: self._brutos[nome] for nome in nomes if nome in self._brutos}
+
+    def adicionar(self, bruto):
+        """
+        Adiciona (ou substitui) as estatísticas brutas de uma imagem. O(1), exceto quando
+        substitui a imagem de maior área por pixel.
+
+        :param bruto: Dicionário retornado por pixerizador.processar_imagem.
+        """
+        caminho_imagem = bruto["caminho_imagem"]
+        if caminho_imagem in self._brutos:
+            self.remover(caminho_imagem)
+
+        self._brutos[caminho_imagem] = bruto
+        if bruto["erro_processamento"] is None:
+            self._atualizar_maior(bruto["area_por_pixel"])
+
+    def remover(self, caminho_imagem):
+        """
+        Remove uma imagem da sessão. Se ela tinha a maior área por pixel, a maior área
+        é recalculada a partir das demais (O(N)).
+
+        :param caminho_imagem: Caminho da imagem a ser removida.
+        """
+        bruto = self._brutos.pop(caminho_imagem)
+        if bruto["erro_processamento"] is None and bruto["area_por_pixel"] == self._maior_area_por_pixel:
+            self._recalcular_maior()
+
+    def alterar_area(self, caminho_imagem, area_km2):
+        """
+        Altera a área em km² de uma imagem já processada, sem reler seus pixels.
+
+        :param caminho_imagem: Caminho da imagem.
+        :param area_km2: Nova área da imagem em km².
+        """
+        if area_km2 < 0:
+            raise ValueError(f"Área negativa fornecida para {caminho_imagem}.")
+
+        bruto = self._brutos[caminho_imagem]
+        area_anterior = bruto["area_por_pixel"]
+        bruto["area_km2"] = area_km2
+        bruto["area_por_pixel"] = pixerizador.calcular_area_por_pixel(area_km2, bruto["altura"], bruto["largura"], bruto.get("pesos_linhas"))
+        if bruto["erro_processamento"] is not None:
+            return
+
+        if area_anterior == self._maior_area_por_pixel and bruto["area_por_pixel"] < area_anterior:
+            self._recalcular_maior()
+        else:
+            self._atualizar_maior(bruto["area_por_pixel"])
+
+    def alterar_limiares(self, limiares):
+        """
+        Troca os limiares da sessão, derivando as novas estatísticas dos histogramas já calculados.
+
+        :param limiares: Nova lista de limiares.
+        """
+        self.limiares = list(limiares)
+        for bruto in self._brutos.values():
+            if bruto["histograma"] is not None:
+                bruto["estatisticas"] = pixerizador.estatisticas_do_bruto(bruto, self.limiares)
+
+    def area_normalizada(self, caminho_imagem):
+        """
+        Retorna a área normalizada de uma imagem em relação à maior área por pixel da sessão.
+        """
+        bruto = self._brutos[caminho_imagem]
+        if bruto["erro_processamento"] is not None:
+            return None
+        return bruto["area_por_pixel"] / self._maior_area_por_pixel
+
+    def resultados(self):
+        """
+        Monta os resultados de todas as imagens da sessão a partir dos agregados (O(N)).
+
+        :return: Lista de ResultadoImagem, na ordem das imagens.
+        """
+        return [
+            ResultadoImagem(**pixerizador.consolidar_resultado(bruto, self.area_normalizada(caminho_imagem), self.limiares))
+            for caminho_imagem, bruto in self._brutos.items()
+        ]
+
+    def conjunto(self):
+        """
+        Monta os resultados de todas as imagens da sessão em colunas NumPy (O(N)).
+
+        :return: ConjuntoResultados, na ordem das imagens.
+        """
+        return ConjuntoResultados.de_brutos(
+            list(self._brutos.values()),
+            [self.area_normalizada(caminho_imagem) for caminho_imagem in self._brutos],
+            self.limiares
+        )
+
+    def _atualizar_maior(self, area_por_pixel):
+        if self._maior_area_por_pixel is None or area_por_pixel > self._maior_area_por_pixel:
+            self._maior_area_por_pixel = area_por_pixel
+
+    def _recalcular_maior(self):
+        areas = [bruto["area_por_pixel"] for bruto in self._brutos.values() if bruto["erro_processamento"] is None]
+        self._maior_area_por_pixel = max(areas) if areas else None
+
+@dataclass
+class EventoLote:
+    """
+    Andamento de um lote processado em segundo plano.
+
+    :param tipo: "progresso" (uma imagem concluída), "concluido", "cancelado" ou "erro".
+    :param concluidas: Quantidade de imagens novas já processadas.
+    :param total: Quantidade de imagens novas do lote.
+    :param resultados: Resultados de todas as imagens da sessão neste momento, em colunas
+        (ConjuntoResultados). Nos eventos de progresso, os resultados só são montados de
+        tempos em tempos (ver TarefaLote) e ficam None nos demais; os eventos "concluido"
+        e "cancelado" sempre os trazem. None em "erro".
+    :param erro: Mensagem do erro, se houver.
+    """
+    tipo: str
+    concluidas: int
+    total: int
+    resultados: Optional[ConjuntoResultados] = None
+    erro: Optional[str] = None
+
+INTERVALO_INSTANTANEOS_S = 1.0  # Intervalo mínimo entre os resultados publicados durante um lote.
+FATOR_CUSTO_INSTANTANEO = 10  # O intervalo também é de pelo menos 10 vezes o tempo da última montagem.
+
+# Uma única thread para os lotes em segundo plano: a sessão não é compartilhada entre lotes simultâneos.
+_executor_lotes = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lote")
+
+class TarefaLote:
+    """
+    Sincroniza uma sessão com uma requisição em uma thread separada. O andamento é
+    publicado em uma fila segura entre threads (eventos), que a interface consome sem
+    bloquear, por exemplo com root.after(); a sessão só deve ser lida pela interface
+    por meio dos resultados contidos nos eventos.
+
+    Montar os resultados da sessão custa O(N) (inclusive a matriz de histogramas), por
+    isso cada imagem concluída publica apenas o andamento; os resultados acompanham um
+    evento de progresso no máximo a cada INTERVALO_INSTANTANEOS_S segundos (e nunca mais
+    de 1/FATOR_CUSTO_INSTANTANEO do tempo do lote é gasto montando-os), e o evento final
+    sempre os traz.
+    """
+
+    def __init__(self, sessao, requisicao):
+        """
+        :param sessao: SessaoResultados a ser atualizada.
+        :param requisicao: Parâmetros do lote (RequisicaoProcessamento).
+        """
+        self.sessao = sessao
+        self.requisicao = requisicao
+        self.eventos = queue.SimpleQueue()
+        self._cancelado = threading.Event()
+        self._futuro = _executor_lotes.submit(self._executar)
+
+    def _executar(self):
+        andamento = [0, 0]  # Imagens novas concluídas e total.
+        proximo_instantaneo = [time.monotonic() + INTERVALO_INSTANTANEOS_S]
+
+        def ao_adicionar(concluidas, total):
+            andamento[:] = [concluidas, total]
+            resultados = None
+            agora = time.monotonic()
+            if concluidas < total and agora >= proximo_instantaneo[0]:
+                resultados = self.sessao.conjunto()
+                custo = time.monotonic() - agora
+                proximo_instantaneo[0] = time.monotonic() + max(INTERVALO_INSTANTANEOS_S, FATOR_CUSTO_INSTANTANEO * custo)
+            self.eventos.put(EventoLote("progresso", concluidas, total, resultados))
+
+        try:
+            self.sessao.sincronizar(self.requisicao, ao_adicionar, self._cancelado)
+        except Exception as erro:  # O erro é entregue à interface pela fila.
+            self.eventos.put(EventoLote("erro", *andamento, erro=str(erro)))
+            raise
+        tipo = "cancelado" if self._cancelado.is_set() else "concluido"
+        self.eventos.put(EventoLote(tipo, *andamento, self.sessao.conjunto()))
+
+    def cancelar(self):
+        """
+        Pede a interrupção do lote; a imagem em andamento é concluída antes da parada.
+        """
+        self._cancelado.set()
+
+    @property
+    def cancelada(self):
+        return self._cancelado.is_set()
+
+    @property
+    def concluida(self):
+        return self._futuro.done()
+
+    def eventos_pendentes(self):
+        """
+        Retorna, sem bloquear, os eventos publicados desde a última chamada.
+
+        :return: Lista de EventoLote.
+        """
+        eventos = []
+        while True:
+            try:
+                eventos.append(self.eventos.get_nowait())
+            except queue.Empty:
+                return eventos
@@ -1,12 +1,80 @@
-import cv2
 import numpy as np
 import os
 import argparse
+import itertools
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
 import estimador_area
-from logger import logging, configurar_logs
+import instrumentacao
+from cache_imagens import CacheImagens, ORCAMENTO_PADRAO_BYTES, decodificar_cinza
+from leitor_faixas import abrir_faixas_cinza, BYTES_POR_FAIXA_PADRAO
+from entradas_matriciais import MatrizEmMemoria, e_matriz, nome_imagem, dimensoes_matriz, abrir_faixas_matriz
+from metadados_imagem import sondar_imagem
+from geometria_pixels import ler_geotransform, limites_para_geotransform, areas_por_linha
+from conjunto_resultados import ConjuntoResultados
+from saida_resultados import FORMATOS_SAIDA, escrever_ndjson, escrever_npz, escrever_repr
+from entradas_lote import ler_manifesto, varrer_diretorio
+from diario_processamento import chave_entrada, parametros_diario, verificar_diario
+from logger import logging, configurar_logs, resumir_resultados
+
+LIMIAR_PADRAO = 200  # Limiar padrão para considerar pixels claros.
+TAMANHO_BLOCO_HISTOGRAMA = 1 << 22  # Quantidade de pixels contados por vez no histograma.
+TAMANHO_BLOCO_FLUXO = 4096  # Entradas preparadas e processadas por vez no processamento em fluxo.
+
+# Registro da primeira passada do processamento em fluxo, um por imagem (altura -1 quando a
+# etapa leve falhou e precisa ser refeita na segunda passada)
+MEDIDA_FLUXO = np.dtype([("area_km2", np.float64), ("altura", np.int64), ("largura", np.int64)])
+
+NIVEIS_8_BITS = 256  # Posições do histograma de imagens reduzidas a 8 bits.
+NIVEIS_NATIVOS_PADRAO = 65536  # Posições do histograma com a profundidade nativa (16 bits).
+
+@dataclass
+class ParametrosKernel:
+    """
+    Parâmetros que determinam o histograma de uma imagem e compõem a chave do cache de
+    resultados. As intensidades são contadas como inteiros (np.bincount): cada valor
+    inteiro ocupa a posição de mesmo número (valores acima de niveis - 1 contam na última
+    posição) e, em imagens de ponto flutuante, o intervalo [0, valor_maximo_float] é
+    dividido em `niveis` faixas de mesma largura. Os limiares seguem as mesmas posições.
+
+    :param profundidade_nativa: Mantém o tipo de dado do arquivo (16 bits, float) em vez
+        de reduzi-lo a 8 bits.
+    :param niveis: Posições do histograma (padrão: 256 em 8 bits, 65536 na profundidade nativa).
+    :param valor_maximo_float: Valor associado à última posição em imagens de ponto flutuante.
+    """
+    profundidade_nativa: bool = False
+    niveis: Optional[int] = None
+    valor_maximo_float: float = 1.0
+
+    def __post_init__(self):
+        if self.niveis is None:
+            self.niveis = NIVEIS_NATIVOS_PADRAO if self.profundidade_nativa else NIVEIS_8_BITS
+        if not self.profundidade_nativa and self.niveis != NIVEIS_8_BITS:
+            raise ValueError("A quantidade de níveis só pode ser alterada com a profundidade nativa.")
+        if self.niveis < 2:
+            raise ValueError("O histograma precisa de pelo menos 2 níveis.")
+        if not self.valor_maximo_float > 0:
+            raise ValueError("O valor máximo das imagens de ponto flutuante deve ser positivo.")
+
+    @property
+    def chave(self):
+        """
+        Texto que identifica os parâmetros no cache de resultados.
+        """
+        if not self.profundidade_nativa:
+            return f"cinza=BGR2GRAY;bits=8;niveis={self.niveis}"
+        return f"cinza=BGR2GRAY;bits=nativo;niveis={self.niveis};maximo_float={self.valor_maximo_float!r}"
+
+KERNEL_PADRAO = ParametrosKernel()
+
+# Parâmetros do kernel padrão; compõem a chave do cache de resultados.
+PARAMETROS_KERNEL = KERNEL_PADRAO.chave
     
 # Função para calcular a área representada por cada pixel
-def calcular_area_por_pixel(area_km2, altura, largura):
+def calcular_area_por_pixel(area_km2, altura, largura, pesos_linhas=None):
     """
     Calcula a área correspondente a cada pixel com base na área total em km²
     e nas dimensões da imagem.
@@ -14,8 +82,13 @@ def calcular_area_por_pixel(area_km2, altura, largura):
     :param area_km2: Área total em quilômetros quadrados.
     :param altura: Altura da imagem em pixels.
     :param largura: Largura da imagem em pixels.
+    :param pesos_linhas: Peso de cada linha em relação à linha de maior área (modo
+        georreferenciado); nesse caso, retorna a área de um pixel da linha de maior área.
     :return: Área por pixel.
     """
+    if pesos_linhas is not None:
+        return area_km2 / (largura * float(np.sum(pesos_linhas)))
+
     total_pixels = altura * largura  # Calcula o total de pixels na imagem.
     area_por_pixel = area_km2 / total_pixels  # Calcula a área correspondente a cada pixel.
     return area_por_pixel
@@ -31,39 +104,150 @@ def normalizar_areas(areas):
     max_area = max(areas)  # Encontra a maior área.
     return [area / max_area for area in areas]  # Normaliza cada área.
 
-def ler_imagem(caminho_imagem):
+def ler_imagem(caminho_imagem, profundidade_nativa=False):
+    """
+    Lê uma imagem do caminho especificado em escala de cinza, verificando se o caminho
+    existe. Imagens de uma banda são decodificadas diretamente em cinza, sem a cópia BGR
+    de três canais.
+    
+    :param caminho_imagem: Caminho completo da imagem a ser lida.
+    :param profundidade_nativa: Se True, mantém o tipo de dado do arquivo (uint16, float32
+        etc.); caso contrário, a imagem é reduzida a 8 bits.
+    :return: A imagem em escala de cinza ou None se o caminho for inválido.
+    """
+    if not e_matriz(caminho_imagem) and not os.path.exists(caminho_imagem):  # Verifica se o caminho existe.
+        logging.error(f"Caminho inválido: {caminho_imagem}")  # Loga erro se o caminho for inválido.
+        return None
+    return decodificar_cinza(caminho_imagem, profundidade_nativa)  # Lê a imagem usando OpenCV.
+
+def ler_imagem_cinza(caminho_imagem, cache, profundidade_nativa=False):
     """
-    Lê uma imagem do caminho especificado, verificando se o caminho existe.
+    Lê a imagem em escala de cinza por meio do cache da execução, de modo que cada
+    arquivo seja decodificado no máximo uma vez por lote.
     
     :param caminho_imagem: Caminho completo da imagem a ser lida.
-    :return: A imagem lida ou None se o caminho for inválido.
+    :param cache: Cache de imagens decodificadas (CacheImagens).
+    :param profundidade_nativa: Se True, mantém o tipo de dado do arquivo.
+    :return: A imagem em escala de cinza ou None se o caminho for inválido.
     """
-    if not os.path.exists(caminho_imagem):  # Verifica se o caminho existe.
+    if not e_matriz(caminho_imagem) and not os.path.exists(caminho_imagem):  # Verifica se o caminho existe.
         logging.error(f"Caminho inválido: {caminho_imagem}")  # Loga erro se o caminho for inválido.
         return None
-    return cv2.imread(caminho_imagem)  # Lê a imagem usando OpenCV.
+    return cache.obter_cinza(caminho_imagem, profundidade_nativa)
 
 # Função para calcular a soma ponderada das intensidades da imagem
-def soma_ponderada_intensidades(imagem_cinza, area_normalizada):
+def soma_ponderada_intensidades(imagem_cinza, area_normalizada, limiar=LIMIAR_PADRAO, pesos_linhas=None):
     """
     Calcula a soma ponderada das intensidades da imagem em níveis de cinza,
     considerando apenas os pixels claros (acima de um limiar) e conta os pixels claros.
     
     :param imagem_cinza: A imagem em escala de cinza a ser processada.
     :param area_normalizada: A área normalizada correspondente à imagem.
+    :param limiar: Limiar para considerar apenas pixels claros.
+    :param pesos_linhas: Peso da área de cada linha (modo georreferenciado), opcional.
     
     :return: Soma ponderada das intensidades dos pixels claros e a contagem de pixels claros.
     """
-    limiar = 200  # Define um limiar para considerar apenas pixels claros
-    pixels_claros = imagem_cinza[imagem_cinza > limiar]  # Filtra os pixels claros
-    
-    contagem_pixels_claros = pixels_claros.size  # Conta os pixels claros
-    intensidades = np.sum(pixels_claros)  # Calcula a soma das intensidades dos pixels claros
+    histograma_ponderado = None
+    if pesos_linhas is None:
+        histograma = calcular_histograma(imagem_cinza)
+    else:
+        histograma, histograma_ponderado = calcular_histograma_ponderado(imagem_cinza, pesos_linhas)
+    (contagem_pixels_claros, intensidades), = estatisticas_por_limiar(histograma, [limiar], histograma_ponderado)
     soma_ponderada = intensidades * area_normalizada  # Retorna a soma ponderada.
     
     return soma_ponderada, contagem_pixels_claros  # Retorna a soma ponderada e a contagem de pixels claros.
 
-def registra_processamento(resultados, caminho_imagem, soma_ponderada=None, area_por_pixel=None, area_normalizada=None, histograma=None, contagem_pixels_claros=None, erro_processamento=None):
+def estatisticas_por_limiar(histograma, limiares, histograma_ponderado=None):
+    """
+    Deriva, a partir do histograma, a contagem e a soma das intensidades dos pixels acima
+    de cada limiar, sem percorrer a imagem novamente (O(níveis)).
+    
+    :param histograma: Frequências de cada nível de intensidade (posição do histograma).
+    :param limiares: Lista de limiares a serem avaliados.
+    :param histograma_ponderado: Histograma em que cada pixel conta com o peso de sua
+        linha (modo georreferenciado); se informado, as somas das intensidades são ponderadas.
+    :return: Lista de tuplas (contagem_pixels_claros, soma_intensidades), uma por limiar.
+    """
+    histograma = np.asarray(histograma, dtype=np.uint64)
+    niveis = np.arange(histograma.size, dtype=np.uint64)
+    
+    # Acumulados a partir do nível mais claro: posição k guarda os totais dos níveis >= k.
+    contagens_acima = np.cumsum(histograma[::-1])[::-1]
+    if histograma_ponderado is None:
+        somas_acima = np.cumsum((histograma * niveis)[::-1])[::-1]
+        converter = int
+    else:
+        somas_acima = np.cumsum((np.asarray(histograma_ponderado, dtype=np.float64) * niveis)[::-1])[::-1]
+        converter = float
+    
+    estatisticas = []
+    for limiar in limiares:
+        inicio = max(int(limiar) + 1, 0)  # Apenas pixels estritamente acima do limiar.
+        if inicio >= histograma.size:
+            estatisticas.append((0, converter(0)))
+        else:
+            estatisticas.append((int(contagens_acima[inicio]), converter(somas_acima[inicio])))
+    return estatisticas
+
+def estatisticas_do_bruto(bruto, limiares):
+    """
+    Calcula as estatísticas por limiar das estatísticas brutas de uma imagem, usando o
+    histograma ponderado quando a imagem estiver no modo georreferenciado.
+    """
+    return estatisticas_por_limiar(bruto["histograma"], _limiares_da_imagem(bruto, limiares), bruto.get("histograma_ponderado"))
+
+def _limiares_da_imagem(bruto, limiares):
+    """
+    Limiares avaliados para uma imagem: o limiar próprio da imagem (ex.: do manifesto),
+    quando houver, substitui o limiar principal do lote.
+    """
+    if bruto.get("limiar") is None:
+        return limiares
+    return [bruto["limiar"]] + list(limiares[1:])
+
+def interpretar_limiares(valores):
+    """
+    Interpreta os limiares informados na linha de comando. Cada valor pode ser um
+    número inteiro ou um intervalo no formato inicio:fim[:passo] (fim incluso).
+    
+    :param valores: Lista de textos informados em --limiar.
+    :return: Lista de limiares inteiros, na ordem informada.
+    """
+    limiares = []
+    for valor in valores:
+        if ':' in valor:
+            partes = [int(parte) for parte in valor.split(':')]
+            inicio, fim = partes[0], partes[1]
+            passo = partes[2] if len(partes) > 2 else 1
+            if passo <= 0:
+                raise argparse.ArgumentTypeError(f"Passo inválido no intervalo de limiares: {valor}")
+            limiares.extend(range(inicio, fim + 1, passo))
+        else:
+            limiares.append(int(valor))
+    return limiares
+
+def interpretar_georreferencias(quantidade_imagens, georreferenciado=False, limites=None):
+    """
+    Monta a georreferência de cada imagem a partir das opções da linha de comando.
+    
+    :param quantidade_imagens: Quantidade de imagens do lote.
+    :param georreferenciado: Se True, lê o geotransform de cada GeoTIFF.
+    :param limites: Lista com 4 valores (oeste sul leste norte) para todas as imagens ou
+        4 valores por imagem; têm precedência sobre o geotransform do arquivo.
+    :return: Lista com a georreferência de cada imagem ou None (modo desativado).
+    """
+    if limites:
+        if len(limites) == 4:
+            return [tuple(limites)] * quantidade_imagens
+        if len(limites) == 4 * quantidade_imagens:
+            return [tuple(limites[i:i + 4]) for i in range(0, len(limites), 4)]
+        raise ValueError("--limites requer 4 valores (oeste sul leste norte) ou 4 valores por imagem.")
+    if georreferenciado:
+        return [True] * quantidade_imagens
+    return None
+
+def registra_processamento(resultados, caminho_imagem, soma_ponderada=None, area_por_pixel=None, area_normalizada=None, histograma=None, contagem_pixels_claros=None, erro_processamento=None, varredura_limiares=None):
     """
     Registra os resultados do processamento de cada imagem em uma lista.
     
@@ -73,113 +257,945 @@ def registra_processamento(resultados, caminho_imagem, soma_ponderada=None, area
     :param area_por_pixel: Área por pixel calculada.
     :param area_normalizada: Área normalizada calculada.
     :param erro_processamento: Mensagem de erro, se houver.
+    :param varredura_limiares: Resultados por limiar, quando mais de um limiar for avaliado.
     """
-    resultados.append({
+    resultado = {
         "erro_processamento": erro_processamento,
         "caminho_imagem": caminho_imagem,
-        "soma_ponderada": float(soma_ponderada),
-        "area_por_pixel": float(area_por_pixel),
-        "area_normalizada": float(area_normalizada),
+        "soma_ponderada": _float_ou_none(soma_ponderada),
+        "area_por_pixel": _float_ou_none(area_por_pixel),
+        "area_normalizada": _float_ou_none(area_normalizada),
         "histograma": histograma,
         "contagem_pixels_claros": contagem_pixels_claros
-    })
+    }
+    if varredura_limiares is not None:
+        resultado["varredura_limiares"] = varredura_limiares
+    resultados.append(resultado)
+    
+def _float_ou_none(valor):
+    return None if valor is None else float(valor)
+
+def _kernel_do_tipo(tipo):
+    """
+    Kernel usado quando nenhum é informado: 8 bits para imagens uint8 e a profundidade
+    nativa (65536 posições) para os demais tipos.
+    """
+    return KERNEL_PADRAO if tipo == np.uint8 else ParametrosKernel(profundidade_nativa=True)
+
+def posicoes_histograma(pixels, kernel):
+    """
+    Converte intensidades em posições do histograma (inteiros de 0 a kernel.niveis - 1).
+    Imagens uint8 e uint16 que cabem no histograma são usadas sem cópia; valores NaN de
+    imagens de ponto flutuante contam na posição 0.
     
-def calcular_histograma(imagem_cinza):
+    :param pixels: Array de intensidades (de qualquer forma).
+    :param kernel: ParametrosKernel do histograma.
+    :return: Array de inteiros não negativos, com a mesma forma.
+    """
+    niveis = kernel.niveis
+    if pixels.dtype.kind == "u" and pixels.dtype.isnative and pixels.dtype.itemsize <= 2 and np.iinfo(pixels.dtype).max < niveis:
+        return pixels
+    if pixels.dtype.kind == "f":
+        posicoes = np.multiply(pixels, niveis / kernel.valor_maximo_float, dtype=np.float64)
+        np.nan_to_num(posicoes, copy=False, nan=0.0, posinf=niveis - 1, neginf=0.0)
+        np.clip(posicoes, 0, niveis - 1, out=posicoes)
+        return posicoes.astype(np.intp)  # Trunca, ou seja, arredonda para baixo os valores não negativos.
+    return np.clip(pixels, 0, niveis - 1).astype(np.intp)
+
+def calcular_histograma(imagem_cinza, kernel=None):
     """
     Calcula o histograma das intensidades de pixels de uma imagem em escala de cinza.
     
-    :param imagem: A imagem em escala de cinza.
-    :return: Frequências das intensidades de 0 a 255.
+    A contagem é feita com inteiros (np.bincount) em blocos de tamanho fixo, evitando
+    as bordas em ponto flutuante do np.histogram e limitando a memória temporária.
+    
+    :param imagem: A imagem em escala de cinza (uint8, uint16, inteira ou de ponto flutuante).
+    :param kernel: ParametrosKernel do histograma (padrão: de acordo com o tipo da imagem).
+    :return: Frequências de cada posição do histograma (256 posições em imagens uint8).
     """
-    histograma, _ = np.histogram(imagem_cinza, bins=np.arange(257))  # Cria histogramas com 256 bins.
+    pixels = np.ravel(imagem_cinza)
+    if kernel is None:
+        kernel = _kernel_do_tipo(pixels.dtype)
+    histograma = np.zeros(kernel.niveis, dtype=np.int64)
+    for inicio in range(0, pixels.size, TAMANHO_BLOCO_HISTOGRAMA):
+        histograma += np.bincount(posicoes_histograma(pixels[inicio:inicio + TAMANHO_BLOCO_HISTOGRAMA], kernel), minlength=kernel.niveis)
     return histograma
 
-def main(imagens, areas_km2):
+def calcular_histograma_em_faixas(faixas, kernel=KERNEL_PADRAO):
     """
-    Função principal que processa as imagens e calcula a soma ponderada das intensidades.
+    Acumula o histograma de uma imagem lida em faixas, sem manter a imagem inteira em memória.
     
-    :param imagens: Lista de caminhos das imagens a serem processadas.
-    :param areas_km2: Lista de áreas correspondentes a cada imagem em km².
-    :return: Dicionário com resultados de cada imagem.
+    :param faixas: Iterável de faixas da imagem em escala de cinza.
+    :param kernel: ParametrosKernel do histograma.
+    :return: Frequências de cada posição do histograma.
     """
-    if not imagens:
-        logging.error("Erro: Nenhuma imagem foi fornecida.")  # Loga erro se nenhuma imagem for fornecida.
-        return {}
+    histograma = np.zeros(kernel.niveis, dtype=np.int64)
+    for faixa in faixas:
+        histograma += calcular_histograma(faixa, kernel)
+    return histograma
+
+def calcular_histograma_ponderado(imagem_cinza, pesos_linhas, linha_inicial=0, kernel=None):
+    """
+    Calcula o histograma das intensidades e o histograma ponderado pelo peso da linha de
+    cada pixel. As linhas são contadas em blocos com np.bincount (um histograma por
+    linha) e os pesos são aplicados como um vetor sobre esses histogramas, sem criar uma
+    imagem de pesos do tamanho da imagem.
     
-    if len(imagens) != len(areas_km2):
-        logging.error("Erro: O número de imagens deve ser igual ao número de áreas.")  # Loga erro se o número de imagens não corresponder.
-        return {}
+    :param imagem_cinza: A imagem (ou faixa de linhas) em escala de cinza.
+    :param pesos_linhas: Peso de cada linha da imagem inteira.
+    :param linha_inicial: Índice, na imagem inteira, da primeira linha de imagem_cinza.
+    :param kernel: ParametrosKernel do histograma (padrão: de acordo com o tipo da imagem).
+    :return: Tupla (histograma, histograma_ponderado) com kernel.niveis posições cada.
+    """
+    if kernel is None:
+        kernel = _kernel_do_tipo(imagem_cinza.dtype)
+    niveis = kernel.niveis
+    altura, largura = imagem_cinza.shape[:2]
+    histograma = np.zeros(niveis, dtype=np.int64)
+    histograma_ponderado = np.zeros(niveis, dtype=np.float64)
+    linhas_por_bloco = max(1, TAMANHO_BLOCO_HISTOGRAMA // max(largura, 1))
+    linhas_por_bloco = min(linhas_por_bloco, max(1, TAMANHO_BLOCO_HISTOGRAMA // niveis))  # Limita a matriz linhas x níveis.
+    for inicio in range(0, altura, linhas_por_bloco):
+        bloco = posicoes_histograma(imagem_cinza[inicio:inicio + linhas_por_bloco], kernel)
+        quantidade_linhas = bloco.shape[0]
+        # Desloca as intensidades de cada linha para uma faixa própria de `niveis` posições.
+        deslocamentos = np.arange(0, quantidade_linhas * niveis, niveis, dtype=np.intp)[:, np.newaxis]
+        por_linha = np.bincount((bloco + deslocamentos).ravel(), minlength=quantidade_linhas * niveis).reshape(quantidade_linhas, niveis)
+        histograma += por_linha.sum(axis=0)
+        pesos = pesos_linhas[linha_inicial + inicio:linha_inicial + inicio + quantidade_linhas]
+        histograma_ponderado += pesos @ por_linha
+    return histograma, histograma_ponderado
+
+def calcular_histograma_ponderado_em_faixas(faixas, pesos_linhas, kernel=KERNEL_PADRAO):
+    """
+    Acumula os histogramas (simples e ponderado) de uma imagem lida em faixas.
+    
+    :param faixas: Iterável de faixas da imagem em escala de cinza, na ordem das linhas.
+    :param pesos_linhas: Peso de cada linha da imagem inteira.
+    :param kernel: ParametrosKernel do histograma.
+    :return: Tupla (histograma, histograma_ponderado).
+    """
+    histograma = np.zeros(kernel.niveis, dtype=np.int64)
+    histograma_ponderado = np.zeros(kernel.niveis, dtype=np.float64)
+    linha = 0
+    for faixa in faixas:
+        parcial, parcial_ponderado = calcular_histograma_ponderado(faixa, pesos_linhas, linha, kernel)
+        histograma += parcial
+        histograma_ponderado += parcial_ponderado
+        linha += faixa.shape[0]
+    return histograma, histograma_ponderado
+
+def obter_dimensoes(caminho_imagem, cache, bytes_por_faixa=None):
+    """
+    Obtém a altura e a largura da imagem. PNG, TIFF, JPEG e matrizes (.npy, rasters brutos
+    e em memória) têm as dimensões lidas do cabeçalho, sem ler os pixels; os demais
+    formatos são decodificados pelo cache.
+    
+    :param caminho_imagem: Caminho da imagem.
+    :param cache: Cache de imagens decodificadas (CacheImagens).
+    :param bytes_por_faixa: Limite de bytes por faixa; None desativa a leitura em faixas.
+    :return: Tupla (altura, largura) ou None se a imagem não puder ser lida.
+    """
+    if e_matriz(caminho_imagem):
+        return dimensoes_matriz(caminho_imagem)
+
+    metadados = sondar_imagem(caminho_imagem)
+    if metadados is not None:
+        return metadados["altura"], metadados["largura"]
+
+    if bytes_por_faixa:
+        leitor = abrir_faixas_cinza(caminho_imagem, bytes_por_faixa)
+        if leitor is not None:
+            altura, largura, _ = leitor
+            return altura, largura
+
+    imagem_cinza = ler_imagem_cinza(caminho_imagem, cache)
+    if imagem_cinza is None:
+        return None
+    return imagem_cinza.shape[:2]
 
-    areas_por_pixel = []  # Lista para armazenar áreas por pixel.
-    resultados = []  # Lista para armazenar os resultados.
+def obter_histograma(caminho_imagem, cache, bytes_por_faixa=None, kernel=KERNEL_PADRAO):
+    """
+    Calcula o histograma da imagem, lendo-a em faixas quando o modo estiver ativo e o
+    formato permitir; caso contrário, usa a imagem inteira decodificada pelo cache.
+    Matrizes são sempre lidas em faixas, como visões das próprias linhas (ver _abrir_faixas).
+    
+    :param caminho_imagem: Caminho da imagem.
+    :param cache: Cache de imagens decodificadas (CacheImagens).
+    :param bytes_por_faixa: Limite de bytes por faixa; None desativa a leitura em faixas.
+    :param kernel: ParametrosKernel do histograma.
+    :return: Frequências de cada posição do histograma ou None se a imagem não puder ser lida.
+    """
+    leitor = _abrir_faixas(caminho_imagem, bytes_por_faixa, kernel)
+    if leitor is not None:
+        _, _, faixas = leitor
+        with instrumentacao.etapa("histograma_faixas", caminho_imagem):  # Inclui a decodificação das faixas.
+            return calcular_histograma_em_faixas(faixas, kernel)
 
-    # Ler cada imagem e calcular áreas por pixel
-    for i, caminho_imagem in enumerate(imagens):
-        if areas_km2[i] is None:
-            areas_km2[i] = estimador_area.estimar_area(caminho_imagem, 1, 1)
-        if areas_km2[i] < 0:
+    imagem_cinza = ler_imagem_cinza(caminho_imagem, cache, kernel.profundidade_nativa)
+    if imagem_cinza is None:
+        return None
+    with instrumentacao.etapa("histograma", caminho_imagem):
+        return calcular_histograma(imagem_cinza, kernel)
+
+def obter_histograma_ponderado(caminho_imagem, cache, pesos_linhas, bytes_por_faixa=None, kernel=KERNEL_PADRAO):
+    """
+    Como obter_histograma, mas também calcula o histograma ponderado pelos pesos das linhas.
+    
+    :return: Tupla (histograma, histograma_ponderado) ou None se a imagem não puder ser lida.
+    """
+    leitor = _abrir_faixas(caminho_imagem, bytes_por_faixa, kernel)
+    if leitor is not None:
+        _, _, faixas = leitor
+        with instrumentacao.etapa("histograma_faixas", caminho_imagem):  # Inclui a decodificação das faixas.
+            return calcular_histograma_ponderado_em_faixas(faixas, pesos_linhas, kernel)
+
+    imagem_cinza = ler_imagem_cinza(caminho_imagem, cache, kernel.profundidade_nativa)
+    if imagem_cinza is None:
+        return None
+    with instrumentacao.etapa("histograma", caminho_imagem):
+        return calcular_histograma_ponderado(imagem_cinza, pesos_linhas, kernel=kernel)
+
+def _abrir_faixas(caminho_imagem, bytes_por_faixa, kernel):
+    """
+    Leitor em faixas da imagem (ver abrir_faixas_cinza) ou None para ler a imagem inteira.
+    Matrizes são sempre lidas em faixas: cada faixa é uma visão das linhas mapeadas,
+    contada pelo kernel sem cópia intermediária.
+    """
+    if e_matriz(caminho_imagem):
+        return abrir_faixas_matriz(caminho_imagem, bytes_por_faixa or BYTES_POR_FAIXA_PADRAO, kernel.profundidade_nativa)
+    if bytes_por_faixa:
+        return abrir_faixas_cinza(caminho_imagem, bytes_por_faixa, kernel.profundidade_nativa)
+    return None
+
+def obter_areas_linhas(caminho_imagem, georreferencia, altura, largura):
+    """
+    Obtém a área (km²) de um pixel de cada linha da imagem a partir do geotransform do
+    GeoTIFF ou dos limites informados.
+    
+    :param caminho_imagem: Caminho da imagem.
+    :param georreferencia: True para ler o geotransform do arquivo, ou tupla
+        (oeste, sul, leste, norte) com os limites da imagem em graus.
+    :param altura: Altura da imagem em pixels.
+    :param largura: Largura da imagem em pixels.
+    :return: Array com a área de cada linha ou None se o arquivo não for georreferenciado.
+    """
+    if georreferencia is True:
+        lido = ler_geotransform(caminho_imagem)
+        if lido is None:
+            return None
+        geotransform, geografico = lido
+    else:
+        geotransform, geografico = limites_para_geotransform(*georreferencia, altura, largura), True
+    return areas_por_linha(geotransform, altura, geografico)
+
+def preparar_imagem(caminho_imagem, area_km2, cache, bytes_por_faixa=None, dimensoes=None, georreferencia=None, limiar=None):
+    """
+    Etapa leve de cada imagem: obtém a área (estimando-a se necessário), as dimensões
+    pelo cabeçalho e a área por pixel, sem processar os pixels. Permite normalizar as
+    áreas antes da etapa pesada.
+    
+    No modo georreferenciado, a área de cada linha segue a latitude: a área total
+    (informada ou, se ausente, calculada pela geometria) é distribuída entre as linhas
+    proporcionalmente à área geográfica de cada uma. A área por pixel passa a ser a da
+    linha de maior área, e cada linha recebe um peso relativo a ela.
+    
+    :param caminho_imagem: Caminho da imagem a ser processada.
+    :param area_km2: Área da imagem em km² ou None para estimá-la.
+    :param cache: Cache de imagens decodificadas (CacheImagens).
+    :param bytes_por_faixa: Limite de bytes por faixa; None desativa a leitura em faixas.
+    :param dimensoes: Tupla (altura, largura) já conhecida (ex.: do cache de resultados), se houver.
+    :param georreferencia: None (pixels de área uniforme), True (lê o geotransform do
+        GeoTIFF) ou tupla (oeste, sul, leste, norte) com os limites da imagem em graus.
+    :param limiar: Limiar próprio da imagem, que substitui o limiar principal do lote (opcional).
+    :return: Dicionário com área, dimensões e área por pixel da imagem ou o erro de processamento.
+    """
+    preparo = {
+        "erro_processamento": None,
+        "caminho_imagem": caminho_imagem,
+        "area_km2": area_km2,
+        "altura": None,
+        "largura": None,
+        "area_por_pixel": None,
+        "pesos_linhas": None,
+        "limiar": limiar
+    }
+    try:
+        if area_km2 is None and georreferencia is None:
+            with instrumentacao.etapa("estimar_area", caminho_imagem):
+                area_km2 = preparo["area_km2"] = estimador_area.estimar_area(caminho_imagem, 1, 1, cache)
+        if area_km2 is not None and area_km2 < 0:
             logging.error(f"Erro: Área negativa fornecida para {caminho_imagem}.")  # Loga erro se a área for negativa.
-            continue
-        
-        imagem = ler_imagem(caminho_imagem)  # Lê a imagem.
+            preparo["erro_processamento"] = "Área negativa fornecida."
+            return preparo
 
-        if imagem is None:
+        if dimensoes is None:
+            with instrumentacao.etapa("dimensoes", caminho_imagem):
+                dimensoes = obter_dimensoes(caminho_imagem, cache, bytes_por_faixa)  # Lê a imagem.
+        if dimensoes is None:
             logging.error(f"Erro ao carregar {caminho_imagem}. Verifique se o arquivo é uma imagem válida.")
-            continue
+            preparo["erro_processamento"] = "Erro ao carregar imagem."
+            return preparo
 
-        altura, largura, _ = imagem.shape  # Obtém as dimensões da imagem.
-        area_por_pixel = calcular_area_por_pixel(areas_km2[i], altura, largura)  # Calcula área por pixel.
-        areas_por_pixel.append(area_por_pixel)  # Armazena a área por pixel.
+        altura, largura = dimensoes  # Obtém as dimensões da imagem.
+        preparo["altura"], preparo["largura"] = altura, largura
 
-    areas_normalizadas = []  # Lista para áreas normalizadas.
+        areas_linhas = None
+        if georreferencia is not None:
+            areas_linhas = obter_areas_linhas(caminho_imagem, georreferencia, altura, largura)
+            if areas_linhas is None:
+                logging.warning("%s não tem georreferência; a área dos pixels será considerada uniforme.", caminho_imagem)
+                if area_km2 is None:
+                    area_km2 = preparo["area_km2"] = estimador_area.estimar_area(caminho_imagem, 1, 1, cache)
+
+        if areas_linhas is None:
+            preparo["area_por_pixel"] = calcular_area_por_pixel(area_km2, altura, largura)  # Calcula área por pixel.
+        else:
+            if area_km2 is None:
+                area_km2 = preparo["area_km2"] = float(areas_linhas.sum()) * largura  # Área dada pela geometria.
+            preparo["pesos_linhas"] = areas_linhas / areas_linhas.max()
+            preparo["area_por_pixel"] = calcular_area_por_pixel(area_km2, altura, largura, preparo["pesos_linhas"])
+    except Exception as e:
+        message = str(e)  # Captura a mensagem da exceção.
+        preparo["erro_processamento"] = message  # Registra o erro.
+        logging.error(message)  # Loga a mensagem de erro.
+
+    return preparo
+
+def processar_imagem(preparo, limiares, bytes_por_faixa=None, cache=None, kernel=KERNEL_PADRAO):
+    """
+    Etapa pesada e independente de cada imagem: calcula o histograma e as estatísticas
+    brutas (não normalizadas), que dependem apenas da própria imagem. Pode ser executada
+    em paralelo.
+    
+    :param preparo: Dicionário retornado por preparar_imagem.
+    :param limiares: Lista de limiares para considerar pixels claros.
+    :param bytes_por_faixa: Limite de bytes por faixa; None desativa a leitura em faixas.
+    :param cache: Cache de imagens decodificadas (opcional).
+    :param kernel: ParametrosKernel do histograma.
+    :return: Dicionário com as estatísticas brutas da imagem ou o erro de processamento.
+    """
+    bruto = dict(preparo, histograma=None, histograma_ponderado=None, estatisticas=None)
+    origem = bruto["caminho_imagem"]
+    bruto["caminho_imagem"] = nome_imagem(origem)  # O resultado não mantém uma matriz em memória referenciada.
+    if bruto["erro_processamento"] is not None:
+        return bruto
+    if cache is None:
+        cache = CacheImagens()  # Cache com escopo desta imagem.
+
+    try:
+        # Uma única passada pela imagem: as estatísticas de cada limiar vêm do histograma.
+        if bruto.get("pesos_linhas") is None:
+            histograma = obter_histograma(origem, cache, bytes_por_faixa, kernel)
+        else:
+            histogramas = obter_histograma_ponderado(origem, cache, bruto["pesos_linhas"], bytes_por_faixa, kernel)
+            histograma, bruto["histograma_ponderado"] = histogramas if histogramas is not None else (None, None)
+        if histograma is None:
+            bruto["erro_processamento"] = "Erro ao carregar imagem."
+            return bruto
+
+        bruto["histograma"] = histograma
+        with instrumentacao.etapa("limiares", bruto["caminho_imagem"]):
+            bruto["estatisticas"] = estatisticas_do_bruto(bruto, limiares)
+    except Exception as e:
+        message = str(e)  # Captura a mensagem da exceção.
+        bruto["erro_processamento"] = message  # Registra o erro.
+        logging.error(message)  # Loga a mensagem de erro.
+
+    return bruto
+
+def _processar_no_processo(preparo, limiares, bytes_por_faixa, cache, kernel=KERNEL_PADRAO):
+    with instrumentacao.etapa("processar_imagem", preparo["caminho_imagem"]):
+        return processar_imagem(preparo, limiares, bytes_por_faixa, cache, kernel)
+
+def _processar_tarefa(tarefa):
+    """
+    Ponto de entrada dos processos do pool: desempacota a tarefa e processa a imagem.
+    Com a instrumentação ativa no processo principal, as etapas medidas no worker
+    acompanham o resultado.
+    """
+    preparo, limiares, bytes_por_faixa, kernel, instrumentar = tarefa
+    if not instrumentar:
+        return processar_imagem(preparo, limiares, bytes_por_faixa, None, kernel), []
+
+    if not instrumentacao.ativa():
+        instrumentacao.ativar(instrumentar == "memoria")
+    bruto = _processar_no_processo(preparo, limiares, bytes_por_faixa, None, kernel)
+    return bruto, instrumentacao.coletar()
+
+def processar_em_paralelo(preparos, limiares, bytes_por_faixa=None, workers=2, tamanho_lote=None, kernel=KERNEL_PADRAO):
+    """
+    Executa a etapa pesada em um pool de processos, enviando as tarefas em lotes.
+    Os resultados são entregues assim que ficam prontos, na mesma ordem das imagens de entrada.
+    
+    :param preparos: Lista de dicionários retornados por preparar_imagem.
+    :param limiares: Lista de limiares para considerar pixels claros.
+    :param bytes_por_faixa: Limite de bytes por faixa; None desativa a leitura em faixas.
+    :param workers: Quantidade de processos do pool.
+    :param tamanho_lote: Quantidade de imagens enviadas por vez a cada processo.
+    :param kernel: ParametrosKernel do histograma.
+    :return: Gerador de estatísticas brutas, na ordem de entrada.
+    """
+    if tamanho_lote is None:
+        tamanho_lote = max(1, len(preparos) // (workers * 4))  # Alguns lotes por processo equilibram a carga.
+
+    instrumentar = instrumentacao.ativa() and ("memoria" if instrumentacao.medindo_memoria() else "tempo")
+    tarefas = [(preparo, limiares, bytes_por_faixa, kernel, instrumentar) for preparo in preparos]
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for bruto, eventos in executor.map(_processar_tarefa, tarefas, chunksize=tamanho_lote):
+            instrumentacao.incorporar(eventos)
+            yield bruto
+    finally:
+        # Se o consumidor parar antes do fim (ex.: lote cancelado), as tarefas ainda não iniciadas são descartadas.
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def calcular_areas_normalizadas(preparos):
+    """
+    Normaliza as áreas por pixel pela maior área do lote.
+    
+    :param preparos: Lista de dicionários retornados por preparar_imagem.
+    :return: Lista com a área normalizada de cada imagem (None para as imagens com erro).
+    """
+    areas_por_pixel = [preparo["area_por_pixel"] for preparo in preparos if preparo["erro_processamento"] is None]
     if not areas_por_pixel:  # Verifica se a lista de áreas por pixel está vazia.
         logging.warning("Nenhuma área válida foi fornecida para normalização.")
-    else:
-        areas_normalizadas = normalizar_areas(areas_por_pixel)  # Normaliza as áreas.
+        return [None] * len(preparos)
 
-    # Calcula a soma ponderada das intensidades para cada imagem
-    for i, caminho_imagem in enumerate(imagens):
-        try:
-            imagem = ler_imagem(caminho_imagem)
-
-            if imagem is None:
-                registra_processamento(resultados, caminho_imagem, erro_processamento="Erro ao carregar imagem.")
-                continue
-            
-            imagem_cinza = cv2.cvtColor(imagem, cv2.COLOR_BGR2GRAY)  # Converte a imagem para escala de cinza.
-            soma_ponderada, contagem_pixels_claros = soma_ponderada_intensidades(imagem_cinza, areas_normalizadas[i])  # Calcula soma ponderada.
-            
-            histograma = calcular_histograma(imagem_cinza)
-
-            # Armazena os resultados
-            registra_processamento(resultados, caminho_imagem, soma_ponderada, areas_por_pixel[i], areas_normalizadas[i], histograma.tolist(), contagem_pixels_claros)
-            
-            logging.info(f"Soma ponderada para {caminho_imagem}: {soma_ponderada}")  # Loga a soma ponderada.
-        except Exception as e:
-            message = str(e)  # Captura a mensagem da exceção.
-            registra_processamento(resultados, caminho_imagem, erro_processamento=message)  # Registra o erro.
-            logging.error(message)  # Loga a mensagem de erro.
-
-    return resultados  # Retorna os resultados.
+    areas_normalizadas = iter(normalizar_areas(areas_por_pixel))  # Normaliza as áreas.
+    return [next(areas_normalizadas) if preparo["erro_processamento"] is None else None for preparo in preparos]
 
-if __name__ == "__main__":
-    configurar_logs()
+def consolidar_resultado(bruto, area_normalizada, limiares):
+    """
+    Aplica a área normalizada às estatísticas brutas de uma imagem.
+    
+    :param bruto: Dicionário retornado por processar_imagem.
+    :param area_normalizada: Área normalizada da imagem.
+    :param limiares: Lista de limiares usados no processamento.
+    :return: Dicionário com o resultado da imagem.
+    """
+    resultados = []
+    caminho_imagem = bruto["caminho_imagem"]
+    if bruto["erro_processamento"] is not None:
+        registra_processamento(resultados, caminho_imagem, erro_processamento=bruto["erro_processamento"])
+        return resultados[0]
+
+    estatisticas = bruto["estatisticas"]
+    contagem_pixels_claros, intensidades = estatisticas[0]
+    soma_ponderada = intensidades * area_normalizada  # Calcula soma ponderada.
+
+    varredura_limiares = None
+    if len(limiares) > 1:
+        varredura_limiares = [
+            {"limiar": l, "soma_ponderada": float(soma * area_normalizada), "contagem_pixels_claros": contagem}
+            for l, (contagem, soma) in zip(_limiares_da_imagem(bruto, limiares), estatisticas)
+        ]
+
+    # Armazena os resultados
+    registra_processamento(resultados, caminho_imagem, soma_ponderada, bruto["area_por_pixel"], area_normalizada, bruto["histograma"].tolist(), contagem_pixels_claros, varredura_limiares=varredura_limiares)
+    
+    logging.info("Soma ponderada para %s: %s", caminho_imagem, soma_ponderada)  # Loga a soma ponderada.
+    return resultados[0]
+
+def preparar_lote(imagens, areas_km2, cache, bytes_por_faixa=None, cache_resultados=None, georreferencias=None, kernel=KERNEL_PADRAO, limiares_imagens=None, diario=None, medidas=None):
+    """
+    Executa a etapa leve de todas as imagens, consultando antes o diário e o cache de
+    resultados. As imagens georreferenciadas precisam do histograma de cada linha e não
+    usam as entradas do cache (que guardam apenas o histograma da imagem inteira); as
+    matrizes em memória (MatrizEmMemoria) não têm um arquivo que as identifique e não
+    usam o cache nem o diário.
+    
+    :param georreferencias: Georreferência de cada imagem (ver preparar_imagem) ou None.
+    :param kernel: ParametrosKernel do histograma (a chave do cache depende dele).
+    :param limiares_imagens: Limiar próprio de cada imagem (None usa o do lote) ou None.
+    :param diario: DiarioProcessamento do lote, opcional; as imagens já registradas nele
+        não são preparadas novamente.
+    :param medidas: Tupla (area_km2, (altura, largura)) de cada imagem já medida (ex.: na
+        primeira passada de um lote em fluxo) ou None, usada na etapa leve no lugar da
+        área da entrada, que continua identificando a imagem no diário; None para todas
+        mede as imagens normalmente.
+    :return: Tupla (preparos, entradas) com o preparo de cada imagem e a entrada
+        correspondente do cache de resultados ou, para as imagens retomadas do diário,
+        as estatísticas brutas registradas (None quando ausente). A área estimada das
+        imagens sem área vem da entrada do cache, quando houver, sem decodificar a imagem.
+    """
+    if georreferencias is None:
+        georreferencias = [None] * len(imagens)
+    if limiares_imagens is None:
+        limiares_imagens = [None] * len(imagens)
+    if medidas is None:
+        medidas = [None] * len(imagens)
+
+    chaves = [None] * len(imagens)
+    chaves_cache = [None] * len(imagens)
+    entradas = [None] * len(imagens)
+    if diario is not None:
+        chaves = [
+            None if isinstance(entrada[0], MatrizEmMemoria) else chave_entrada(*entrada)
+            for entrada in zip(imagens, areas_km2, limiares_imagens, georreferencias)
+        ]
+        entradas = [None if chave is None else diario.obter(chave) for chave in chaves]
+    if cache_resultados is not None:
+        with instrumentacao.etapa("consultar_cache"):
+            # A chave é calculada uma vez e reaproveitada ao armazenar o resultado (iterar_brutos).
+            chaves_cache = [
+                cache_resultados.chave(caminho_imagem, kernel.chave) if entrada is None and georreferencia is None and not isinstance(caminho_imagem, MatrizEmMemoria) else None
+                for caminho_imagem, georreferencia, entrada in zip(imagens, georreferencias, entradas)
+            ]
+            entradas = [entrada if chave is None else cache_resultados.obter(chave) for chave, entrada in zip(chaves_cache, entradas)]
+
+    preparos = []
+    for caminho_imagem, area_km2, entrada, georreferencia, limiar, chave, chave_cache, medida in zip(imagens, areas_km2, entradas, georreferencias, limiares_imagens, chaves, chaves_cache, medidas):
+        if _retomada_do_diario(entrada):
+            preparos.append(entrada)
+            continue
+        dimensoes = _dimensoes_da_entrada(entrada)
+        estimar = area_km2 is None and georreferencia is None
+        if medida is not None:
+            area_km2, dimensoes = medida
+        elif estimar and entrada is not None and entrada["area_estimada"] is not None:
+            area_km2 = entrada["area_estimada"]
+        with instrumentacao.etapa("preparar", caminho_imagem):
+            preparo = preparar_imagem(caminho_imagem, area_km2, cache, bytes_por_faixa, dimensoes, georreferencia, limiar)
+        if chave is not None:
+            preparo["chave_diario"] = chave
+        if chave_cache is not None:
+            preparo["chave_cache"] = chave_cache
+            if estimar:
+                preparo["area_estimada"] = preparo["area_km2"]  # Gravada no cache com o histograma.
+        preparos.append(preparo)
+    return preparos, entradas
+
+def iterar_brutos(preparos, entradas, limiares, cache, bytes_por_faixa=None, workers=1, cache_resultados=None, kernel=KERNEL_PADRAO, diario=None):
+    """
+    Executa a etapa pesada e entrega as estatísticas brutas (não normalizadas) de cada
+    imagem, na ordem de entrada. Imagens encontradas no cache de resultados não são
+    decodificadas, e as retomadas do diário são entregues como foram registradas; as
+    demais são registradas no diário, se houver, assim que ficam prontas.
+    
+    :return: Gerador de dicionários de estatísticas brutas.
+    """
+    # Somente as imagens ausentes do cache de resultados passam pela etapa pesada. Os
+    # processos do pool reabrem os arquivos pelo caminho (as matrizes mapeadas compartilham
+    # o cache de páginas); as matrizes em memória são processadas neste processo.
+    pendentes = [preparo for preparo, entrada in zip(preparos, entradas) if entrada is None]
+    if workers > 1:
+        calculados = processar_em_paralelo([preparo for preparo in pendentes if not _em_memoria(preparo)], limiares, bytes_por_faixa, workers, kernel=kernel)
+
+    for preparo, entrada in zip(preparos, entradas):
+        if entrada is None:
+            if workers > 1 and not _em_memoria(preparo):
+                bruto = next(calculados)
+            else:
+                bruto = _processar_no_processo(preparo, limiares, bytes_por_faixa, cache, kernel)
+            if cache_resultados is not None and bruto["erro_processamento"] is None:
+                cache_resultados.armazenar(preparo.get("chave_cache"), bruto["altura"], bruto["largura"], bruto["histograma"], preparo.get("area_estimada"))
+        elif _retomada_do_diario(entrada):
+            yield entrada
+            continue
+        elif preparo["erro_processamento"] is not None:
+            bruto = dict(preparo, histograma=None, histograma_ponderado=None, estatisticas=None)
+        else:
+            bruto = dict(preparo, histograma=entrada["histograma"], histograma_ponderado=None)
+            bruto["estatisticas"] = estatisticas_do_bruto(bruto, limiares)
+            if entrada["area_estimada"] is None and preparo.get("area_estimada") is not None:
+                # Entrada gravada com a área informada: a estimativa passa a acompanhá-la.
+                cache_resultados.armazenar(preparo["chave_cache"], bruto["altura"], bruto["largura"], bruto["histograma"], preparo["area_estimada"])
+        if diario is not None and "chave_diario" in preparo:
+            diario.registrar(preparo["chave_diario"], bruto)
+        yield bruto
+
+    if diario is not None:
+        diario.gravar()
+    if cache_resultados is not None:
+        cache_resultados.gravar()
+
+    logging.debug("Cache de imagens: %d decodificações, %d acertos.", cache.decodificacoes, cache.acertos)
+    if cache_resultados is not None:
+        logging.debug("Cache de resultados: %d acertos, %d falhas.", cache_resultados.acertos, cache_resultados.falhas)
+
+def iterar_resultados(imagens, areas_km2, cache=None, limiar=LIMIAR_PADRAO, bytes_por_faixa=None, workers=1, cache_resultados=None, georreferencias=None, kernel=None, limiares_imagens=None, diario=None):
+    """
+    Processa as imagens e entrega o resultado de cada uma assim que fica pronto, na ordem
+    de entrada. As áreas são normalizadas antes da etapa pesada, a partir das dimensões
+    lidas dos cabeçalhos, de modo que nenhum resultado precisa esperar pelo lote inteiro.
+    Imagens encontradas no cache de resultados não são decodificadas.
+    
+    Os parâmetros são os mesmos de main.
+    
+    :return: Gerador de dicionários com o resultado de cada imagem.
+    """
+    limiares = _como_lista_limiares(limiar)
+    for bruto, area_normalizada in _iterar_normalizados(imagens, areas_km2, cache, limiares, bytes_por_faixa, workers, cache_resultados, georreferencias, kernel, limiares_imagens, diario):
+        with instrumentacao.etapa("consolidar", bruto["caminho_imagem"]):
+            resultado = consolidar_resultado(bruto, area_normalizada, limiares)
+        yield resultado
+
+def processar_conjunto(imagens, areas_km2, cache=None, limiar=LIMIAR_PADRAO, bytes_por_faixa=None, workers=1, cache_resultados=None, georreferencias=None, kernel=None, limiares_imagens=None, diario=None):
+    """
+    Processa as imagens e reúne os resultados em colunas NumPy (ConjuntoResultados), sem
+    converter os histogramas em listas.
+    
+    Os parâmetros são os mesmos de main.
+    
+    :return: ConjuntoResultados com uma linha por imagem (vazio se os parâmetros forem inválidos).
+    """
+    limiares = _como_lista_limiares(limiar)
+    kernel = kernel or KERNEL_PADRAO
+    normalizados = _iterar_normalizados(imagens, areas_km2, cache, limiares, bytes_por_faixa, workers, cache_resultados, georreferencias, kernel, limiares_imagens, diario)
+    conjunto = ConjuntoResultados.vazio(len(imagens or []), limiares, kernel.niveis)
+    quantidade = 0
+    for indice, (bruto, area_normalizada) in enumerate(normalizados):
+        with instrumentacao.etapa("consolidar", bruto["caminho_imagem"]):
+            conjunto.definir_bruto(indice, bruto, area_normalizada)
+        quantidade += 1
+    return conjunto[:quantidade]
+
+def medir_fluxo(abrir_entradas, cache, bytes_por_faixa=None, georreferencia=None, diario=None, cache_resultados=None, kernel=None):
+    """
+    Primeira passada do processamento em fluxo: executa a etapa leve de cada entrada
+    (área e dimensões pelos cabeçalhos, sem processar os pixels) para contar as imagens e
+    encontrar a maior área por pixel do lote. A área (inclusive a estimada) e as dimensões
+    de cada imagem são gravadas em um arquivo temporário, um registro MEDIDA_FLUXO por
+    imagem, para que a segunda passada não repita a etapa leve nem a estimativa de área.
+    As imagens já registradas no diário usam os valores registrados, e as encontradas no
+    cache de resultados, a área estimada e as dimensões da entrada.
+
+    :param abrir_entradas: Função sem argumentos que retorna um novo iterável de tuplas
+        (caminho_imagem, area_km2, limiar), como ler_manifesto; é chamada uma vez por passada.
+    :param cache: Cache de imagens decodificadas (CacheImagens).
+    :param bytes_por_faixa: Limite de bytes por faixa; None desativa a leitura em faixas.
+    :param georreferencia: Georreferência de todas as imagens (ver preparar_imagem).
+    :param diario: DiarioProcessamento do lote, opcional.
+    :param cache_resultados: Cache persistente das estatísticas brutas (CacheResultados), opcional.
+    :param kernel: ParametrosKernel do histograma (a chave do cache depende dele).
+    :return: Tupla (quantidade, maior_area_por_pixel, arquivo_medidas), com None se nenhuma
+        imagem for válida; quem chama deve fechar arquivo_medidas, que é removido ao fechar.
+    :raises ValueError: Se uma entrada for inválida.
+    """
+    quantidade = 0
+    maior_area_por_pixel = None
+    arquivo_medidas = tempfile.TemporaryFile(prefix="medidas_fluxo_")
+    try:
+        medidas = []
+        for caminho_imagem, area_km2, limiar in abrir_entradas():
+            quantidade += 1
+            preparo = None
+            if diario is not None and not isinstance(caminho_imagem, MatrizEmMemoria):
+                preparo = diario.consultar(chave_entrada(caminho_imagem, area_km2, limiar, georreferencia))
+            if preparo is None:
+                dimensoes = None
+                if cache_resultados is not None and area_km2 is None and georreferencia is None and not isinstance(caminho_imagem, MatrizEmMemoria):
+                    entrada = cache_resultados.consultar(cache_resultados.chave(caminho_imagem, (kernel or KERNEL_PADRAO).chave))
+                    if entrada is not None:
+                        area_km2, dimensoes = entrada["area_estimada"], _dimensoes_da_entrada(entrada)
+                with instrumentacao.etapa("medir", caminho_imagem):
+                    preparo = preparar_imagem(caminho_imagem, area_km2, cache, bytes_por_faixa, dimensoes, georreferencia, limiar)
+            if preparo["erro_processamento"] is None:
+                medidas.append((preparo["area_km2"], preparo["altura"], preparo["largura"]))
+                if maior_area_por_pixel is None or preparo["area_por_pixel"] > maior_area_por_pixel:
+                    maior_area_por_pixel = preparo["area_por_pixel"]
+            else:
+                medidas.append((np.nan, -1, -1))
+            if len(medidas) == TAMANHO_BLOCO_FLUXO:
+                np.array(medidas, dtype=MEDIDA_FLUXO).tofile(arquivo_medidas)
+                medidas = []
+        np.array(medidas, dtype=MEDIDA_FLUXO).tofile(arquivo_medidas)
+    except BaseException:
+        arquivo_medidas.close()
+        raise
+    return quantidade, maior_area_por_pixel, arquivo_medidas
+
+def iterar_resultados_em_fluxo(abrir_entradas, medida, cache=None, limiar=LIMIAR_PADRAO, bytes_por_faixa=None, workers=1, cache_resultados=None, georreferencia=None, kernel=None, diario=None):
+    """
+    Segunda passada do processamento em fluxo: lê as entradas novamente, em blocos de
+    TAMANHO_BLOCO_FLUXO, e entrega o resultado de cada imagem normalizado pela maior área
+    por pixel medida na primeira passada (medir_fluxo). A etapa leve reaproveita a área e
+    as dimensões gravadas na primeira passada, e apenas o bloco em andamento fica em
+    memória, de modo que o lote pode ter qualquer tamanho.
+
+    :param abrir_entradas: A mesma função passada a medir_fluxo.
+    :param medida: Tupla (quantidade, maior_area_por_pixel, arquivo_medidas) retornada por medir_fluxo.
+    :param georreferencia: Georreferência de todas as imagens (ver preparar_imagem).
+    :raises ValueError: Se as entradas mudarem entre as duas passadas.
+
+    Os demais parâmetros são os mesmos de main.
+
+    :return: Gerador de dicionários com o resultado de cada imagem.
+    """
+    limiares = _como_lista_limiares(limiar)
+    kernel = kernel or KERNEL_PADRAO
+    if cache is None:
+        cache = CacheImagens()
+    quantidade, maior_area_por_pixel, arquivo_medidas = medida
+    if maior_area_por_pixel is None:
+        logging.warning("Nenhuma área válida foi fornecida para normalização.")
+
+    arquivo_medidas.seek(0)
+    entradas_lote = iter(abrir_entradas())
+    processadas = 0
+    while True:
+        bloco = list(itertools.islice(entradas_lote, TAMANHO_BLOCO_FLUXO))
+        if not bloco:
+            break
+        processadas += len(bloco)
+        if processadas > quantidade:
+            raise ValueError("As entradas do lote mudaram entre a medição e o processamento.")
+
+        imagens, areas_km2, limiares_imagens = (list(coluna) for coluna in zip(*bloco))
+        georreferencias = None if georreferencia is None else [georreferencia] * len(bloco)
+        medidas = [
+            None if altura < 0 else (float(area_km2), (int(altura), int(largura)))
+            for area_km2, altura, largura in np.fromfile(arquivo_medidas, dtype=MEDIDA_FLUXO, count=len(bloco)).tolist()
+        ]
+        preparos, entradas = preparar_lote(imagens, areas_km2, cache, bytes_por_faixa, cache_resultados, georreferencias, kernel, limiares_imagens, diario, medidas)
+        for bruto in iterar_brutos(preparos, entradas, limiares, cache, bytes_por_faixa, workers, cache_resultados, kernel, diario):
+            area_normalizada = None
+            if bruto["erro_processamento"] is None:
+                if maior_area_por_pixel is None or bruto["area_por_pixel"] > maior_area_por_pixel:
+                    raise ValueError("As entradas do lote mudaram entre a medição e o processamento.")
+                area_normalizada = bruto["area_por_pixel"] / maior_area_por_pixel  # Mesma fórmula de normalizar_areas.
+            with instrumentacao.etapa("consolidar", bruto["caminho_imagem"]):
+                resultado = consolidar_resultado(bruto, area_normalizada, limiares)
+            yield resultado
+
+    if processadas != quantidade:
+        raise ValueError("As entradas do lote mudaram entre a medição e o processamento.")
+
+def _como_lista_limiares(limiar):
+    return list(limiar) if isinstance(limiar, (list, tuple)) else [limiar]
+
+def _iterar_normalizados(imagens, areas_km2, cache, limiares, bytes_por_faixa, workers, cache_resultados, georreferencias, kernel=None, limiares_imagens=None, diario=None):
+    """
+    Valida os parâmetros e entrega, na ordem de entrada, as estatísticas brutas de cada
+    imagem junto com sua área normalizada.
+    """
+    if not imagens:
+        logging.error("Erro: Nenhuma imagem foi fornecida.")  # Loga erro se nenhuma imagem for fornecida.
+        return
     
+    if len(imagens) != len(areas_km2):
+        logging.error("Erro: O número de imagens deve ser igual ao número de áreas.")  # Loga erro se o número de imagens não corresponder.
+        return
+
+    if cache is None:
+        cache = CacheImagens()  # Cache com escopo desta execução.
+    kernel = kernel or KERNEL_PADRAO
+
+    preparos, entradas = preparar_lote(imagens, areas_km2, cache, bytes_por_faixa, cache_resultados, georreferencias, kernel, limiares_imagens, diario)
+    areas_normalizadas = calcular_areas_normalizadas(preparos)
+
+    brutos = iterar_brutos(preparos, entradas, limiares, cache, bytes_por_faixa, workers, cache_resultados, kernel, diario)
+    yield from zip(brutos, areas_normalizadas)
+
+def _dimensoes_da_entrada(entrada):
+    return None if entrada is None else (entrada["altura"], entrada["largura"])
+
+def _em_memoria(preparo):
+    return isinstance(preparo["caminho_imagem"], MatrizEmMemoria)
+
+def _retomada_do_diario(entrada):
+    # As entradas do cache de resultados guardam apenas dimensões e histograma; as do diário, as estatísticas prontas.
+    return entrada is not None and "estatisticas" in entrada
+
+def main(imagens, areas_km2, cache=None, limiar=LIMIAR_PADRAO, bytes_por_faixa=None, workers=1, cache_resultados=None, georreferencias=None, kernel=None, limiares_imagens=None, diario=None):
+    """
+    Função principal que processa as imagens e calcula a soma ponderada das intensidades.
+    
+    :param imagens: Lista de caminhos das imagens a serem processadas.
+    :param areas_km2: Lista de áreas correspondentes a cada imagem em km².
+    :param cache: Cache de imagens decodificadas compartilhado pela execução (opcional).
+    :param limiar: Limiar para considerar pixels claros, ou lista de limiares para uma
+        varredura (os campos principais usam o primeiro limiar da lista).
+    :param bytes_por_faixa: Se informado, as imagens TIFF são lidas em faixas de até esse
+        número de bytes, limitando o pico de memória ao tamanho da faixa.
+    :param workers: Quantidade de processos usados na etapa por imagem (1 executa no próprio processo).
+    :param cache_resultados: Cache persistente das estatísticas brutas (CacheResultados), opcional.
+    :param georreferencias: Lista com a georreferência de cada imagem (None, True para ler o
+        geotransform do GeoTIFF ou os limites (oeste, sul, leste, norte) em graus), opcional.
+    :param kernel: ParametrosKernel do histograma (padrão: imagens reduzidas a 8 bits, 256 níveis).
+    :param limiares_imagens: Limiar próprio de cada imagem (None usa o do lote), opcional; substitui
+        o limiar principal da imagem.
+    :param diario: DiarioProcessamento em que as imagens concluídas são registradas e do
+        qual as já registradas são retomadas, opcional.
+    :return: Dicionário com resultados de cada imagem.
+    """
+    with instrumentacao.etapa("main"):
+        resultados = list(iterar_resultados(imagens, areas_km2, cache, limiar, bytes_por_faixa, workers, cache_resultados, georreferencias, kernel, limiares_imagens, diario))
+    return resultados if resultados else {}  # Retorna os resultados.
+
+if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Processar imagens e calcular soma ponderada das intensidades.")
     parser.add_argument('--imagens', nargs='+', help='Caminhos completos das imagens a serem processadas.')
     parser.add_argument('--areas_km', nargs='+', type=float, help='Áreas estimadas em km² para cada imagem.')
-    parser.add_argument('--limiar', type=int, default=200, help='Limiar para considerar pixels claros.')
+    parser.add_argument('--manifesto', '--manifest', default=None, help='Arquivo CSV ou NDJSON com uma imagem por linha (caminho, area_km2 e limiar opcionais), lido linha a linha; substitui --imagens e --areas_km.')
+    parser.add_argument('--varrer', '--scan', default=None, help='Processa as imagens deste diretório; substitui --imagens e --areas_km.')
+    parser.add_argument('--padrao', '--glob', default=None, help='Com --varrer, padrão glob dos arquivos (ex.: "**/*.tif" inclui os subdiretórios); o padrão são as extensões de imagem conhecidas.')
+    parser.add_argument('--limiar', nargs='+', default=[str(LIMIAR_PADRAO)], help='Limiar para considerar pixels claros. Aceita vários valores e intervalos inicio:fim[:passo] para uma varredura.')
+    parser.add_argument('--faixa_mb', type=float, default=None, help='Lê as imagens TIFF (e as matrizes .npy/brutas) em faixas de até este tamanho em MB, limitando o uso de memória.')
+    parser.add_argument('--workers', type=int, default=1, help='Quantidade de processos usados para processar as imagens em paralelo.')
+    parser.add_argument('--formato', '--format', choices=FORMATOS_SAIDA, default='repr', help='Formato da saída: repr (lista completa ao final), ndjson (um registro JSON por imagem, assim que fica pronto) ou npz (arquivo colunar, requer --saida).')
+    parser.add_argument('--saida', help='Arquivo de saída (obrigatório para npz; para ndjson, o padrão é a saída padrão).')
+    parser.add_argument('--sem_cache', '--no-cache', action='store_true', help='Não usa o cache persistente de resultados.')
+    parser.add_argument('--reconstruir_cache', '--rebuild-cache', action='store_true', help='Recalcula todas as imagens e substitui as entradas do cache persistente.')
+    parser.add_argument('--dir_cache', default=None, help='Diretório do cache persistente de resultados.')
+    parser.add_argument('--cache_resultados_mb', type=float, default=256, help='Orçamento em MB do cache persistente de resultados.')
+    parser.add_argument('--cache_por_conteudo', action='store_true', help='Identifica as imagens no cache pelo hash do conteúdo em vez de caminho, tamanho e data.')
+    parser.add_argument('--cache_mb', type=float, default=ORCAMENTO_PADRAO_BYTES / (1024 * 1024), help='Orçamento em MB do cache de imagens decodificadas.')
+    parser.add_argument('--trace', default=None, help='Mede cada etapa por imagem e grava as medidas neste arquivo, no formato Trace Event do Chrome.')
+    parser.add_argument('--resumo_etapas', action='store_true', help='Mede cada etapa e imprime um resumo por etapa na saída de erro.')
+    parser.add_argument('--georreferenciado', action='store_true', help='Considera a latitude de cada linha ao calcular a área dos pixels, lendo o geotransform dos GeoTIFFs.')
+    parser.add_argument('--limites', nargs='+', type=float, default=None, help='Limites em graus (oeste sul leste norte) para o modo georreferenciado: 4 valores para todas as imagens ou 4 por imagem.')
+    parser.add_argument('--nivel_log', '--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default=None, help='Nível mínimo registrado no arquivo de log (padrão: INFO ou a variável PIXELAREA_NIVEL_LOG).')
+    parser.add_argument('--log_json', action='store_true', help='Grava o log como um objeto JSON por linha.')
+    parser.add_argument('--profundidade_nativa', '--native-depth', action='store_true', help='Mantém a profundidade nativa das imagens (16 bits, float) em vez de reduzi-las a 8 bits; os histogramas passam a ter --niveis posições e os limiares seguem essas posições.')
+    parser.add_argument('--niveis', '--bins', type=int, default=None, help='Com --profundidade_nativa, quantidade de posições do histograma (padrão 65536).')
+    parser.add_argument('--valor_maximo_float', type=float, default=1.0, help='Com --profundidade_nativa, valor das imagens de ponto flutuante associado à última posição do histograma (padrão 1.0).')
+    parser.add_argument('--graficos', '--charts', default=None, help='Exporta todos os gráficos do lote (somas ponderadas, áreas, áreas normalizadas, histograma agregado e pizza) para este diretório, sem interface gráfica.')
+    parser.add_argument('--formatos_graficos', nargs='+', choices=['png', 'svg'], default=['png'], help='Formatos dos gráficos exportados com --graficos.')
+    parser.add_argument('--top_k', type=int, default=40, help='Com --graficos, quantidade máxima de barras individuais; as demais imagens são agrupadas em "Outras".')
+    parser.add_argument('--diario', '--journal', default=None, help='Registra periodicamente as estatísticas brutas de cada imagem concluída (inclusive as falhas, com o erro) neste arquivo, para retomar o lote com --retomar.')
+    parser.add_argument('--retomar', '--resume', action='store_true', help='Com --diario, pula as imagens já registradas no diário e processa apenas as demais; a normalização usa todas.')
+    parser.add_argument('--repetir_falhas', '--retry-failed', action='store_true', help='Com --retomar, processa novamente as imagens registradas com erro.')
+    parser.add_argument('--intervalo_diario', type=int, default=100, help='Com --diario, quantidade de imagens concluídas acumuladas antes de cada gravação do diário (também gravado a cada 60 s).')
+    parser.add_argument('--trace_sem_memoria', action='store_true', help='Com --trace ou --resumo_etapas, não mede o pico de memória (menor custo).')
 
     args = parser.parse_args()
+    configurar_logs(args.nivel_log, estruturado=args.log_json)
 
     # Verifica se os parâmetros foram passados corretamente
-    if args.imagens and args.areas_km and len(args.imagens) == len(args.areas_km):
-        resultados = main(args.imagens, args.areas_km)
-        if resultados:
-            logging.info(f"Resultados: {resultados}")
-            print(resultados)
+    if (args.retomar or args.repetir_falhas) and not args.diario:
+        parser.error("--retomar e --repetir_falhas exigem --diario.")
+    abrir_entradas = None
+    if args.manifesto or args.varrer:
+        if args.manifesto and args.varrer:
+            parser.error("Use apenas uma das opções --manifesto e --varrer.")
+        if args.imagens or args.areas_km:
+            parser.error("--manifesto e --varrer substituem --imagens e --areas_km.")
+        if args.limites and len(args.limites) != 4:
+            parser.error("Com --manifesto ou --varrer, --limites aceita apenas 4 valores, usados para todas as imagens.")
+        varredura = len(interpretar_limiares(args.limiar)) > 1
+
+        def abrir_entradas():
+            # O lote é lido duas vezes (medição e processamento), sem ser reunido em listas.
+            entradas_lote = ler_manifesto(args.manifesto) if args.manifesto else varrer_diretorio(args.varrer, args.padrao)
+            for caminho_imagem, area_km2, limiar in entradas_lote:
+                if limiar is not None and varredura:
+                    raise ValueError("Os limiares do manifesto não podem ser combinados com uma varredura de --limiar.")
+                yield caminho_imagem, area_km2, limiar
+
+        try:
+            entradas_lote = abrir_entradas()
+            vazio = next(entradas_lote, None) is None
+            entradas_lote.close()
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        if vazio:
+            parser.error("Nenhuma imagem encontrada em " + (args.manifesto or args.varrer) + ".")
+
+    try:
+        georreferencias = interpretar_georreferencias(1 if abrir_entradas else len(args.imagens or []), args.georreferenciado, args.limites)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.imagens and args.areas_km is None and georreferencias is not None:
+        args.areas_km = [None] * len(args.imagens)  # As áreas vêm da geometria de cada imagem.
+
+    if abrir_entradas is not None or (args.imagens and args.areas_km and len(args.imagens) == len(args.areas_km)):
+        import motor  # A linha de comando é apenas uma camada sobre a API do motor.
+
+        if args.trace or args.resumo_etapas:
+            instrumentacao.ativar(medir_memoria=not args.trace_sem_memoria)
+
+        requisicao = motor.RequisicaoProcessamento(
+            imagens=args.imagens or [],
+            areas_km2=args.areas_km or [],
+            limiares=interpretar_limiares(args.limiar),
+            bytes_por_faixa=int(args.faixa_mb * 1024 * 1024) if args.faixa_mb else None,
+            workers=args.workers,
+            orcamento_cache_bytes=int(args.cache_mb * 1024 * 1024),
+            usar_cache_resultados=not args.sem_cache,
+            reconstruir_cache=args.reconstruir_cache,
+            diretorio_cache=args.dir_cache,
+            cache_por_conteudo=args.cache_por_conteudo,
+            orcamento_cache_resultados_bytes=int(args.cache_resultados_mb * 1024 * 1024),
+            georreferencias=None if abrir_entradas else georreferencias,
+            profundidade_nativa=args.profundidade_nativa,
+            niveis=args.niveis,
+            valor_maximo_float=args.valor_maximo_float,
+            caminho_diario=args.diario,
+            retomar=args.retomar,
+            repetir_falhas=args.repetir_falhas,
+            intervalo_diario=args.intervalo_diario
+        )
+        try:
+            kernel = requisicao.kernel()
+            if args.retomar:
+                verificar_diario(args.diario, parametros_diario(kernel, requisicao.limiares))
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+
+        if args.formato == 'npz' and not args.saida:
+            parser.error("--saida é obrigatório com --formato npz.")
+
+        lote = None
+        if abrir_entradas is not None:
+            try:
+                lote = motor.LoteEmFluxo(abrir_entradas, requisicao, georreferencias and georreferencias[0])
+            except (OSError, ValueError) as e:
+                parser.error(str(e))
+
+        def iterar_lote():
+            return iter(lote) if lote is not None else motor.iterar(requisicao)
+
+        conjunto = None
+        if args.graficos and (args.formato != 'repr' or lote is not None):
+            conjunto = ConjuntoResultados.vazio(len(lote) if lote is not None else len(args.imagens), requisicao.limiares, kernel.niveis)
+
+        def como_dicts(resultados):
+            for indice, resultado in enumerate(resultados):
+                resultado = resultado.como_dict()
+                if conjunto is not None:
+                    conjunto.definir(indice, resultado)  # Colunas dos gráficos, preenchidas durante a escrita.
+                yield resultado
+
+        if args.formato == 'ndjson':
+            resultados = como_dicts(iterar_lote())
+            if args.saida:
+                with open(args.saida, 'w', encoding='utf-8') as arquivo:
+                    quantidade = escrever_ndjson(resultados, arquivo)
+            else:
+                quantidade = escrever_ndjson(resultados, sys.stdout)
+            logging.info("%d resultados escritos em NDJSON.", quantidade)
+        elif args.formato == 'npz':
+            resultados = como_dicts(iterar_lote())
+            quantidade = escrever_npz(resultados, len(lote) if lote is not None else len(args.imagens), args.saida, requisicao.limiares, kernel.niveis)
+            logging.info("%d resultados escritos em %s.", quantidade, args.saida)
+        elif lote is not None:
+            quantidade = escrever_repr(como_dicts(lote), sys.stdout)
+            logging.info("Resultados: %d imagens.", quantidade)
         else:
-            print([])
+            conjunto = motor.processar_conjunto(requisicao)
+            if len(conjunto):
+                if logging.getLogger().isEnabledFor(logging.INFO):
+                    resumo = resumir_resultados(conjunto)  # O log recebe um resumo, não os histogramas.
+                    logging.info("Resultados: %d imagens, %d com erro.", resumo["quantidade"], resumo["com_erro"], extra={"dados": resumo})
+                print(conjunto.como_dicts())
+            else:
+                print([])
+
+        if args.graficos and conjunto is not None and len(conjunto):
+            from graficos import RenderizadorGraficos  # O Matplotlib só é carregado quando os gráficos são pedidos.
+
+            with instrumentacao.etapa("graficos"):
+                gravados = RenderizadorGraficos(args.top_k).exportar(conjunto, args.graficos, args.formatos_graficos)
+            logging.info("%d gráficos gravados em %s.", len(gravados), args.graficos)
+
+        if instrumentacao.ativa():
+            eventos = instrumentacao.desativar()
+            if args.trace:
+                instrumentacao.exportar_chrome_trace(eventos, args.trace)
+            if args.resumo_etapas:
+                print(instrumentacao.tabela_resumo(eventos), file=sys.stderr)
     else:
         logging.error("Erro: O número de imagens deve ser igual ao número de áreas.")
         print([])
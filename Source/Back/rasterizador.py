@@ -1,13 +1,17 @@
 import os
+import sys
 import argparse
-from qgis.core import QgsRasterLayer, QgsProject, QgsApplication, QgsCoordinateTransformContext, QgsRasterBandStats
-from qgis.analysis import QgsRasterCalculator, QgsRasterCalculatorEntry
 import logging
-from datetime import datetime
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+import instrumentacao
+from calculadora_raster import multiplicar_raster, empilhar_rasters, escrever_vrt
+from geometria_pixels import ler_geotransform
+from leitor_faixas import BYTES_POR_FAIXA_PADRAO
+from escritor_geotiff import NIVEL_COMPRESSAO_PADRAO
 
-app = QgsApplication([], False)
-app.initQgis()
+BACKENDS = ("qgis", "numpy")
+DIRETORIO_SAIDA_PADRAO = "./Resultados/Rasters"
 
 def configurar_logs():
     """
@@ -20,150 +24,380 @@ def configurar_logs():
         level=logging.DEBUG,  # Define o nível de logging; DEBUG para registrar tudo.
         format='%(asctime)s - %(levelname)s - %(message)s'  # Formato das mensagens de log.
     )
-    
+
     # Configurar variáveis de ambiente para suprimir mensagens do GDAL
     os.environ['CPL_DEBUG'] = 'OFF'  # Desativar mensagens de depuração do GDAL
     os.environ['GDAL_SKIP'] = 'gdal'  # Ignorar o driver GDAL que pode causar erros
 
-def calcular_area_pixel(camada, res_x, res_y):
-    # Verifica se a camada é válida
-    if not camada or not isinstance(camada, QgsRasterLayer):
-        logging.error("Camada inválida ou não é uma camada raster.")
-        return None
-    
+def calcular_area_pixel(nome_camada, res_x, res_y):
     # Verifica se a resolução foi obtida corretamente
     if res_x is None or res_y is None:
-        logging.error(f"Não foi possível obter a resolução da camada: {camada.name()}")
+        logging.error(f"Não foi possível obter a resolução da camada: {nome_camada}")
         return None
-    
+
     # Calcula a área do pixel em km²
     area_pixel_km2 = (res_x * res_y) / 1_000_000
-    
-    print(f"Resolução X: {res_x} metros/pixel, Resolução Y: {res_y} metros/pixel")
 
-    
     # Log dos valores de resolução e área por pixel
     logging.info(f"Resolução X: {res_x} metros/pixel, Resolução Y: {res_y} metros/pixel")
     logging.info(f"Área de pixel em km²: {area_pixel_km2:.6f} km²")
-    
+
     return area_pixel_km2
 
-# Configuração do logging
-configurar_logs()
-
-# Configuração do argparse para receber múltiplos caminhos de imagem
-parser = argparse.ArgumentParser(description='Calcular a área do pixel de imagens raster.')
-parser.add_argument('caminhos_imagens', type=str, nargs='+', help='Caminhos para as imagens raster')
-args = parser.parse_args()
-
-areas_pixels = []  # Lista para armazenar as áreas
-totais_pixels = []  # Lista para armazenar o total de pixels por imagem
-caminhos_output = []  # Lista para armazenar os caminhos dos arquivos raster de saída
-resultados_processamento = []  # Lista para armazenar os resultados de processamento de cada imagem
-maior_area_pixel = 0  # Para determinar a maior área entre as imagens
-areas_normalizadas = [] # Para armazenar as areas normalizadas
-histogramas = [] # Para armazenar os histogramas
-
-# Processar cada imagem fornecida
-for caminho_imagem in args.caminhos_imagens:
-    # Criar a camada raster a partir do caminho da imagem
-    camada = QgsRasterLayer(caminho_imagem, "Camada Raster")
-
-    # Verificar se a camada foi carregada corretamente
-    if not camada.isValid():
-        logging.error(f"Não foi possível carregar a camada raster a partir do caminho: {caminho_imagem}")
-        continue  # Pula para a próxima imagem
-
-    # Adicionar a camada ao projeto
-    QgsProject.instance().addMapLayer(camada)
-
-    # Obtém a resolução X e Y (em metros)
-    res_x = camada.rasterUnitsPerPixelX()
-    res_y = camada.rasterUnitsPerPixelY()
-
-    # Calcular a área de pixel da camada
-    area_pixel = calcular_area_pixel(camada, res_x, res_y)
-
-    if not area_pixel:
-        logging.error("Não foi possível calcular a área do pixel para a camada fornecida.")
-        continue  # Pula para a próxima imagem
-
-    areas_pixels.append(area_pixel)  # Adiciona à lista
-    maior_area_pixel = max(maior_area_pixel, area_pixel)  # Atualiza a maior área
-
-    # Obter dimensões da camada (MxN)
-    width = camada.width()
-    height = camada.height()
-    total_pixels = width * height
-    totais_pixels.append(total_pixels)  # Armazena o total de pixels da imagem
-
-    # Log do tamanho da imagem
-    logging.info(f"Tamanho da imagem: {width} x {height} pixels (M x N)")
-    logging.info(f"Total de pixels: {total_pixels}")
-
-    # Configurar a entrada para a Calculadora Raster
-    calc_entry = QgsRasterCalculatorEntry()
-    calc_entry.raster = camada
-    calc_entry.bandNumber = 1  # Usando a banda 1
-    calc_entry.ref = 'layer@1'
-    
-    # Calcular o histograma da banda 1
-    provider = camada.dataProvider()
-    histograma = provider.histogram(1)
-    
-    if histograma:
-        # Extrair os dados do histograma
-        valores_histograma = list(histograma.histogramVector)  # Retorna um array de valores
-        histogramas.append(valores_histograma)  # Adiciona o array de histogramas à lista
-        logging.info(f"Histograma calculado para a imagem: {caminho_imagem}")
-    else:
-        logging.error(f"Erro ao calcular o histograma da imagem: {caminho_imagem}")
-        histogramas.append(None) 
+class BackendQGIS:
+    """
+    Calcula a expressão `layer@1 * area_normalizada` com a calculadora raster do QGIS.
+    O QGIS só é importado e inicializado quando este backend é escolhido.
+    """
+
+    # Histograma de `provider.histogram(1)`: as faixas são escolhidas pelo QGIS a partir
+    # do mínimo e do máximo da banda, em qualquer tipo de dado.
+    TIPO_HISTOGRAMA = "faixas_qgis"
+
+    def __init__(self):
+        from qgis.core import QgsApplication
+        self.app = QgsApplication([], False)
+        self.app.initQgis()
+
+    def carregar(self, caminho_imagem):
+        """
+        :return: Tupla (camada, res_x, res_y, largura, altura) ou None se a camada for inválida.
+        """
+        from qgis.core import QgsRasterLayer, QgsProject
+        with instrumentacao.etapa("carregar_camada", caminho_imagem):
+            camada = QgsRasterLayer(caminho_imagem, "Camada Raster")
+        if not camada.isValid():
+            return None
+
+        # Adicionar a camada ao projeto
+        QgsProject.instance().addMapLayer(camada)
+        return camada, camada.rasterUnitsPerPixelX(), camada.rasterUnitsPerPixelY(), camada.width(), camada.height()
+
+    def calcular(self, camada, caminho_imagem, area_normalizada, caminho_saida):
+        """
+        :return: Tupla (resultado, histograma); resultado 0 indica sucesso.
+        """
+        from qgis.core import QgsCoordinateTransformContext
+        from qgis.analysis import QgsRasterCalculator, QgsRasterCalculatorEntry
+
+        # Configurar a entrada para a Calculadora Raster
+        calc_entry = QgsRasterCalculatorEntry()
+        calc_entry.raster = camada
+        calc_entry.bandNumber = 1  # Usando a banda 1
+        calc_entry.ref = 'layer@1'
+
+        # Calcular o histograma da banda 1
+        with instrumentacao.etapa("histograma", caminho_imagem):
+            histograma = camada.dataProvider().histogram(1)
+        valores_histograma = list(histograma.histogramVector) if histograma else None
+
+        expression = f"layer@1 * {area_normalizada}"
+        calc = QgsRasterCalculator(
+            expression,
+            caminho_saida,
+            "GTiff",
+            camada.extent(),  # Usar a extensão da camada
+            camada.width(),   # Usar a largura da camada
+            camada.height(),  # Usar a altura da camada
+            [calc_entry],
+            QgsCoordinateTransformContext(),
+        )
+
+        # Processar o cálculo e salvar a saída
+        with instrumentacao.etapa("calculadora_raster", caminho_imagem):
+            result = calc.processCalculation()
+        return result, valores_histograma
+
+    def calcular_lote(self, camadas, workers=1):
+        """
+        Processa as camadas em sequência (os objetos do QGIS não podem ser enviados a
+        outros processos).
+
+        :param camadas: Lista de camadas de sondar_camadas, com area_normalizada e caminho_saida.
+        :param workers: Ignorado.
+        :return: Lista de tuplas (resultado, histograma), na ordem das camadas.
+        """
+        return [self.calcular(camada["camada"], camada["caminho_imagem"], camada["area_normalizada"], camada["caminho_saida"])
+                for camada in camadas]
+
+class BackendNumPy:
+    """
+    Calcula a mesma expressão com NumPy, lendo a banda 1 em faixas e gravando um GeoTIFF
+    em tiles comprimidos; não depende do QGIS nem do GDAL.
+    """
+
+    # A posição i conta os pixels de valor i (256 posições em bandas de 8 bits, 65536 em
+    # bandas de 16 bits); bandas de ponto flutuante ou de 32 bits não têm histograma.
+    TIPO_HISTOGRAMA = "valores_inteiros"
+
+    def __init__(self, bytes_por_faixa=BYTES_POR_FAIXA_PADRAO, nivel_compressao=NIVEL_COMPRESSAO_PADRAO):
+        self.bytes_por_faixa = bytes_por_faixa
+        self.nivel_compressao = nivel_compressao
+
+    def carregar(self, caminho_imagem):
+        """
+        :return: Tupla (caminho, res_x, res_y, largura, altura) ou None se a imagem não puder ser lida.
+        """
+        from PIL import Image
+        with instrumentacao.etapa("carregar_camada", caminho_imagem):
+            try:
+                with Image.open(caminho_imagem) as imagem:
+                    largura, altura = imagem.size
+            except OSError:
+                return None
+            posicionamento = ler_geotransform(caminho_imagem)
+
+        # Sem georreferenciamento, cada pixel mede 1 unidade, como no QGIS.
+        res_x, res_y = (abs(posicionamento[0][1]), abs(posicionamento[0][5])) if posicionamento else (1.0, 1.0)
+        return caminho_imagem, res_x, res_y, largura, altura
+
+    def calcular(self, caminho, caminho_imagem, area_normalizada, caminho_saida):
+        """
+        :return: Tupla (resultado, histograma); resultado 0 indica sucesso.
+        """
+        with instrumentacao.etapa("calculadora_raster", caminho_imagem):
+            try:
+                histograma = multiplicar_raster(caminho, caminho_saida, area_normalizada, self.bytes_por_faixa,
+                                                nivel_compressao=self.nivel_compressao)
+            except (OSError, ValueError):
+                logging.exception("Erro ao gravar o raster de saída: %s", caminho_saida)
+                return 1, None
+        return 0, histograma.tolist() if histograma is not None else None
+
+    def calcular_lote(self, camadas, workers=1):
+        """
+        Processa as camadas, em paralelo se workers > 1. Cada camada é lida uma única vez:
+        o histograma sai da mesma leitura que grava o raster.
+
+        :param camadas: Lista de camadas de sondar_camadas, com area_normalizada e caminho_saida.
+        :param workers: Quantidade de processos.
+        :return: Lista de tuplas (resultado, histograma), na ordem das camadas.
+        """
+        if workers <= 1 or len(camadas) <= 1:
+            return [self.calcular(camada["camada"], camada["caminho_imagem"], camada["area_normalizada"], camada["caminho_saida"])
+                    for camada in camadas]
+
+        instrumentar = instrumentacao.ativa() and ("memoria" if instrumentacao.medindo_memoria() else "tempo")
+        saidas = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for saida, eventos in executor.map(_calcular_tarefa, [(self, camada, instrumentar) for camada in camadas]):
+                instrumentacao.incorporar(eventos)
+                saidas.append(saida)
+        return saidas
+
+    def empilhar(self, camadas, caminho_saida):
+        """
+        Grava todas as camadas em um único GeoTIFF, uma banda por camada.
+
+        :param camadas: Lista de camadas de sondar_camadas, com area_normalizada.
+        :param caminho_saida: Caminho do GeoTIFF empilhado.
+        :return: Lista de tuplas (resultado, histograma), na ordem das camadas.
+        """
+        with instrumentacao.etapa("calculadora_raster", caminho_saida):
+            try:
+                histogramas = empilhar_rasters([camada["camada"] for camada in camadas], [camada["area_normalizada"] for camada in camadas],
+                                               caminho_saida, self.bytes_por_faixa, nivel_compressao=self.nivel_compressao)
+            except (OSError, ValueError):
+                logging.exception("Erro ao gravar o raster empilhado: %s", caminho_saida)
+                return [(1, None)] * len(camadas)
+        return [(0, histograma.tolist() if histograma is not None else None) for histograma in histogramas]
+
+def sondar_camadas(caminhos_imagens, backend):
+    """
+    Primeira passada do lote: carrega cada camada e calcula a área do seu pixel, sem
+    processar os dados. Camadas inválidas são registradas no log e descartadas.
+
+    :param caminhos_imagens: Caminhos das imagens raster.
+    :param backend: BackendQGIS ou BackendNumPy.
+    :return: Lista de dicionários (indice, caminho_imagem, camada, area_pixel, largura, altura).
+    """
+    camadas = []
+    for indice, caminho_imagem in enumerate(caminhos_imagens):
+        # Criar a camada raster a partir do caminho da imagem
+        carregada = backend.carregar(caminho_imagem)
 
-    # Normalização da área do pixel
-    area_normalizada = area_pixel / maior_area_pixel
-    areas_normalizadas.append(area_normalizada)
+        # Verificar se a camada foi carregada corretamente
+        if carregada is None:
+            logging.error(f"Não foi possível carregar a camada raster a partir do caminho: {caminho_imagem}")
+            continue  # Pula para a próxima imagem
+        camada, res_x, res_y, width, height = carregada
+
+        # Calcular a área de pixel da camada
+        area_pixel = calcular_area_pixel(caminho_imagem, res_x, res_y)
+
+        if not area_pixel:
+            logging.error("Não foi possível calcular a área do pixel para a camada fornecida.")
+            continue  # Pula para a próxima imagem
+
+        # Log do tamanho da imagem
+        logging.info(f"Tamanho da imagem: {width} x {height} pixels (M x N)")
+        logging.info(f"Total de pixels: {width * height}")
+
+        camadas.append({"indice": indice, "caminho_imagem": caminho_imagem, "camada": camada,
+                         "area_pixel": area_pixel, "largura": width, "altura": height})
+    return camadas
+
+def nome_saida(indice, caminho_imagem, diretorio_saida=DIRETORIO_SAIDA_PADRAO):
+    """
+    Caminho do raster de saída de uma imagem. O nome depende apenas da posição da imagem
+    no lote e do nome do arquivo, de modo que é o mesmo a cada execução e não colide com
+    o de outra imagem do lote, mesmo que tenham o mesmo nome em diretórios diferentes.
+
+    :param indice: Posição da imagem na lista de entrada.
+    :param caminho_imagem: Caminho da imagem de entrada.
+    :param diretorio_saida: Diretório dos rasters de saída.
+    :return: Caminho do raster de saída.
+    """
+    nome = os.path.splitext(os.path.basename(caminho_imagem))[0]
+    return os.path.join(diretorio_saida, f"{indice:04d}_{nome}_normalizado.tif")
+
+def processar(caminhos_imagens, backend, diretorio_saida=DIRETORIO_SAIDA_PADRAO, workers=1, empilhar=None):
+    """
+    Multiplica a banda 1 de cada imagem pela área normalizada do seu pixel e grava o
+    raster resultante. A resolução de todas as camadas é lida antes do processamento,
+    de modo que a normalização usa a maior área do lote inteiro e o resultado não
+    depende da ordem das imagens.
+
+    :param caminhos_imagens: Caminhos das imagens raster.
+    :param backend: BackendQGIS ou BackendNumPy.
+    :param diretorio_saida: Diretório dos rasters de saída.
+    :param workers: Quantidade de processos usados pelo backend numpy.
+    :param empilhar: Caminho opcional de um raster com uma banda por camada: .vrt (qualquer
+        backend; referencia os rasters individuais) ou .tif (backend numpy; grava apenas o
+        GeoTIFF empilhado).
+    :return: Dicionário com os resultados de todas as imagens.
+    """
+    with instrumentacao.etapa("sondar_camadas"):
+        camadas = sondar_camadas(caminhos_imagens, backend)
+
+    # Maior área de pixel do lote inteiro (e não apenas das camadas já processadas)
+    maior_area_pixel = max((camada["area_pixel"] for camada in camadas), default=0)
+    for camada in camadas:
+        camada["area_normalizada"] = camada["area_pixel"] / maior_area_pixel
+        camada["caminho_saida"] = nome_saida(camada["indice"], camada["caminho_imagem"], diretorio_saida)
 
     # Definir a expressão para multiplicar os valores de cinza pela área normalizada
-    expression = f"layer@1 * {area_normalizada}"
-
-    # Log da expressão a ser utilizada
-    logging.info(f"Expressão usada na calculadora raster: {expression}")
-
-    # Configurar e rodar a Calculadora Raster
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_path = f"./Resultados/Rasters/output_{timestamp}.tif"
-    calc = QgsRasterCalculator(
-        expression, 
-        output_path, 
-        "GTiff", 
-        camada.extent(),  # Usar a extensão da camada
-        width,   # Usar a largura da camada
-        height,  # Usar a altura da camada
-        [calc_entry],
-        QgsCoordinateTransformContext(),
-    )
+    for camada in camadas:
+        logging.info(f"Expressão usada na calculadora raster para {camada['caminho_imagem']}: layer@1 * {camada['area_normalizada']}")
+
+    os.makedirs(diretorio_saida, exist_ok=True)
+    empilhar_geotiff = empilhar is not None and not empilhar.lower().endswith(".vrt")
+    if not camadas:
+        saidas = []
+    elif empilhar_geotiff:
+        saidas = backend.empilhar(camadas, empilhar)
+    else:
+        saidas = backend.calcular_lote(camadas, workers)
+
+    caminhos_output = []  # Lista para armazenar os caminhos dos arquivos raster de saída
+    resultados_processamento = []  # Lista para armazenar os resultados de processamento de cada imagem
+    histogramas = [] # Para armazenar os histogramas
+    for camada, (result, valores_histograma) in zip(camadas, saidas):
+        resultados_processamento.append(result)  # Adiciona o resultado do processamento
+
+        if valores_histograma is not None:
+            histogramas.append(valores_histograma)  # Adiciona o array de histogramas à lista
+            logging.info(f"Histograma calculado para a imagem: {camada['caminho_imagem']}")
+        elif result == 0:
+            logging.info(f"Histograma não calculado para a imagem (tipo de dado sem histograma {backend.TIPO_HISTOGRAMA}): {camada['caminho_imagem']}")
+            histogramas.append(None)
+        else:
+            logging.error(f"Erro ao calcular o histograma da imagem: {camada['caminho_imagem']}")
+            histogramas.append(None)
 
-    # Processar o cálculo e salvar a saída
-    result = calc.processCalculation()
-    resultados_processamento.append(result)  # Adiciona o resultado do processamento
+        # Verificar se o cálculo foi bem-sucedido
+        caminho_saida = empilhar if empilhar_geotiff else camada["caminho_saida"]
+        if result == 0:  # 0 indica sucesso
+            logging.info("Processamento bem-sucedido. Raster salvo em: %s", caminho_saida)
+            caminhos_output.append(caminho_saida)  # Adiciona o caminho do arquivo raster de saída
+        else:
+            logging.error("Erro ao processar a Calculadora Raster.")
+            caminhos_output.append(None)  # Adiciona None caso haja erro
 
-    # Verificar se o cálculo foi bem-sucedido
-    if result == 0:  # 0 indica sucesso
-        logging.info("Processamento bem-sucedido. Raster salvo em: %s", output_path)
-        caminhos_output.append(output_path)  # Adiciona o caminho do arquivo raster de saída
+    # Criar um dicionário com os resultados
+    resultado = {
+        "status": "processamento concluído",
+        "maior_area_pixel_km2": maior_area_pixel,
+        "areas_pixel_km2": [camada["area_pixel"] for camada in camadas],
+        "totais_pixels": [camada["largura"] * camada["altura"] for camada in camadas],
+        "caminhos_output": caminhos_output,
+        "resultados_processamento": resultados_processamento,
+        "areas_normalizadas": [camada["area_normalizada"] for camada in camadas],
+        "histogramas": histogramas,
+        "tipo_histograma": backend.TIPO_HISTOGRAMA
+    }
+    if empilhar is not None:
+        resultado["caminho_empilhado"] = empilhar if empilhar_geotiff else _gravar_vrt(empilhar, camadas, caminhos_output)
+    return resultado
+
+def _gravar_vrt(caminho_vrt, camadas, caminhos_output):
+    """
+    Grava o VRT que empilha os rasters de saída gravados com sucesso.
+
+    :return: Caminho do VRT, ou None se os rasters não puderem ser empilhados.
+    """
+    gravadas = [(camada, caminho) for camada, caminho in zip(camadas, caminhos_output) if caminho is not None]
+    if not gravadas:
+        return None
+    dimensoes = {(camada["largura"], camada["altura"]) for camada, _ in gravadas}
+    if len(dimensoes) > 1:
+        logging.error("As camadas têm dimensões diferentes (%s); o VRT não foi gravado.", sorted(dimensoes))
+        return None
+    largura, altura = dimensoes.pop()
+    posicionamento = ler_geotransform(gravadas[0][1])
+    escrever_vrt(caminho_vrt, [caminho for _, caminho in gravadas], altura, largura, posicionamento[0] if posicionamento else None)
+    return caminho_vrt
+
+def _calcular_tarefa(tarefa):
+    """
+    Executa multiplicar_raster em um processo do pool, medindo as etapas se a
+    instrumentação estiver ativa no processo principal.
+
+    :return: Tupla ((resultado, histograma), eventos).
+    """
+    backend, camada, instrumentar = tarefa
+    if instrumentar:
+        instrumentacao.ativar(medir_memoria=instrumentar == "memoria")
+    saida = backend.calcular(camada["camada"], camada["caminho_imagem"], camada["area_normalizada"], camada["caminho_saida"])
+    return saida, instrumentacao.desativar() if instrumentar else []
+
+if __name__ == "__main__":
+    # Configuração do argparse para receber múltiplos caminhos de imagem
+    parser = argparse.ArgumentParser(description='Calcular a área do pixel de imagens raster.')
+    parser.add_argument('caminhos_imagens', type=str, nargs='+', help='Caminhos para as imagens raster')
+    parser.add_argument('--backend', choices=BACKENDS, default='qgis', help='Implementação da calculadora raster: qgis (QgsRasterCalculator) ou numpy (leitura em faixas, sem o QGIS).')
+    parser.add_argument('--faixa_mb', type=float, default=None, help='Backend numpy: lê as imagens em faixas de até este tamanho em MB.')
+    parser.add_argument('--nivel_compressao', type=int, choices=range(1, 10), default=NIVEL_COMPRESSAO_PADRAO, help='Backend numpy: nível de compressão deflate da saída (1 = mais rápido, 9 = menor arquivo).')
+    parser.add_argument('--dir_saida', default=DIRETORIO_SAIDA_PADRAO, help='Diretório dos rasters de saída.')
+    parser.add_argument('--workers', type=int, default=1, help='Backend numpy: quantidade de processos usados para processar as camadas em paralelo.')
+    parser.add_argument('--empilhar', '--stack', default=None, help='Grava também um raster com uma banda por camada: .vrt (referencia os rasters de cada camada) ou .tif (backend numpy; um único GeoTIFF).')
+    parser.add_argument('--trace', default=None, help='Mede cada etapa por imagem e grava as medidas neste arquivo, no formato Trace Event do Chrome.')
+    parser.add_argument('--resumo_etapas', action='store_true', help='Mede cada etapa e imprime um resumo por etapa na saída de erro.')
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers deve ser pelo menos 1.")
+    if args.backend == 'qgis' and args.workers > 1:
+        parser.error("--workers só é suportado com --backend numpy.")
+    if args.backend == 'qgis' and args.empilhar and not args.empilhar.lower().endswith('.vrt'):
+        parser.error("Com --backend qgis, --empilhar aceita apenas um arquivo .vrt.")
+
+    # Configuração do logging
+    configurar_logs()
+
+    if args.trace or args.resumo_etapas:
+        instrumentacao.ativar()
+
+    if args.backend == 'qgis':
+        backend = BackendQGIS()
     else:
-        logging.error("Erro ao processar a Calculadora Raster.")
-        caminhos_output.append(None)  # Adiciona None caso haja erro
-
-# Criar um dicionário com os resultados
-print({
-    "status": "processamento concluído",
-    "maior_area_pixel_km2": maior_area_pixel,
-    "areas_pixel_km2": areas_pixels,
-    "totais_pixels": totais_pixels,
-    "caminhos_output": caminhos_output,
-    "resultados_processamento": resultados_processamento,
-    "areas_normalizadas": areas_normalizadas,
-    "histogramas": histogramas
-})
+        backend = BackendNumPy(int(args.faixa_mb * 1024 * 1024) if args.faixa_mb else BYTES_POR_FAIXA_PADRAO, args.nivel_compressao)
+
+    print(processar(args.caminhos_imagens, backend, args.dir_saida, args.workers, args.empilhar))
+
+    if instrumentacao.ativa():
+        eventos = instrumentacao.desativar()
+        if args.trace:
+            instrumentacao.exportar_chrome_trace(eventos, args.trace)
+        if args.resumo_etapas:
+            print(instrumentacao.tabela_resumo(eventos), file=sys.stderr)
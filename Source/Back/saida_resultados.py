@@ -0,0 +1,134 @@
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+import numpy as np
+from conjunto_resultados import COLUNAS_ESCALARES
+
+FORMATOS_SAIDA = ("repr", "ndjson", "npz")
+
+# Colunas de texto do formato npz, gravadas uma linha por imagem durante o lote
+COLUNAS_TEXTO = ("caminho_imagem", "erro_processamento")
+
+def escrever_ndjson(resultados, arquivo):
+    """
+    Escreve um registro JSON por linha assim que cada resultado fica pronto, sem
+    acumular o lote em memória.
+
+    :param resultados: Iterável de dicionários de resultado (um por imagem).
+    :param arquivo: Arquivo de texto aberto para escrita.
+    :return: Quantidade de registros escritos.
+    """
+    quantidade = 0
+    for resultado in resultados:
+        arquivo.write(json.dumps(resultado, ensure_ascii=False))
+        arquivo.write("\n")
+        arquivo.flush()  # Entrega o registro imediatamente a quem consome a saída.
+        quantidade += 1
+    return quantidade
+
+def escrever_repr(resultados, arquivo):
+    """
+    Escreve os resultados como a representação de uma lista de dicionários (o mesmo texto
+    de print(lista)), um resultado por vez, sem acumular o lote em memória.
+
+    :param resultados: Iterável de dicionários de resultado (um por imagem).
+    :param arquivo: Arquivo de texto aberto para escrita.
+    :return: Quantidade de resultados escritos.
+    """
+    quantidade = 0
+    arquivo.write("[")
+    for resultado in resultados:
+        arquivo.write(", " + repr(resultado) if quantidade else repr(resultado))
+        quantidade += 1
+    arquivo.write("]\n")
+    return quantidade
+
+def escrever_npz(resultados, quantidade, caminho_saida, limiares=None, quantidade_niveis=256):
+    """
+    Grava os resultados em um arquivo .npz colunar com o mesmo esquema de
+    ConjuntoResultados.salvar: os histogramas como uma única matriz int64 (N, níveis), cada
+    campo escalar como um vetor e a coluna possui_erro. As colunas numéricas são preenchidas
+    em arquivos mapeados em memória e as de texto em arquivos de linhas, à medida que os
+    resultados chegam, e depois reunidas no .npz, sem manter o lote inteiro em memória.
+
+    :param resultados: Iterável de dicionários de resultado, na ordem das imagens.
+    :param quantidade: Quantidade de imagens do lote (N).
+    :param caminho_saida: Caminho do arquivo .npz a ser gravado.
+    :param limiares: Lista de limiares avaliados; com mais de um, a varredura também é gravada.
+    :param quantidade_niveis: Posições de cada histograma.
+    :return: Quantidade de registros escritos.
+    """
+    diretorio_temporario = tempfile.mkdtemp(prefix="pixerizador_npz_")
+    textos = {}
+    try:
+        larguras = dict.fromkeys(COLUNAS_TEXTO, 1)
+        for nome in COLUNAS_TEXTO:
+            textos[nome] = open(os.path.join(diretorio_temporario, nome + ".txt"), "w", encoding="utf-8")
+        colunas = {
+            "possui_erro": _criar_coluna(diretorio_temporario, "possui_erro", np.bool_, (quantidade,)),
+            "histogramas": _criar_coluna(diretorio_temporario, "histogramas", np.int64, (quantidade, quantidade_niveis))
+        }
+        for nome, (tipo, ausente) in COLUNAS_ESCALARES.items():
+            colunas[nome] = _criar_coluna(diretorio_temporario, nome, tipo, (quantidade,), ausente)
+
+        varredura = limiares is not None and len(limiares) > 1
+        if varredura:
+            colunas["varredura_soma_ponderada"] = _criar_coluna(diretorio_temporario, "varredura_soma_ponderada", np.float64, (quantidade, len(limiares)), np.nan)
+            colunas["varredura_contagem_pixels_claros"] = _criar_coluna(diretorio_temporario, "varredura_contagem_pixels_claros", np.int64, (quantidade, len(limiares)), -1)
+
+        escritos = 0
+        for indice, resultado in enumerate(resultados):
+            for nome in COLUNAS_TEXTO:
+                texto = str(resultado[nome] or "")
+                textos[nome].write(json.dumps(texto, ensure_ascii=False) + "\n")  # Uma linha por imagem, mesmo com quebras no texto.
+                larguras[nome] = max(larguras[nome], len(texto))
+            colunas["possui_erro"][indice] = resultado["erro_processamento"] is not None
+            if resultado["histograma"] is not None:
+                colunas["histogramas"][indice] = resultado["histograma"]
+            for nome in COLUNAS_ESCALARES:
+                if resultado[nome] is not None:
+                    colunas[nome][indice] = resultado[nome]
+            if varredura and resultado.get("varredura_limiares"):
+                colunas["varredura_soma_ponderada"][indice] = [item["soma_ponderada"] for item in resultado["varredura_limiares"]]
+                colunas["varredura_contagem_pixels_claros"][indice] = [item["contagem_pixels_claros"] for item in resultado["varredura_limiares"]]
+            escritos += 1
+
+        for nome in COLUNAS_TEXTO:
+            textos.pop(nome).close()
+            colunas[nome] = _converter_texto(diretorio_temporario, nome, larguras[nome], quantidade)
+
+        with zipfile.ZipFile(caminho_saida, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as arquivo_npz:
+            for nome in COLUNAS_TEXTO + tuple(nome for nome in colunas if nome not in COLUNAS_TEXTO):
+                colunas[nome].flush()
+                arquivo_npz.write(os.path.join(diretorio_temporario, nome + ".npy"), nome + ".npy")
+            if varredura:
+                arquivo_npz.writestr("limiares.npy", _bytes_npy(np.asarray(limiares, dtype=np.int64)))
+        colunas.clear()
+        return escritos
+    finally:
+        for arquivo in textos.values():
+            arquivo.close()
+        shutil.rmtree(diretorio_temporario, ignore_errors=True)
+
+def _criar_coluna(diretorio, nome, tipo, forma, ausente=None):
+    coluna = np.lib.format.open_memmap(os.path.join(diretorio, nome + ".npy"), mode="w+", dtype=tipo, shape=forma)
+    if ausente is not None:
+        coluna[:] = ausente
+    return coluna
+
+def _converter_texto(diretorio, nome, largura, quantidade):
+    # Com a largura do maior texto já conhecida, copia as linhas para um vetor "<U" mapeado
+    # em memória, uma por vez.
+    coluna = _criar_coluna(diretorio, nome, "<U%d" % largura, (quantidade,))
+    with open(os.path.join(diretorio, nome + ".txt"), encoding="utf-8") as arquivo:
+        for indice, linha in enumerate(arquivo):
+            coluna[indice] = json.loads(linha)
+    return coluna
+
+def _bytes_npy(array):
+    with tempfile.TemporaryFile() as arquivo:
+        np.save(arquivo, array)
+        arquivo.seek(0)
+        return arquivo.read()
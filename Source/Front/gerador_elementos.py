@@ -3,60 +3,90 @@ import numpy as np
 import tkinter as tk
 from PIL import Image, ImageTk  # Necessário para manipulação de imagens
 import os
-from Back import estimador_area
+from Back import estimador_area, graficos
+from Back.entradas_lote import ler_manifesto, varrer_diretorio, colunas_lote
+from Back.miniaturas import ServicoMiniaturas
 from tkinter import filedialog, messagebox
 from Back.logger import logging
 
-def renderizar_graficos(lista_de_valores, num_barras, caminhos_imagens, titulo_grafico, titulo_metrica, cores = None):
-    plt.figure(figsize=(20, 10)) 
-    
-    # Define os ticks do eixo y
-    maior_valor = max(0, max(lista_de_valores))
-    ypassos = maior_valor / 20
-    plt.yticks(np.arange(0, maior_valor + ypassos, ypassos))
-    
-    # Gera cores distintas
-    if cores is None:
-        cores =  plt.cm.viridis(np.linspace(0, 1, num_barras))  # Use uma colormap diferente, como 'viridis'
-    
-    barras = plt.bar(caminhos_imagens, lista_de_valores, color=cores)
-    
-    # Adiciona linhas de traçado
-    for barra in barras:
-        # plt.axhline(y=barra.get_height(), color='red', linestyle='-', alpha=0.2)
-        
-        # Adiciona o valor dentro da barra
-        plt.text(
-            barra.get_x() + barra.get_width() / 2,  # Posição X (centro da barra)
-            barra.get_height() / 2,                  # Posição Y (metade da altura da barra)
-            f'{barra.get_height():.2f}',             # Formata o valor com duas casas decimais
-            ha='center',                              # Alinha horizontalmente ao centro
-            va='center',                              # Alinha verticalmente ao centro
-            color='black'                            # Cor do texto (branco)
-        )
-        
-    plt.title(titulo_grafico)
-    plt.ylabel(titulo_metrica)
-    plt.xticks(rotation=45, ha='right')  # Rotaciona os rótulos do eixo x
-    plt.tight_layout()  # Ajusta o layout
+INTERVALO_ENTREGA_MS = 50  # Intervalo com que a interface recebe as miniaturas prontas.
+COR_MARCADOR = 220  # Cinza do marcador exibido enquanto a miniatura é gerada.
+
+# Miniaturas decodificadas fora da thread da interface, com cache em disco
+servico_miniaturas = ServicoMiniaturas()
+_entrega_ativa = [False]
+
+def _entregar_miniaturas(raiz):
+    servico_miniaturas.entregar_prontas()
+    raiz.after(INTERVALO_ENTREGA_MS, _entregar_miniaturas, raiz)
+
+def exibir_miniatura(label, caminho, tamanho):
+    """
+    Exibe um marcador no rótulo e pede a miniatura ao serviço; quando ela fica pronta,
+    o rótulo é atualizado pelo laço de eventos do Tk, sem bloquear a interface.
+
+    Args:
+        label (tk.Label): Rótulo que exibirá a miniatura.
+        caminho (str): Caminho da imagem.
+        tamanho (tuple): Largura e altura máximas da miniatura.
+    """
+    marcador = ImageTk.PhotoImage(Image.new("L", tamanho, COR_MARCADOR))
+    label.configure(image=marcador)
+    label.image = marcador  # Mantém a referência da imagem
+
+    def ao_concluir(imagem, erro):
+        if not label.winfo_exists():
+            return  # A janela foi fechada antes de a miniatura ficar pronta.
+        if erro is not None:
+            logging.warning("Não foi possível gerar a miniatura de %s: %s", caminho, erro)
+            label.configure(image="", text="Sem pré-visualização")
+            label.image = None
+            return
+        img_tk = ImageTk.PhotoImage(imagem)
+        label.configure(image=img_tk)
+        label.image = img_tk  # Mantém a referência da imagem
+
+    servico_miniaturas.solicitar(caminho, tamanho, ao_concluir)
+    _iniciar_entrega(label)
+
+def _iniciar_entrega(widget):
+    if not _entrega_ativa[0]:
+        _entrega_ativa[0] = True
+        _entregar_miniaturas(widget.nametowidget("."))
+
+def _figura_reutilizavel(titulo, tamanho):
+    """
+    Retorna a janela do gráfico com este título, criando-a apenas na primeira vez; os
+    cliques seguintes redesenham a mesma figura em vez de abrir uma nova.
+    """
+    return plt.figure(num=titulo, figsize=tamanho)
+
+def _exibir(figura):
+    figura.canvas.draw_idle()
     plt.show()
 
+def renderizar_graficos(lista_de_valores, num_barras, caminhos_imagens, titulo_grafico, titulo_metrica, cores = None):
+    """
+    Exibe um gráfico de barras com um valor por imagem. Com mais de graficos.LIMITE_BARRAS
+    imagens, as maiores aparecem individualmente e as demais são agrupadas em "Outras".
+
+    Args:
+        lista_de_valores (array): Valor de cada imagem.
+        num_barras (int): Quantidade de imagens (mantido por compatibilidade).
+        caminhos_imagens (array): Rótulo de cada barra.
+        titulo_grafico (str): Título do gráfico.
+        titulo_metrica (str): Rótulo do eixo y.
+        cores: Ignorado; as cores seguem o colormap viridis (mantido por compatibilidade).
+    """
+    figura = _figura_reutilizavel(titulo_grafico, graficos.RenderizadorGraficos.TAMANHOS["barras"])
+    graficos.desenhar_barras(figura, lista_de_valores, [str(caminho) for caminho in caminhos_imagens], titulo_grafico, titulo_metrica)
+    _exibir(figura)
+
 # Função para criar uma nova janela para o histograma
 def mostrar_histogramas(histogramas, caminhos_imagens):
-    plt.figure(figsize=(10, 5))
-    histogramo_agregado = [0] * 256
-
-    # Soma os histogramas
-    for histograma in histogramas:
-        histogramo_agregado = [x + y for x, y in zip(histogramo_agregado, histograma)]
-
-    plt.bar(range(256), histogramo_agregado, color='gray', alpha=0.7)
-    plt.title('Histograma Agregado de Intensidades')
-    plt.xlabel('Intensidade do Pixel')
-    plt.ylabel('Frequência Total')
-    plt.xlim([0, 255])
-    plt.tight_layout()
-    plt.show()
+    figura = _figura_reutilizavel("Histograma Agregado de Intensidades", graficos.RenderizadorGraficos.TAMANHOS["histograma"])
+    graficos.desenhar_histograma(figura, np.asarray(histogramas).sum(axis=0))  # Soma os histogramas (matriz N x níveis)
+    _exibir(figura)
 
 # Função para criar uma nova janela para a soma ponderada
 def mostrar_soma_ponderada(somas_ponderadas, caminhos_imagens):
@@ -87,13 +117,9 @@ def pedir_dimensao_imagem(caminho):
     
     dimensao_resultado = [None] # Para capturar o resultado
     
-    # Carrega e exibe a imagem
-    img = Image.open(caminho)
-    img.thumbnail((300, 300))  # Tamanho máximo da pré-visualização
-    img_tk = ImageTk.PhotoImage(img)
-    
-    label_imagem = tk.Label(dialogo, image=img_tk)
-    label_imagem.image = img_tk  # Mantém a referência da imagem
+    # Exibe a pré-visualização assim que ela for gerada
+    label_imagem = tk.Label(dialogo)
+    exibir_miniatura(label_imagem, caminho, (300, 300))  # Tamanho máximo da pré-visualização
     label_imagem.pack()
 
     # Campo de entrada para a dimensão
@@ -102,7 +128,19 @@ def pedir_dimensao_imagem(caminho):
     entry_dimensao = tk.Entry(dialogo)
     entry_dimensao.pack(pady=5)
     
-    entry_dimensao.insert(0, estimador_area.estimar_area(caminho, 1, 1))
+
+    # A estimativa decodifica a imagem inteira: é feita no pool do serviço de miniaturas e
+    # preenche o campo quando fica pronta, sem substituir um valor já digitado.
+    def ao_estimar(area, erro):
+        if not entry_dimensao.winfo_exists():
+            return
+        if erro is not None:
+            logging.warning("Não foi possível estimar a área de %s: %s", caminho, erro)
+        elif area is not None and not entry_dimensao.get():
+            entry_dimensao.insert(0, area)
+
+    servico_miniaturas.executar(estimador_area.estimar_area, ao_estimar, caminho, 1, 1)
+    _iniciar_entrega(entry_dimensao)
 
     # Função para fechar o diálogo e retornar o valor
     def confirmar():
@@ -135,6 +173,7 @@ def seletor_de_imagens():
             ("JPEG", "*.jpeg"),
             ("BMP", "*.bmp"),
             ("GIF", "*.gif"),
+            ("NumPy", "*.npy"),
             ("Todas as Imagens", "*.*")
         ]
     )
@@ -156,23 +195,64 @@ def seletor_de_imagens():
     
     return caminhos_imagens, dimensoes
 
+def seletor_de_manifesto():
+    """
+    Abre um manifesto de lote (CSV ou NDJSON com caminho, área e limiar opcionais), sem
+    pedir a área de cada imagem.
+
+    Returns:
+        tuple: (caminhos, áreas em km², limiares por imagem ou None), ou (None, None, None)
+        se nenhum manifesto válido for escolhido.
+    """
+    caminho_manifesto = filedialog.askopenfilename(
+        title="Abrir manifesto",
+        filetypes=[
+            ("CSV", "*.csv"),
+            ("NDJSON", "*.ndjson *.jsonl *.json"),
+            ("Todos os arquivos", "*.*")
+        ]
+    )
+    if not caminho_manifesto:
+        return None, None, None
+    return _ler_entradas_lote(lambda: ler_manifesto(caminho_manifesto), caminho_manifesto)
+
+def seletor_de_diretorio():
+    """
+    Seleciona todas as imagens de um diretório. As áreas vêm dos nomes dos arquivos
+    (area_km2_<valor>) ou são estimadas durante o processamento.
+
+    Returns:
+        tuple: (caminhos, áreas em km² ou None, None), ou (None, None, None) se nenhum
+        diretório com imagens for escolhido.
+    """
+    diretorio = filedialog.askdirectory(title="Selecionar diretório de imagens")
+    if not diretorio:
+        return None, None, None
+    return _ler_entradas_lote(lambda: varrer_diretorio(diretorio), diretorio)
+
+def _ler_entradas_lote(ler_entradas, origem):
+    try:
+        caminhos_imagens, dimensoes, limiares = colunas_lote(ler_entradas())
+    except (OSError, ValueError) as e:
+        messagebox.showerror("Erro", f"Não foi possível ler {origem}:\n{e}")
+        return None, None, None
+    if not caminhos_imagens:
+        messagebox.showinfo("Informação", f"Nenhuma imagem encontrada em {origem}.")
+        return None, None, None
+
+    logging.debug("%d imagens lidas de %s.", len(caminhos_imagens), origem)
+    return caminhos_imagens, dimensoes, limiares
+
 def mostrar_percentual_consumo_energia(somas_ponderadas, caminhos_imagens):
     """
     Gera um gráfico de pizza exibindo o percentual de consumo de energia
     para cada imagem processada.
     
     Args:
-        somas_ponderadas (list): Lista das somas ponderadas de cada imagem.
-        caminhos_imagens (list): Lista dos caminhos das imagens correspondentes.
+        somas_ponderadas (array): Somas ponderadas (ou seus percentuais) de cada imagem.
+        caminhos_imagens (array): Caminhos das imagens correspondentes.
     """
 
-    # Define os rótulos e os valores
-    rótulos = [os.path.basename(caminho) for caminho in caminhos_imagens]
-    valores = somas_ponderadas
-
-    # Cria o gráfico de pizza
-    plt.figure(figsize=(8, 8))
-    plt.pie(valores, labels=rótulos, autopct='%1.1f%%', startangle=140)
-    plt.title("Percentual de Consumo de Energia por Imagem")
-    plt.axis('equal')  # Para garantir que o gráfico seja circular
-    plt.show()
\ No newline at end of file
+    figura = _figura_reutilizavel("Percentual de Consumo de Energia por Imagem", graficos.RenderizadorGraficos.TAMANHOS["pizza"])
+    graficos.desenhar_pizza(figura, somas_ponderadas, [os.path.basename(caminho) for caminho in caminhos_imagens])
+    _exibir(figura)
@@ -1,64 +1,106 @@
 import tkinter as tk
-from PIL import Image, ImageTk  # Necessário para manipulação de imagens
+from tkinter import ttk
 import os
-import subprocess
-import json
-from Back.logger import logging
+from Back.logger import logging, resumir_resultados
+from Back import motor
 import Front.gerador_elementos as el
 
+INTERVALO_ACOMPANHAMENTO_MS = 100  # Intervalo com que a interface lê o andamento do lote.
+LIMITE_MINIATURAS = 50  # Lotes maiores (manifestos, diretórios) exibem apenas as primeiras miniaturas.
+
 # Função principal da interface
-def criar_interface(resultados, root, frame_preview):
-    somas_ponderadas = []
-    caminhos_imagens = []
-    areas_por_pixel = []
-    areas_normalizadas = []
-    histogramas = []
+def criar_interface(tarefa, root, frame_preview):
+    resultados_validos = [None]  # ConjuntoResultados das imagens processadas sem erro.
     
     def extrai_resultados(novos_resultados):
-        if (novos_resultados):
-            somas_ponderadas.clear()
-            caminhos_imagens.clear()
-            areas_por_pixel.clear()
-            areas_normalizadas.clear()
-            histogramas.clear()
-            for resultado in novos_resultados:
-                somas_ponderadas.append(resultado['soma_ponderada'])
-                caminhos_imagens.append(resultado['caminho_imagem'])
-                areas_por_pixel.append(resultado['area_por_pixel'])
-                areas_normalizadas.append(resultado['area_normalizada'])
-                histogramas.append(resultado['histograma'])
+        if novos_resultados is not None and len(novos_resultados):
+            resultados_validos[0] = novos_resultados[novos_resultados.validos]
     
-    def selecionar_outras_imagens():
-        novos_resultados = selecionar_outras_imagens_e_prever(frame_preview)
-        extrai_resultados(novos_resultados)
+    def acompanhar(tarefa_atual):
+        """
+        Lê os eventos do lote sem bloquear e atualiza a barra de progresso e os
+        resultados disponíveis para os botões; reagenda a si mesma até o fim do lote.
+        """
+        if tarefa_atual is not tarefa_ativa[0]:
+            return  # Lote substituído por uma nova seleção; seus eventos não valem mais.
+        for evento in tarefa_atual.eventos_pendentes():
+            if evento.resultados is not None:
+                extrai_resultados(evento.resultados)
+            barra_progresso.configure(maximum=max(evento.total, 1), value=evento.concluidas)
+            if evento.tipo == "progresso":
+                texto_status.set(f"Processando: {evento.concluidas} de {evento.total} imagens")
+            elif evento.tipo == "erro":
+                texto_status.set("Erro ao processar as imagens.")
+                logging.error(f"Exceção ao processar as imagens: {tarefa_atual.requisicao.imagens}\n{evento.erro}")
+            else:
+                registrar_resultados(evento.resultados)
+                texto_status.set(("Cancelado: " if evento.tipo == "cancelado" else "Concluído: ") + f"{len(evento.resultados)} imagens processadas")
+        if tarefa_atual.concluida and tarefa_atual.eventos.empty():
+            botao_cancelar.configure(state=tk.DISABLED)
+        else:
+            root.after(INTERVALO_ACOMPANHAMENTO_MS, acompanhar, tarefa_atual)
+
+    def iniciar_acompanhamento(nova_tarefa):
+        if nova_tarefa is None:
+            return
+        tarefa_ativa[0] = nova_tarefa
+        texto_status.set("Processando...")
+        botao_cancelar.configure(state=tk.NORMAL)
+        acompanhar(nova_tarefa)
+
+    def selecionar_outras_imagens(seletor=None):
+        nova_tarefa = selecionar_outras_imagens_e_prever(frame_preview, seletor)
+        if nova_tarefa is not None and tarefa_ativa[0] is not None:
+            tarefa_ativa[0].cancelar()  # O novo lote começa quando o anterior parar.
+        iniciar_acompanhamento(nova_tarefa)
+
+    def cancelar():
+        if tarefa_ativa[0] is not None:
+            tarefa_ativa[0].cancelar()
+            texto_status.set("Cancelando após a imagem em andamento...")
             
     def on_soma_ponderada():
-        if somas_ponderadas:
-            el.mostrar_soma_ponderada(somas_ponderadas, caminhos_imagens)
+        conjunto = resultados_validos[0]
+        if conjunto is not None and len(conjunto):
+            el.mostrar_soma_ponderada(conjunto.soma_ponderada, conjunto.caminhos)
     
     def on_histograma():
-        if histogramas:
-            el.mostrar_histogramas(histogramas, caminhos_imagens)
+        conjunto = resultados_validos[0]
+        if conjunto is not None and len(conjunto):
+            el.mostrar_histogramas(conjunto.histogramas, conjunto.caminhos)
 
     def on_area_por_pixel():
-        if areas_por_pixel:
-            el.mostrar_areas_por_pixel(areas_por_pixel, caminhos_imagens)
+        conjunto = resultados_validos[0]
+        if conjunto is not None and len(conjunto):
+            el.mostrar_areas_por_pixel(conjunto.area_por_pixel, conjunto.caminhos)
 
     def on_area_normalizada():
-        if areas_normalizadas:
-            el.mostrar_areas_normalizadas(areas_normalizadas, caminhos_imagens)
+        conjunto = resultados_validos[0]
+        if conjunto is not None and len(conjunto):
+            el.mostrar_areas_normalizadas(conjunto.area_normalizada, conjunto.caminhos)
             
     def percentual_consumo_energia():
-        if somas_ponderadas:
-            el.mostrar_percentual_consumo_energia(somas_ponderadas, caminhos_imagens)
+        conjunto = resultados_validos[0]
+        if conjunto is not None and len(conjunto):
+            el.mostrar_percentual_consumo_energia(conjunto.percentuais(), conjunto.caminhos)
             
-    extrai_resultados(resultados)
+    tarefa_ativa = [None]
 
     # Remova a criação de uma nova instância de Tk
     root.title("Projeto PixelAreaNormalizer")
     
     # Adiciona botão para carregar imagens
-    tk.Button(root, text="Selecionar imagens", command=lambda: selecionar_outras_imagens()).pack(pady=20)
+    tk.Button(root, text="Selecionar imagens", command=lambda: selecionar_outras_imagens()).pack(pady=(20, 5))
+    tk.Button(root, text="Abrir manifesto", command=lambda: selecionar_outras_imagens(el.seletor_de_manifesto)).pack(pady=5)
+    tk.Button(root, text="Selecionar diretório", command=lambda: selecionar_outras_imagens(el.seletor_de_diretorio)).pack(pady=(5, 20))
+
+    # Andamento do lote em processamento
+    texto_status = tk.StringVar(value="")
+    barra_progresso = ttk.Progressbar(root, length=400, mode="determinate")
+    barra_progresso.pack(pady=5)
+    tk.Label(root, textvariable=texto_status).pack()
+    botao_cancelar = tk.Button(root, text="Cancelar processamento", command=cancelar, state=tk.DISABLED)
+    botao_cancelar.pack(pady=5)
     
     # Adiciona um separador com Canvas
     separator = tk.Canvas(root, height=2, bg="black")  # Define a altura e a cor da linha
@@ -79,76 +121,25 @@ def criar_interface(resultados, root, frame_preview):
     tk.Button(root, text="Sair", command=root.destroy).pack(pady=20)
 
     root.deiconify()  # Mostra a janela principal
+    iniciar_acompanhamento(tarefa)
 
     root.mainloop()
     
-def gerar_comando_consulta(caminhos_imagens, dimensoes):
-    """
-    Esta função gera um comando de consulta com base nos caminhos das imagens e dimensões fornecidos.
-    
-    Args:
-        caminhos_imagens (list): Lista de caminhos das imagens.
-        dimensoes (list): Lista de dimensões das áreas em quilômetros.
-        
-    Returns:
-        str: Comando de consulta formatado para ser executado.
-    """
-    imagens_str = ' '.join(caminhos_imagens)
-    dimensoes_str = ' '.join(map(str, dimensoes))
-    
-    return f"python3 ./Source/Back/pixerizador.py --imagens {imagens_str} --areas_km {dimensoes_str}"
-    
-# Recupera resultados com base em caminhos e dimensões da imagem
-def obter_resultados(caminhos_imagens, dimensoes):
-    comando = gerar_comando_consulta(caminhos_imagens, dimensoes)
-    
-    hasError = False
-    resultado = []
-    
-    try:
-        # Executa o comando e captura a saída
-        saida = subprocess.run(comando, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        logging.info(f"Saída do comando: {comando}\n{saida.stdout}")
-        resultado = saida.stdout
-        hasError = saida.stderr or not resultado    
-        
-        # Substituindo aspas simples por aspas duplas e corrigindo None para null
-        resultado = resultado.replace("None", "null").replace("'", '"')
-        
-        print(json.loads(resultado))
-        
-        # Converte a representação de string de um dicionário em um dicionário Python usando json.loads
-        resultado = json.loads(resultado)
-        
-        logging.info(f"Resultados obtidos: {resultado}")
-    except Exception as e:
-        hasError = True
-        logging.error(f"Exceção ao executar o comando: {comando}\n{e}")
-    
-    if hasError:
-        logging.error(f"Erro ao executar o comando: {comando}")
-        return []
-    
-    # return main(caminhos_imagens, dimensoes)
-    return resultado
+# Sessão com as estatísticas brutas das imagens já processadas pela interface
+sessao = motor.SessaoResultados()
 
 # Função para criar miniaturas
 def criar_miniaturas(caminhos_imagens, frame_preview):
     for widget in frame_preview.winfo_children():
         widget.destroy()  # Limpa as pré-visualizações anteriores
 
-    for caminho in caminhos_imagens:
+    for caminho in caminhos_imagens[:LIMITE_MINIATURAS]:
         # Cria um frame para agrupar a miniatura e o nome
         frame_imagem = tk.Frame(frame_preview)
 
-        # Carrega a imagem e cria uma miniatura
-        img = Image.open(caminho)
-        img.thumbnail((100, 100))  # Define o tamanho da miniatura
-        img_tk = ImageTk.PhotoImage(img)
-
-        # Cria um rótulo para a miniatura
-        label_imagem = tk.Label(frame_imagem, image=img_tk)
-        label_imagem.image = img_tk  # Mantém a referência da imagem
+        # Cria um rótulo para a miniatura, gerada em segundo plano
+        label_imagem = tk.Label(frame_imagem)
+        el.exibir_miniatura(label_imagem, caminho, (100, 100))  # Define o tamanho da miniatura
         label_imagem.pack()
 
         # Cria um rótulo para o caminho ou nome da imagem
@@ -159,12 +150,28 @@ def criar_miniaturas(caminhos_imagens, frame_preview):
         # Posiciona o frame com a miniatura e o nome
         frame_imagem.pack(side=tk.LEFT, padx=5, pady=5)
 
-# Função para selecionar imagens e exibir miniaturas
-def selecionar_outras_imagens_e_prever(frame_preview):
-    caminhos_imagens, dimensoes = el.seletor_de_imagens()
+    if len(caminhos_imagens) > LIMITE_MINIATURAS:
+        tk.Label(frame_preview, text=f"+{len(caminhos_imagens) - LIMITE_MINIATURAS} imagens").pack(side=tk.LEFT, padx=5, pady=5)
+
+# Inicia o processamento em segundo plano; o andamento chega pela fila de eventos da tarefa
+def iniciar_processamento(caminhos_imagens, dimensoes, limiares=None):
+    requisicao = motor.RequisicaoProcessamento(imagens=list(caminhos_imagens), areas_km2=list(dimensoes), limiares_imagens=limiares)
+    return motor.TarefaLote(sessao, requisicao)
+
+# Registra no log o resumo dos resultados de um lote
+def registrar_resultados(resultados):
+    if logging.getLogger().isEnabledFor(logging.INFO):
+        resumo = resumir_resultados(resultados)  # Apenas o resumo; os histogramas não vão para o log.
+        logging.info("Resultados: %d imagens, %d com erro.", resumo["quantidade"], resumo["com_erro"], extra={"dados": resumo})
+
+# Função para selecionar imagens (uma a uma, por manifesto ou por diretório), exibir miniaturas e iniciar o processamento
+def selecionar_outras_imagens_e_prever(frame_preview, seletor=None):
+    limiares = None
+    if seletor is None:
+        caminhos_imagens, dimensoes = el.seletor_de_imagens()
+    else:
+        caminhos_imagens, dimensoes, limiares = seletor()
     if caminhos_imagens is not None and dimensoes is not None:
-        resultados = obter_resultados(caminhos_imagens, dimensoes)
-        logging.info("Resultados: %s", resultados)
-        if resultados:
-            criar_miniaturas([r['caminho_imagem'] for r in resultados], frame_preview)
-        return resultados
\ No newline at end of file
+        criar_miniaturas(caminhos_imagens, frame_preview)
+        return iniciar_processamento(caminhos_imagens, dimensoes, limiares)
+    return None
\ No newline at end of file
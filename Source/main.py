@@ -35,12 +35,13 @@ if __name__ == "__main__":
         frame_preview = tk.Frame(root)
         frame_preview.pack(pady=10)
         
-        resultados = main_frame.selecionar_outras_imagens_e_prever(frame_preview)
-        main_frame.criar_interface(resultados, root, frame_preview)
+        tarefa = main_frame.selecionar_outras_imagens_e_prever(frame_preview)  # Processa em segundo plano.
+        main_frame.criar_interface(tarefa, root, frame_preview)
     except Exception as e:
         raise e
         print(f"Ocorreu um erro: {e}")
     finally:
+        main_frame.el.servico_miniaturas.encerrar()
         try:
             root.destroy()  # Fecha a janela principal após a seleção
         except tk.TclError:
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os módulos de Source/Back se importam pelo nome, como quando executados diretamente.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Source", "Back"))
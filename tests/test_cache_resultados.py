@@ -0,0 +1,180 @@
+import os
+import sqlite3
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+import pytest
+
+import cache_resultados
+import estimador_area
+import pixerizador
+from cache_imagens import CacheImagens
+from cache_resultados import CacheResultados, NOME_ARQUIVO_CACHE
+from pixerizador import KERNEL_PADRAO, ParametrosKernel
+
+@pytest.fixture(autouse=True)
+def sem_estimativas_memorizadas(monkeypatch):
+    # Cada execução começa como um novo processo, sem as estimativas de área em memória.
+    monkeypatch.setattr(estimador_area, "_estimativas", OrderedDict())
+
+@pytest.fixture
+def imagens(tmp_path):
+    aleatorio = np.random.default_rng(8)
+    caminhos = []
+    for indice in range(3):
+        caminho = str(tmp_path / f"imagem_{indice}.png")
+        cv2.imwrite(caminho, aleatorio.integers(0, 256, (30 + indice, 40), dtype=np.uint8))
+        caminhos.append(caminho)
+    return caminhos
+
+def executar(imagens, areas, diretorio, **opcoes):
+    """
+    Executa um lote com um cache de resultados novo sobre o mesmo diretório, como uma
+    nova execução da linha de comando.
+
+    :return: Tupla (resultados, cache_imagens, cache_resultados).
+    """
+    cache = CacheImagens()
+    resultados_cache = CacheResultados(str(diretorio), **opcoes)
+    try:
+        resultados = pixerizador.main(imagens, areas, cache, limiar=[200, 100], cache_resultados=resultados_cache)
+    finally:
+        resultados_cache.fechar()
+    return resultados, cache, resultados_cache
+
+def test_acertos_sem_decodificar(tmp_path, imagens):
+    areas = [10.0, 20.0, 30.0]
+    primeiros, cache, resultados_cache = executar(imagens, areas, tmp_path / "cache")
+    assert (resultados_cache.acertos, resultados_cache.falhas) == (0, 3)
+    assert cache.decodificacoes == 3
+
+    segundos, cache, resultados_cache = executar(imagens, areas, tmp_path / "cache")
+    assert (resultados_cache.acertos, resultados_cache.falhas) == (3, 0)
+    assert cache.decodificacoes == 0
+    assert segundos == primeiros
+
+def test_area_estimada_guardada_com_o_histograma(tmp_path, imagens):
+    areas = [None, 20.0, None]
+    primeiros, cache, _ = executar(imagens, areas, tmp_path / "cache")
+    assert cache.decodificacoes == 3  # As estimativas reaproveitam a imagem decodificada para o histograma.
+
+    segundos, cache, resultados_cache = executar(imagens, areas, tmp_path / "cache")
+    assert resultados_cache.acertos == 3
+    assert cache.decodificacoes == 0
+    assert segundos == primeiros
+
+def test_area_estimada_acrescentada_a_entrada_existente(tmp_path, imagens):
+    executar(imagens, [10.0, 20.0, 30.0], tmp_path / "cache")
+    # A entrada existe, mas sem a área: a imagem é decodificada apenas para estimá-la.
+    _, cache, _ = executar(imagens[:1], [None], tmp_path / "cache")
+    assert cache.decodificacoes == 1
+    _, cache, resultados_cache = executar(imagens[:1], [None], tmp_path / "cache")
+    assert resultados_cache.acertos == 1
+    assert cache.decodificacoes == 0
+
+def test_arquivo_alterado_invalida_a_entrada(tmp_path, imagens):
+    areas = [10.0, 20.0, 30.0]
+    primeiros, _, _ = executar(imagens, areas, tmp_path / "cache")
+    cv2.imwrite(imagens[1], np.full((31, 40), 255, dtype=np.uint8))
+    estado = os.stat(imagens[1])
+    os.utime(imagens[1], ns=(estado.st_atime_ns, estado.st_mtime_ns + 10 ** 9))
+
+    segundos, cache, resultados_cache = executar(imagens, areas, tmp_path / "cache")
+    assert (resultados_cache.acertos, resultados_cache.falhas) == (2, 1)
+    assert cache.decodificacoes == 1
+    assert segundos[1]["contagem_pixels_claros"] == 31 * 40
+    assert segundos[1]["histograma"] != primeiros[1]["histograma"]
+
+def test_chaves_por_conteudo_e_por_kernel(tmp_path, imagens):
+    cache = CacheResultados(str(tmp_path / "cache"), por_conteudo=True)
+    copia = str(tmp_path / "copia.png")
+    with open(imagens[0], "rb") as origem, open(copia, "wb") as destino:
+        destino.write(origem.read())
+    assert cache.chave(imagens[0], KERNEL_PADRAO.chave) == cache.chave(copia, KERNEL_PADRAO.chave)
+    assert cache.chave(imagens[0], KERNEL_PADRAO.chave) != cache.chave(imagens[0], ParametrosKernel(profundidade_nativa=True).chave)
+    assert cache.chave(str(tmp_path / "inexistente.png"), KERNEL_PADRAO.chave) is None
+    cache.fechar()
+
+def test_reconstruir_ignora_as_entradas(tmp_path, imagens):
+    executar(imagens, [10.0, 20.0, 30.0], tmp_path / "cache")
+    _, cache, resultados_cache = executar(imagens, [10.0, 20.0, 30.0], tmp_path / "cache", reconstruir=True)
+    assert (resultados_cache.acertos, resultados_cache.falhas) == (0, 3)
+    assert cache.decodificacoes == 3
+
+def test_gravacao_em_bloco(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_resultados, "INTERVALO_GRAVACOES", 3)
+    cache = CacheResultados(str(tmp_path))
+    leitor = sqlite3.connect(str(tmp_path / NOME_ARQUIVO_CACHE))
+
+    def gravadas():
+        return leitor.execute("SELECT COUNT(*) FROM estatisticas").fetchone()[0]
+
+    cache.armazenar("a", 1, 2, np.arange(256), 5.0)
+    cache.armazenar("b", 1, 2, np.arange(256))
+    assert gravadas() == 0
+    entrada = cache.obter("a")  # As entradas pendentes já são encontradas.
+    assert entrada["area_estimada"] == 5.0
+    np.testing.assert_array_equal(entrada["histograma"], np.arange(256))
+    cache.armazenar("c", 1, 2, np.arange(256))
+    assert gravadas() == 3
+    cache.armazenar("d", 1, 2, np.arange(256))
+    assert gravadas() == 3
+    cache.fechar()
+    assert gravadas() == 4
+    leitor.close()
+
+    cache = CacheResultados(str(tmp_path))
+    assert cache.obter("b")["area_estimada"] is None
+    assert cache.consultar("x") is None and cache.obter("x") is None
+    assert (cache.acertos, cache.falhas) == (1, 1)
+    cache.fechar()
+
+def test_orcamento_descarta_as_entradas_mais_antigas(tmp_path):
+    histograma = np.zeros(256)
+    tamanho = len("a") + histograma.size * 8
+    cache = CacheResultados(str(tmp_path), orcamento_bytes=2 * tamanho)
+    cache.armazenar("a", 1, 1, histograma)
+    cache.gravar()
+    cache.armazenar("b", 1, 1, histograma)
+    cache.gravar()
+    cache.obter("a")  # "a" passa a ser a mais recente.
+    cache.armazenar("c", 1, 1, histograma)
+    cache.fechar()
+
+    cache = CacheResultados(str(tmp_path), orcamento_bytes=2 * tamanho)
+    assert [chave for chave in "abc" if cache.consultar(chave) is not None] == ["a", "c"]
+    cache.fechar()
+
+def test_cache_de_uma_versao_anterior(tmp_path):
+    conexao = sqlite3.connect(str(tmp_path / NOME_ARQUIVO_CACHE))
+    conexao.execute("CREATE TABLE estatisticas (chave TEXT PRIMARY KEY, altura INTEGER NOT NULL, largura INTEGER NOT NULL,"
+                    " histograma BLOB NOT NULL, tamanho_bytes INTEGER NOT NULL, ultimo_acesso REAL NOT NULL)")
+    conexao.execute("INSERT INTO estatisticas VALUES ('a', 3, 4, ?, 2049, 0)", (np.arange(256, dtype=np.int64).tobytes(),))
+    conexao.commit()
+    conexao.close()
+
+    cache = CacheResultados(str(tmp_path))
+    entrada = cache.obter("a")
+    assert (entrada["altura"], entrada["largura"], entrada["area_estimada"]) == (3, 4, None)
+    cache.fechar()
+
+def test_lote_em_fluxo_nao_decodifica_as_imagens_em_cache(tmp_path, imagens):
+    entradas = [(imagens[0], None, None), (imagens[1], 20.0, None), (imagens[2], None, None)]
+
+    def executar_em_fluxo():
+        cache = CacheImagens()
+        resultados_cache = CacheResultados(str(tmp_path / "cache"))
+        medida = pixerizador.medir_fluxo(lambda: iter(entradas), cache, cache_resultados=resultados_cache, kernel=KERNEL_PADRAO)
+        try:
+            resultados = list(pixerizador.iterar_resultados_em_fluxo(lambda: iter(entradas), medida, cache, 200, cache_resultados=resultados_cache))
+        finally:
+            medida[2].close()
+            resultados_cache.fechar()
+        return resultados, cache
+
+    primeiros, _ = executar_em_fluxo()
+    segundos, cache = executar_em_fluxo()
+    assert cache.decodificacoes == 0
+    assert segundos == primeiros
+    assert primeiros == pixerizador.main(imagens, [None, 20.0, None])
@@ -0,0 +1,142 @@
+import cv2
+import numpy as np
+import pytest
+
+import motor
+import pixerizador
+from diario_processamento import DiarioProcessamento, parametros_diario, verificar_diario
+from pixerizador import KERNEL_PADRAO
+
+@pytest.fixture
+def lote(tmp_path):
+    aleatorio = np.random.default_rng(10)
+    imagens = []
+    for indice in range(6):
+        caminho = str(tmp_path / f"imagem_{indice}.png")
+        cv2.imwrite(caminho, aleatorio.integers(0, 256, (24 + indice, 30), dtype=np.uint8))
+        imagens.append(caminho)
+    imagens.insert(3, str(tmp_path / "inexistente.png"))
+    return imagens, [10.0 * (indice + 1) for indice in range(len(imagens))]
+
+@pytest.fixture
+def processadas(monkeypatch):
+    """
+    Caminhos das imagens que passam pela etapa pesada (as retomadas do diário não passam).
+    """
+    lista = []
+    original = pixerizador.processar_imagem
+
+    def contar(preparo, *argumentos, **opcoes):
+        lista.append(str(preparo["caminho_imagem"]))
+        return original(preparo, *argumentos, **opcoes)
+
+    monkeypatch.setattr(pixerizador, "processar_imagem", contar)
+    return lista
+
+def requisicao(imagens, areas_km2, caminho_diario, **opcoes):
+    return motor.RequisicaoProcessamento(imagens=imagens, areas_km2=areas_km2, limiares=[200, 120], usar_cache_resultados=False,
+                                         caminho_diario=str(caminho_diario), intervalo_diario=1, **opcoes)
+
+def como_dicts(resultados):
+    return [resultado.como_dict() for resultado in resultados]
+
+def test_retomada_apos_interrupcao(tmp_path, lote, processadas):
+    imagens, areas_km2 = lote
+    esperado = pixerizador.main(imagens, areas_km2, limiar=[200, 120])
+    processadas.clear()
+
+    resultados = motor.iterar(requisicao(imagens, areas_km2, tmp_path / "lote.diario"))
+    for _ in range(4):  # Interrompe o lote depois de 4 imagens (inclusive a que falhou).
+        next(resultados)
+    resultados.close()
+    assert len(processadas) == 4
+
+    processadas.clear()
+    retomados = motor.processar(requisicao(imagens, areas_km2, tmp_path / "lote.diario", retomar=True))
+    assert processadas == imagens[4:]
+    assert como_dicts(retomados) == esperado
+
+def test_registro_incompleto_descartado(tmp_path, lote, processadas):
+    imagens, areas_km2 = lote
+    esperado = como_dicts(motor.processar(requisicao(imagens, areas_km2, tmp_path / "lote.diario")))
+    with open(tmp_path / "lote.diario", "rb") as arquivo:
+        linhas = arquivo.readlines()
+    # Interrupção durante a gravação da última imagem.
+    with open(tmp_path / "lote.diario", "wb") as arquivo:
+        arquivo.writelines(linhas[:-1])
+        arquivo.write(linhas[-1][:len(linhas[-1]) // 2])
+
+    processadas.clear()
+    assert como_dicts(motor.processar(requisicao(imagens, areas_km2, tmp_path / "lote.diario", retomar=True))) == esperado
+    assert processadas == imagens[-1:]
+    with open(tmp_path / "lote.diario", "rb") as arquivo:
+        assert arquivo.readlines() == linhas
+
+def test_outra_area_e_uma_nova_entrada(tmp_path, lote, processadas):
+    imagens, areas_km2 = lote
+    motor.processar(requisicao(imagens, areas_km2, tmp_path / "lote.diario"))
+    areas_km2 = list(areas_km2)
+    areas_km2[1] = 999.0
+    processadas.clear()
+    retomados = motor.processar(requisicao(imagens, areas_km2, tmp_path / "lote.diario", retomar=True))
+    assert processadas == imagens[1:2]
+    assert como_dicts(retomados) == pixerizador.main(imagens, areas_km2, limiar=[200, 120])
+
+def test_repetir_falhas(tmp_path, lote, processadas):
+    imagens, areas_km2 = lote
+    motor.processar(requisicao(imagens, areas_km2, tmp_path / "lote.diario"))
+    cv2.imwrite(imagens[3], np.full((20, 20), 255, dtype=np.uint8))
+
+    processadas.clear()
+    retomados = motor.processar(requisicao(imagens, areas_km2, tmp_path / "lote.diario", retomar=True))
+    assert processadas == []
+    assert retomados[3].erro_processamento is not None
+
+    retomados = motor.processar(requisicao(imagens, areas_km2, tmp_path / "lote.diario", retomar=True, repetir_falhas=True))
+    assert processadas == imagens[3:4]
+    assert retomados[3].erro_processamento is None
+    assert como_dicts(retomados) == pixerizador.main(imagens, areas_km2, limiar=[200, 120])
+
+def test_parametros_diferentes(tmp_path, lote):
+    imagens, areas_km2 = lote
+    motor.processar(requisicao(imagens, areas_km2, tmp_path / "lote.diario"))
+    verificar_diario(str(tmp_path / "lote.diario"), parametros_diario(KERNEL_PADRAO, [200, 120]))
+    with pytest.raises(ValueError, match="outros parâmetros"):
+        verificar_diario(str(tmp_path / "lote.diario"), parametros_diario(KERNEL_PADRAO, [200]))
+    with pytest.raises(ValueError, match="outros parâmetros"):
+        DiarioProcessamento(str(tmp_path / "lote.diario"), parametros_diario(KERNEL_PADRAO, [150, 120]), retomar=True)
+    (tmp_path / "outro.txt").write_text("não é um diário\n")
+    with pytest.raises(ValueError, match="não é um diário"):
+        verificar_diario(str(tmp_path / "outro.txt"), parametros_diario(KERNEL_PADRAO, [200, 120]))
+
+def test_retomada_georreferenciada(tmp_path, lote, processadas):
+    imagens, _ = lote
+    imagens = [caminho for caminho in imagens if "inexistente" not in caminho]
+    limites = (-50.0, -30.0, -40.0, 10.0)
+    areas_km2 = [None] * len(imagens)  # Áreas dadas pela geometria.
+    georreferencias = [limites] * len(imagens)
+    esperado = pixerizador.main(imagens, areas_km2, limiar=[200, 120], georreferencias=georreferencias)
+
+    resultados = motor.iterar(requisicao(imagens, areas_km2, tmp_path / "lote.diario", georreferencias=georreferencias))
+    next(resultados)
+    next(resultados)
+    resultados.close()
+    processadas.clear()
+    retomados = motor.processar(requisicao(imagens, areas_km2, tmp_path / "lote.diario", georreferencias=georreferencias, retomar=True))
+    assert processadas == imagens[2:]
+    # Os pesos das linhas e o histograma ponderado das imagens retomadas vêm do diário.
+    assert como_dicts(retomados) == esperado
+
+def test_lote_em_fluxo_retomado(tmp_path, lote, processadas):
+    imagens, areas_km2 = lote
+    entradas = list(zip(imagens, areas_km2, [None] * len(imagens)))
+    esperado = pixerizador.main(imagens, areas_km2, limiar=[200, 120])
+
+    em_fluxo = iter(motor.LoteEmFluxo(lambda: iter(entradas), requisicao([], [], tmp_path / "lote.diario")))
+    for _ in range(3):
+        next(em_fluxo)
+    em_fluxo.close()
+    processadas.clear()
+    retomados = list(motor.LoteEmFluxo(lambda: iter(entradas), requisicao([], [], tmp_path / "lote.diario", retomar=True)))
+    assert processadas == imagens[3:]
+    assert como_dicts(retomados) == esperado
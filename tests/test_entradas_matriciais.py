@@ -0,0 +1,45 @@
+import cv2
+import numpy as np
+import pytest
+
+import motor
+from entradas_matriciais import MatrizEmMemoria, nome_imagem
+
+@pytest.fixture
+def matriz():
+    return np.random.default_rng(11).integers(0, 256, (30, 40), dtype=np.uint8)
+
+def test_matriz_em_memoria_nao_e_um_caminho(matriz):
+    entrada = MatrizEmMemoria(matriz.tobytes(), "buffer", np.uint8, (30, 40))
+    assert not isinstance(entrada, str)
+    assert nome_imagem(entrada) == "buffer"
+    np.testing.assert_array_equal(entrada.matriz, matriz)
+    with pytest.raises(ValueError):
+        MatrizEmMemoria(matriz.tobytes())
+
+def test_mesmos_resultados_dos_arquivos(tmp_path, matriz):
+    caminho = str(tmp_path / "imagem.png")
+    cv2.imwrite(caminho, matriz)
+    npy = str(tmp_path / "imagem.npy")
+    np.save(npy, matriz)
+    requisicao = motor.RequisicaoProcessamento(
+        imagens=[caminho, matriz, MatrizEmMemoria(memoryview(matriz), "nomeada"), npy],
+        areas_km2=[10.0, 10.0, None, 10.0], limiares=[200, 100], workers=2, usar_cache_resultados=False)
+    resultados = [resultado.como_dict() for resultado in motor.processar(requisicao)]
+    assert [resultado["caminho_imagem"] for resultado in resultados] == [caminho, "<memória 1>", "nomeada", npy]
+    for resultado in resultados[1:]:
+        if resultado["caminho_imagem"] == "nomeada":
+            assert resultado["erro_processamento"] is None  # Área estimada a partir da própria matriz.
+            continue
+        assert {**resultado, "caminho_imagem": caminho} == resultados[0]
+
+def test_sessao_reprocessa_as_matrizes_em_memoria(tmp_path, matriz):
+    caminho = str(tmp_path / "imagem.png")
+    cv2.imwrite(caminho, matriz)
+    sessao = motor.SessaoResultados()
+    sessao.sincronizar(motor.RequisicaoProcessamento(imagens=[matriz, caminho], areas_km2=[10.0, 20.0], usar_cache_resultados=False))
+    # Outro conteúdo com o mesmo nome ("<memória 0>") substitui o anterior.
+    sessao.sincronizar(motor.RequisicaoProcessamento(imagens=[255 - matriz, caminho], areas_km2=[10.0, 20.0], usar_cache_resultados=False))
+    resultados = sessao.resultados()
+    assert [resultado.caminho_imagem for resultado in resultados] == ["<memória 0>", caminho]
+    assert resultados[0].contagem_pixels_claros == int(np.count_nonzero(255 - matriz > 200))
@@ -0,0 +1,118 @@
+import zlib
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import escritor_geotiff
+import rasterizador
+from escritor_geotiff import EscritorGeoTIFF
+from geometria_pixels import ler_geotransform, ler_tags_geotiff
+
+TAGS_GEO = {
+    33550: (0.5, 0.25, 0.0),
+    33922: (0.0, 0.0, 0.0, -50.0, 10.0, 0.0),
+    34735: (1, 1, 0, 1, 1024, 0, 1, 2),
+    34737: "WGS 84|",
+}
+
+def ler_tiles(caminho):
+    """
+    Decodifica o raster a partir dos deslocamentos e tamanhos dos tiles, sem depender do
+    leitor de TIFF do Pillow para o arranjo planar.
+
+    :return: Tupla (bandas, tags), em que bandas é um array (bandas, altura, largura).
+    """
+    with Image.open(caminho) as imagem:
+        tags = dict(imagem.tag_v2)
+    largura, altura, tile = tags[256], tags[257], tags[322]
+    bandas = tags[277]
+    formato, bits = np.atleast_1d(tags[339])[0], np.atleast_1d(tags[258])[0]
+    tipo = np.dtype({1: "u", 2: "i", 3: "f"}[formato] + str(bits // 8)).newbyteorder("<")
+    tiles_por_linha = -(-largura // tile)
+    linhas_de_tiles = -(-altura // tile)
+    completo = np.empty((bandas, linhas_de_tiles * tile, tiles_por_linha * tile), dtype=tipo)
+    with open(caminho, "rb") as arquivo:
+        for indice, (deslocamento, tamanho) in enumerate(zip(tags[324], tags[325])):
+            banda, resto = divmod(indice, linhas_de_tiles * tiles_por_linha)
+            linha, coluna = divmod(resto, tiles_por_linha)
+            arquivo.seek(deslocamento)
+            dados = np.frombuffer(zlib.decompress(arquivo.read(tamanho)), dtype=tipo).reshape(tile, tile)
+            completo[banda, linha * tile:(linha + 1) * tile, coluna * tile:(coluna + 1) * tile] = dados
+    return completo, tags
+
+def gravar(caminho, bandas, tamanho_faixa, **opcoes):
+    quantidade, altura, largura = bandas.shape
+    with EscritorGeoTIFF(str(caminho), altura, largura, bandas=quantidade, tipo=bandas.dtype, **opcoes) as escritor:
+        # As bandas chegam intercaladas, em faixas que não coincidem com os tiles.
+        for inicio in range(0, altura, tamanho_faixa):
+            for banda in range(quantidade):
+                escritor.escrever_faixa(bandas[banda, inicio:inicio + tamanho_faixa], banda)
+
+def test_valores_lidos_pelo_pillow(tmp_path):
+    valores = np.random.default_rng(1).random((1, 70, 50)).astype(np.float32)
+    gravar(tmp_path / "saida.tif", valores, 33, tamanho_tile=32)
+    with Image.open(tmp_path / "saida.tif") as imagem:
+        assert imagem.size == (50, 70)
+        np.testing.assert_array_equal(np.asarray(imagem), valores[0])
+
+def test_tiles_da_borda_completados_com_zeros(tmp_path):
+    valores = np.arange(1, 40 * 20 + 1, dtype=np.float32).reshape(1, 20, 40)
+    gravar(tmp_path / "saida.tif", valores, 7, tamanho_tile=16)
+    completo, tags = ler_tiles(tmp_path / "saida.tif")
+    assert (tags[322], tags[323]) == (16, 16)
+    assert len(tags[324]) == 3 * 2
+    np.testing.assert_array_equal(completo[0, :20, :40], valores[0])
+    assert not completo[0, 20:, :].any()
+    assert not completo[0, :, 40:].any()
+
+@pytest.mark.parametrize("tipo", [np.float32, np.uint16, np.int16])
+def test_bandas_em_planos_separados(tmp_path, tipo):
+    valores = (np.random.default_rng(2).random((3, 45, 37)) * 1000).astype(tipo)
+    gravar(tmp_path / "saida.tif", valores, 10, tamanho_tile=16)
+    completo, tags = ler_tiles(tmp_path / "saida.tif")
+    assert tags[277] == 3
+    assert tags[284] == escritor_geotiff.CONFIGURACAO_PLANAR_SEPARADA
+    assert len(tags[324]) == 3 * 3 * 3
+    np.testing.assert_array_equal(completo[:, :45, :37], valores)
+
+def test_tags_geotiff_copiadas(tmp_path):
+    gravar(tmp_path / "saida.tif", np.ones((1, 20, 20), dtype=np.float32), 20, tamanho_tile=16, tags_geo=TAGS_GEO)
+    tags = ler_tags_geotiff(str(tmp_path / "saida.tif"))
+    assert tags[33550] == pytest.approx(TAGS_GEO[33550])
+    assert tags[33922] == pytest.approx(TAGS_GEO[33922])
+    assert tuple(tags[34735]) == TAGS_GEO[34735]
+    assert tags[34737] == TAGS_GEO[34737]
+    geotransform, geografico = ler_geotransform(str(tmp_path / "saida.tif"))
+    assert geotransform == pytest.approx((-50.0, 0.5, 0.0, 10.0, 0.0, -0.25))
+    assert geografico
+
+def test_big_tiff(tmp_path, monkeypatch):
+    monkeypatch.setattr(escritor_geotiff, "LIMITE_TIFF_CLASSICO", 0)
+    valores = np.random.default_rng(3).random((2, 30, 30)).astype(np.float32)
+    gravar(tmp_path / "saida.tif", valores, 30, tamanho_tile=16, tags_geo=TAGS_GEO)
+    with open(tmp_path / "saida.tif", "rb") as arquivo:
+        assert arquivo.read(4) == b"II+\x00"
+    completo, _ = ler_tiles(tmp_path / "saida.tif")
+    np.testing.assert_array_equal(completo[:, :30, :30], valores)
+
+def test_linhas_faltando(tmp_path):
+    escritor = EscritorGeoTIFF(str(tmp_path / "saida.tif"), 20, 20, tamanho_tile=16)
+    escritor.escrever_faixa(np.zeros((10, 20), dtype=np.float32))
+    with pytest.raises(ValueError):
+        escritor.fechar()
+
+def test_histograma_do_backend_numpy(tmp_path):
+    inteira = np.random.default_rng(4).integers(0, 256, (40, 30), dtype=np.uint8)
+    Image.fromarray(inteira).save(tmp_path / "inteira.tif")
+    Image.fromarray(inteira.astype(np.float32)).save(tmp_path / "real.tif")
+    resultado = rasterizador.processar([str(tmp_path / "inteira.tif"), str(tmp_path / "real.tif")],
+                                       rasterizador.BackendNumPy(bytes_por_faixa=30 * 7), str(tmp_path / "saida"))
+    assert resultado["tipo_histograma"] == rasterizador.BackendNumPy.TIPO_HISTOGRAMA == "valores_inteiros"
+    assert resultado["histogramas"][0] == np.bincount(inteira.ravel(), minlength=256).tolist()
+    # Bandas de ponto flutuante não têm histograma de valores inteiros, mas o raster é gravado.
+    assert resultado["histogramas"][1] is None
+    assert resultado["resultados_processamento"] == [0, 0]
+    for caminho in resultado["caminhos_output"]:
+        with Image.open(caminho) as imagem:
+            np.testing.assert_allclose(np.asarray(imagem), inteira, rtol=1e-6)
@@ -0,0 +1,97 @@
+import cv2
+import numpy as np
+import pytest
+
+import pixerizador
+from pixerizador import ParametrosKernel
+
+def estatisticas_por_pixel(imagem, limiar, pesos_linhas=None):
+    """
+    Cálculo anterior ao histograma: máscara dos pixels acima do limiar e soma direta.
+    """
+    mascara = imagem > limiar
+    if pesos_linhas is None:
+        return int(mascara.sum()), int(imagem[mascara].astype(np.int64).sum())
+    return int(mascara.sum()), float((imagem.astype(np.float64) * mascara * pesos_linhas[:, np.newaxis]).sum())
+
+@pytest.fixture
+def imagem():
+    return np.random.default_rng(5).integers(0, 256, (97, 61), dtype=np.uint8)
+
+def test_histograma_igual_a_contagem_por_pixel(imagem, monkeypatch):
+    # Blocos menores que a imagem e que não dividem o total de pixels.
+    monkeypatch.setattr(pixerizador, "TAMANHO_BLOCO_HISTOGRAMA", 1000)
+    histograma = pixerizador.calcular_histograma(imagem)
+    assert histograma.dtype == np.int64
+    np.testing.assert_array_equal(histograma, np.bincount(imagem.ravel(), minlength=256))
+    np.testing.assert_array_equal(histograma, np.histogram(imagem, bins=256, range=(0, 256))[0])
+
+def test_histograma_em_faixas(imagem):
+    faixas = (imagem[inicio:inicio + 10] for inicio in range(0, imagem.shape[0], 10))
+    np.testing.assert_array_equal(pixerizador.calcular_histograma_em_faixas(faixas), pixerizador.calcular_histograma(imagem))
+
+@pytest.mark.parametrize("limiar", [-5, 0, 1, 127, 199, 200, 254, 255, 300])
+def test_estatisticas_por_limiar_iguais_a_mascara(imagem, limiar):
+    (contagem, soma), = pixerizador.estatisticas_por_limiar(pixerizador.calcular_histograma(imagem), [limiar])
+    assert (contagem, soma) == estatisticas_por_pixel(imagem, limiar)
+
+def test_varredura_igual_a_cada_limiar(imagem):
+    limiares = pixerizador.interpretar_limiares(["0:255:15", "200"])
+    histograma = pixerizador.calcular_histograma(imagem)
+    assert pixerizador.estatisticas_por_limiar(histograma, limiares) == [estatisticas_por_pixel(imagem, limiar) for limiar in limiares]
+
+def test_soma_ponderada_intensidades(imagem):
+    soma, contagem = pixerizador.soma_ponderada_intensidades(imagem, 0.25, limiar=150)
+    contagem_esperada, intensidades = estatisticas_por_pixel(imagem, 150)
+    assert contagem == contagem_esperada
+    assert soma == pytest.approx(intensidades * 0.25)
+
+def test_histograma_ponderado_igual_a_pesos_por_pixel(imagem, monkeypatch):
+    monkeypatch.setattr(pixerizador, "TAMANHO_BLOCO_HISTOGRAMA", 300)
+    pesos = np.linspace(0.2, 1.0, imagem.shape[0])
+    faixas = (imagem[inicio:inicio + 13] for inicio in range(0, imagem.shape[0], 13))
+    histograma, ponderado = pixerizador.calcular_histograma_ponderado_em_faixas(faixas, pesos)
+    np.testing.assert_array_equal(histograma, np.bincount(imagem.ravel(), minlength=256))
+    for limiar in (0, 100, 200):
+        contagem, soma = pixerizador.estatisticas_por_limiar(histograma, [limiar], ponderado)[0]
+        contagem_esperada, soma_esperada = estatisticas_por_pixel(imagem, limiar, pesos)
+        assert contagem == contagem_esperada
+        assert soma == pytest.approx(soma_esperada)
+
+def test_profundidade_nativa_16_bits():
+    imagem = np.random.default_rng(6).integers(0, 65536, (40, 50), dtype=np.uint16)
+    kernel = ParametrosKernel(profundidade_nativa=True)
+    histograma = pixerizador.calcular_histograma(imagem, kernel)
+    assert histograma.size == 65536
+    for limiar in (0, 30000, 65534):
+        assert pixerizador.estatisticas_por_limiar(histograma, [limiar])[0] == estatisticas_por_pixel(imagem, limiar)
+
+def test_profundidade_nativa_saturada_e_float():
+    inteira = np.array([[0, 5, 9, 12, 40000]], dtype=np.uint16)
+    histograma = pixerizador.calcular_histograma(inteira, ParametrosKernel(profundidade_nativa=True, niveis=10))
+    # Valores acima de niveis - 1 contam na última posição.
+    np.testing.assert_array_equal(histograma, [1, 0, 0, 0, 0, 1, 0, 0, 0, 3])
+
+    real = np.array([[np.nan, -1.0, 0.0, 0.24, 0.25, 0.99, 1.0, 7.0]], dtype=np.float32)
+    histograma = pixerizador.calcular_histograma(real, ParametrosKernel(profundidade_nativa=True, niveis=4))
+    np.testing.assert_array_equal(histograma, [4, 1, 0, 3])
+
+def test_main_com_varredura_igual_a_execucoes_separadas(tmp_path, imagem):
+    caminhos = []
+    for indice, deslocamento in enumerate((0, 40)):
+        caminho = str(tmp_path / f"imagem_{indice}.png")
+        cv2.imwrite(caminho, np.clip(imagem.astype(np.int16) + deslocamento, 0, 255).astype(np.uint8))
+        caminhos.append(caminho)
+    areas = [10.0, 30.0]
+
+    varredura = pixerizador.main(caminhos, areas, limiar=[150, 100, 220])
+    for limiar in (150, 100, 220):
+        separados = pixerizador.main(caminhos, areas, limiar=limiar)
+        for resultado, separado in zip(varredura, separados):
+            registro, = [item for item in resultado["varredura_limiares"] if item["limiar"] == limiar]
+            assert registro["contagem_pixels_claros"] == separado["contagem_pixels_claros"]
+            assert registro["soma_ponderada"] == pytest.approx(separado["soma_ponderada"])
+    for resultado, caminho in zip(varredura, caminhos):
+        contagem, intensidades = estatisticas_por_pixel(cv2.imread(caminho, cv2.IMREAD_GRAYSCALE), 150)
+        assert resultado["contagem_pixels_claros"] == contagem
+        assert resultado["soma_ponderada"] == pytest.approx(intensidades * resultado["area_normalizada"])
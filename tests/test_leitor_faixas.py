@@ -0,0 +1,100 @@
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+import pixerizador
+from cache_imagens import CacheImagens, decodificar_cinza
+from escritor_geotiff import EscritorGeoTIFF
+from leitor_faixas import abrir_faixas_banda, abrir_faixas_cinza
+
+LINHAS_POR_STRIP = 16
+
+def gravar_strips(caminho, matriz, modo=None):
+    Image.fromarray(matriz, modo).save(caminho, tiffinfo={278: LINHAS_POR_STRIP})
+    return str(caminho)
+
+def gravar_tiles(caminho, matriz):
+    with EscritorGeoTIFF(str(caminho), matriz.shape[0], matriz.shape[1], tipo=matriz.dtype, tamanho_tile=16) as escritor:
+        escritor.escrever_faixa(matriz)
+    return str(caminho)
+
+def ler_em_faixas(leitor):
+    altura, largura, faixas = leitor
+    faixas = list(faixas)
+    imagem = np.concatenate(faixas)
+    assert imagem.shape == (altura, largura)
+    return faixas, imagem
+
+@pytest.fixture
+def aleatorio():
+    return np.random.default_rng(7)
+
+def test_strips_agrupadas_no_limite_de_bytes(tmp_path, aleatorio):
+    matriz = aleatorio.integers(0, 256, (150, 40), dtype=np.uint8)
+    caminho = gravar_strips(tmp_path / "cinza.tif", matriz)
+    bytes_por_faixa = 40 * 50
+    faixas, imagem = ler_em_faixas(abrir_faixas_cinza(caminho, bytes_por_faixa))
+    np.testing.assert_array_equal(imagem, matriz)
+    # Strips inteiras (múltiplos de 16 linhas) até o limite de 50 linhas.
+    assert [faixa.shape[0] for faixa in faixas] == [48, 48, 48, 6]
+
+def test_strip_maior_que_o_limite_e_lida_inteira(tmp_path, aleatorio):
+    matriz = aleatorio.integers(0, 256, (40, 40), dtype=np.uint8)
+    faixas, imagem = ler_em_faixas(abrir_faixas_cinza(gravar_strips(tmp_path / "cinza.tif", matriz), 1))
+    np.testing.assert_array_equal(imagem, matriz)
+    assert [faixa.shape[0] for faixa in faixas] == [16, 16, 8]
+
+def test_rgb_e_1_bit_iguais_a_decodificacao_inteira(tmp_path, aleatorio):
+    rgb = aleatorio.integers(0, 256, (70, 33, 3), dtype=np.uint8)
+    caminho = gravar_strips(tmp_path / "rgb.tif", rgb)
+    _, imagem = ler_em_faixas(abrir_faixas_cinza(caminho, 33 * 3 * 20))
+    np.testing.assert_array_equal(imagem, decodificar_cinza(caminho))
+    _, banda = ler_em_faixas(abrir_faixas_banda(caminho, 33 * 3 * 20))
+    np.testing.assert_array_equal(banda, rgb[..., 0])
+
+    bits = aleatorio.integers(0, 2, (50, 37)).astype(bool)
+    caminho = str(tmp_path / "bits.tif")
+    Image.fromarray(bits).convert("1").save(caminho, tiffinfo={278: LINHAS_POR_STRIP})
+    _, imagem = ler_em_faixas(abrir_faixas_cinza(caminho, 37 * 20))
+    np.testing.assert_array_equal(imagem, decodificar_cinza(caminho))
+    _, banda = ler_em_faixas(abrir_faixas_banda(caminho, 37 * 20))
+    np.testing.assert_array_equal(banda, bits.astype(np.uint8))
+
+@pytest.mark.parametrize("tipo", [np.uint16, np.float32])
+def test_strips_na_profundidade_nativa(tmp_path, aleatorio, tipo):
+    matriz = (aleatorio.random((45, 50)) * 60000).astype(tipo)
+    caminho = gravar_strips(tmp_path / "nativa.tif", matriz)
+    assert abrir_faixas_cinza(caminho, 50 * 4 * 16) is None  # Sem profundidade nativa, a imagem é decodificada inteira.
+    faixas, imagem = ler_em_faixas(abrir_faixas_cinza(caminho, 50 * matriz.itemsize * 16, profundidade_nativa=True))
+    assert imagem.dtype == tipo
+    np.testing.assert_array_equal(imagem, matriz)
+    assert [faixa.shape[0] for faixa in faixas] == [16, 16, 13]
+
+def test_tiles_comprimidos_lidos_em_um_bloco(tmp_path, aleatorio):
+    # O Pillow decodifica TIFFs comprimidos pela libtiff, como um único bloco.
+    matriz = aleatorio.random((45, 50)).astype(np.float32)
+    faixas, imagem = ler_em_faixas(abrir_faixas_cinza(gravar_tiles(tmp_path / "tiles.tif", matriz), 50 * 4 * 16, profundidade_nativa=True))
+    np.testing.assert_array_equal(imagem, matriz)
+    assert len(faixas) == 1
+
+def test_formatos_sem_leitura_em_faixas(tmp_path, aleatorio):
+    matriz = aleatorio.integers(0, 256, (20, 20), dtype=np.uint8)
+    cv2.imwrite(str(tmp_path / "cinza.png"), matriz)
+    assert abrir_faixas_cinza(str(tmp_path / "cinza.png"), 100) is None
+    # Orientações diferentes da padrão são decodificadas inteiras (e giradas pelo OpenCV).
+    Image.fromarray(matriz).save(tmp_path / "girada.tif", tiffinfo={274: 3})
+    assert abrir_faixas_cinza(str(tmp_path / "girada.tif"), 100) is None
+    assert abrir_faixas_cinza(str(tmp_path / "inexistente.tif"), 100) is None
+
+def test_histograma_em_faixas_igual_ao_da_imagem_inteira(tmp_path, aleatorio):
+    rgb = aleatorio.integers(0, 256, (90, 41, 3), dtype=np.uint8)
+    caminho = gravar_strips(tmp_path / "rgb.tif", rgb)
+    cache = CacheImagens()
+    np.testing.assert_array_equal(pixerizador.obter_histograma(caminho, cache, bytes_por_faixa=41 * 3 * 16),
+                                  pixerizador.obter_histograma(caminho, cache))
+    pesos = np.linspace(1.0, 2.0, 90)
+    em_faixas = pixerizador.obter_histograma_ponderado(caminho, cache, pesos, bytes_por_faixa=41 * 3 * 16)
+    inteira = pixerizador.obter_histograma_ponderado(caminho, cache, pesos)
+    np.testing.assert_array_equal(em_faixas[0], inteira[0])
+    np.testing.assert_allclose(em_faixas[1], inteira[1])
@@ -0,0 +1,82 @@
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+import pytest
+
+import estimador_area
+import lote_distribuido
+import motor
+import pixerizador
+from conjunto_resultados import ConjuntoResultados
+
+@pytest.fixture(autouse=True)
+def sem_estimativas_memorizadas(monkeypatch):
+    monkeypatch.setattr(estimador_area, "_estimativas", OrderedDict())
+
+@pytest.fixture
+def entradas(tmp_path):
+    aleatorio = np.random.default_rng(9)
+    lista = []
+    for indice in range(7):
+        caminho = str(tmp_path / f"imagem_{indice}.png")
+        cv2.imwrite(caminho, aleatorio.integers(0, 256, (20 + 3 * indice, 25), dtype=np.uint8))
+        # Áreas informadas e estimadas (None), e uma imagem inexistente, com erro.
+        lista.append((caminho, None if indice % 3 == 0 else 100.0 * (indice + 1), None))
+    lista.insert(4, (str(tmp_path / "inexistente.png"), 50.0, None))
+    return lista
+
+def mapear_e_reduzir(tmp_path, entradas, particoes, limiares):
+    parciais = []
+    for particao in range(particoes):
+        indices, imagens, areas_km2, limiares_imagens, quantidade_total, impressao = lote_distribuido.selecionar_particao(iter(entradas), particao, particoes)
+        requisicao = motor.RequisicaoProcessamento(imagens=imagens, areas_km2=areas_km2, limiares=limiares,
+                                                   usar_cache_resultados=False, limiares_imagens=limiares_imagens)
+        caminho = str(tmp_path / f"parcial_{particao}.npz")
+        lote_distribuido.mapear(requisicao, indices, quantidade_total, caminho, particao, particoes, impressao)
+        parciais.append(caminho)
+    return parciais
+
+def resultado_reduzido(parciais):
+    brutos, areas_normalizadas, limiares, _ = lote_distribuido.reduzir(parciais)
+    return ConjuntoResultados.de_brutos(brutos, areas_normalizadas, limiares).como_dicts()
+
+@pytest.mark.parametrize("particoes", [1, 3, 10])
+def test_reducao_igual_ao_lote_em_um_processo(tmp_path, entradas, particoes):
+    limiares = [200, 120, 180]
+    parciais = mapear_e_reduzir(tmp_path, entradas, particoes, limiares)
+    imagens, areas_km2, _ = zip(*entradas)
+    esperado = pixerizador.main(list(imagens), list(areas_km2), limiar=limiares)
+    # Partições em qualquer ordem.
+    assert resultado_reduzido(parciais[::-1]) == esperado
+
+def test_limiares_do_manifesto(tmp_path, entradas):
+    entradas = [(caminho, area, 90 + 20 * indice if indice % 2 else None) for indice, (caminho, area, _) in enumerate(entradas)]
+    parciais = mapear_e_reduzir(tmp_path, entradas, 2, [200])
+    imagens, areas_km2, limiares_imagens = zip(*entradas)
+    assert resultado_reduzido(parciais) == pixerizador.main(list(imagens), list(areas_km2), limiar=[200], limiares_imagens=list(limiares_imagens))
+
+def test_particoes_incompletas_ou_repetidas(tmp_path, entradas):
+    parciais = mapear_e_reduzir(tmp_path, entradas, 3, [200])
+    with pytest.raises(ValueError, match="Faltam"):
+        lote_distribuido.reduzir(parciais[:2])
+    with pytest.raises(ValueError, match="mais de um"):
+        lote_distribuido.reduzir(parciais + parciais[:1])
+    with pytest.raises(ValueError):
+        lote_distribuido.selecionar_particao(iter(entradas), 3, 3)
+
+def test_particoes_de_listas_diferentes(tmp_path, entradas):
+    parciais = mapear_e_reduzir(tmp_path, entradas, 2, [200])
+    # A segunda partição leu as mesmas imagens em outra ordem.
+    reordenadas = entradas[1:] + entradas[:1]
+    diretorio = tmp_path / "reordenado"
+    diretorio.mkdir()
+    outras = mapear_e_reduzir(diretorio, reordenadas, 2, [200])
+    with pytest.raises(ValueError, match="outra lista de imagens"):
+        lote_distribuido.reduzir([parciais[0], outras[1]])
+
+    diretorio = tmp_path / "limiar"
+    diretorio.mkdir()
+    outras = mapear_e_reduzir(diretorio, entradas, 2, [150])
+    with pytest.raises(ValueError, match="limiares"):
+        lote_distribuido.reduzir([parciais[0], outras[1]])
@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+import escritor_geotiff
+import pixerizador
+from cache_imagens import CacheImagens
+from escritor_geotiff import EscritorGeoTIFF
+from metadados_imagem import sondar_imagem
+
+ALTURA, LARGURA = 37, 53
+
+def dimensoes_opencv(caminho):
+    return cv2.imread(str(caminho), cv2.IMREAD_COLOR).shape[:2]  # Com a orientação Exif aplicada.
+
+def pillow(modo, formato, **opcoes):
+    def gravar(caminho):
+        Image.new(modo, (LARGURA, ALTURA)).save(caminho, formato, **opcoes)
+    return gravar
+
+GRAVADORES = {
+    "png_cinza.png": (pillow("L", "PNG"), 1, 8, False),
+    "png_rgb.png": (pillow("RGB", "PNG"), 3, 8, False),
+    "png_rgba.png": (pillow("RGBA", "PNG"), 4, 8, False),
+    "png_paleta.png": (pillow("P", "PNG"), 1, 1, True),  # Paleta de uma cor: o Pillow grava índices de 1 bit.
+    "png_16.png": (pillow("I;16", "PNG"), 1, 16, False),
+    "tiff_cinza.tif": (pillow("L", "TIFF"), 1, 8, False),
+    "tiff_rgb_deflate.tif": (pillow("RGB", "TIFF", compression="tiff_deflate"), 3, 8, False),
+    "tiff_paleta.tif": (pillow("P", "TIFF"), 1, 8, True),
+    "tiff_16_big_endian.tif": (pillow("I;16B", "TIFF"), 1, 16, False),
+    "jpeg_cinza.jpg": (pillow("L", "JPEG"), 1, 8, False),
+    "jpeg_progressivo.jpg": (pillow("RGB", "JPEG", progressive=True), 3, 8, False),
+}
+
+@pytest.mark.parametrize("nome", sorted(GRAVADORES))
+def test_cabecalho_igual_a_decodificacao(tmp_path, nome):
+    gravar, canais, bits, paleta = GRAVADORES[nome]
+    caminho = tmp_path / nome
+    gravar(caminho)
+    metadados = sondar_imagem(str(caminho))
+    assert metadados == {"largura": LARGURA, "altura": ALTURA, "canais": canais, "profundidade_bits": bits, "paleta": paleta}
+    assert dimensoes_opencv(caminho) == (ALTURA, LARGURA)
+    assert pixerizador.obter_dimensoes(str(caminho), CacheImagens()) == (ALTURA, LARGURA)
+
+@pytest.mark.parametrize("orientacao, dimensoes", [(1, (ALTURA, LARGURA)), (3, (ALTURA, LARGURA)), (6, (LARGURA, ALTURA)), (8, (LARGURA, ALTURA))])
+def test_orientacao_exif_do_jpeg(tmp_path, orientacao, dimensoes):
+    caminho = tmp_path / "orientado.jpg"
+    exif = Image.Exif()
+    exif[274] = orientacao
+    Image.new("RGB", (LARGURA, ALTURA)).save(caminho, exif=exif)
+    metadados = sondar_imagem(str(caminho))
+    assert (metadados["altura"], metadados["largura"]) == dimensoes
+    assert dimensoes_opencv(caminho) == dimensoes
+
+def test_big_tiff(tmp_path, monkeypatch):
+    monkeypatch.setattr(escritor_geotiff, "LIMITE_TIFF_CLASSICO", 0)
+    caminho = str(tmp_path / "big.tif")
+    with EscritorGeoTIFF(caminho, ALTURA, LARGURA, bandas=2, tipo=np.uint16, tamanho_tile=16) as escritor:
+        for banda in range(2):
+            escritor.escrever_faixa(np.zeros((ALTURA, LARGURA), dtype=np.uint16), banda)
+    assert sondar_imagem(caminho) == {"largura": LARGURA, "altura": ALTURA, "canais": 2, "profundidade_bits": 16, "paleta": False}
+
+def test_formatos_nao_suportados_e_arquivos_invalidos(tmp_path):
+    Image.new("RGB", (LARGURA, ALTURA)).save(tmp_path / "imagem.bmp")
+    assert sondar_imagem(str(tmp_path / "imagem.bmp")) is None
+    assert pixerizador.obter_dimensoes(str(tmp_path / "imagem.bmp"), CacheImagens()) == (ALTURA, LARGURA)
+
+    Image.new("L", (LARGURA, ALTURA)).save(tmp_path / "completo.tif")
+    (tmp_path / "truncado.tif").write_bytes((tmp_path / "completo.tif").read_bytes()[:6])
+    assert sondar_imagem(str(tmp_path / "truncado.tif")) is None
+    (tmp_path / "truncado.jpg").write_bytes(b"\xff\xd8\xff\xe0\x00")
+    assert sondar_imagem(str(tmp_path / "truncado.jpg")) is None
+    assert sondar_imagem(str(tmp_path / "inexistente.png")) is None
@@ -0,0 +1,44 @@
+import numpy as np
+
+from conjunto_resultados import ConjuntoResultados
+from saida_resultados import escrever_npz
+
+def resultado(caminho, erro=None, varredura=True):
+    if erro is not None:
+        return {"caminho_imagem": caminho, "histograma": None, "soma_ponderada": None, "area_por_pixel": None,
+                "area_normalizada": None, "contagem_pixels_claros": None, "erro_processamento": erro,
+                "varredura_limiares": None}
+    histograma = np.arange(256, dtype=np.int64)
+    return {"caminho_imagem": caminho, "histograma": histograma.tolist(), "soma_ponderada": 12.5,
+            "area_por_pixel": 0.25, "area_normalizada": 3.125, "contagem_pixels_claros": 50,
+            "erro_processamento": None,
+            "varredura_limiares": [{"limiar": 100, "soma_ponderada": 20.0, "contagem_pixels_claros": 80},
+                                   {"limiar": 200, "soma_ponderada": 12.5, "contagem_pixels_claros": 50}] if varredura else None}
+
+def ler(caminho):
+    with np.load(caminho, allow_pickle=False) as arquivo:
+        return {nome: arquivo[nome] for nome in arquivo.files}
+
+def test_mesmo_esquema_de_salvar(tmp_path):
+    resultados = [resultado("a.png"), resultado("imagem_longa.tif", erro="Imagem não encontrada:\nfalha"), resultado("c.png")]
+    escrito = str(tmp_path / "escrito.npz")
+    assert escrever_npz(iter(resultados), len(resultados), escrito, [100, 200]) == 3
+    salvo = str(tmp_path / "salvo.npz")
+    ConjuntoResultados.carregar(escrito).salvar(salvo)
+
+    colunas_escritas, colunas_salvas = ler(escrito), ler(salvo)
+    assert sorted(colunas_escritas) == sorted(colunas_salvas)
+    for nome, coluna in colunas_salvas.items():
+        assert colunas_escritas[nome].dtype == coluna.dtype, nome
+        np.testing.assert_array_equal(colunas_escritas[nome], coluna)
+    assert colunas_escritas["histogramas"].dtype == np.int64
+    assert colunas_escritas["possui_erro"].tolist() == [False, True, False]
+    assert colunas_escritas["erro_processamento"][1] == "Imagem não encontrada:\nfalha"
+
+def test_erro_vazio_continua_sendo_erro(tmp_path):
+    caminho = str(tmp_path / "resultados.npz")
+    escrever_npz([resultado("a.png", erro=""), resultado("b.png", varredura=False)], 2, caminho)
+    conjunto = ConjuntoResultados.carregar(caminho)
+    assert conjunto.validos.tolist() == [False, True]
+    assert conjunto.como_dicts()[0]["erro_processamento"] == ""
+    assert "limiares" not in ler(caminho)